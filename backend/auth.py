@@ -1,54 +1,35 @@
 from datetime import datetime, timedelta, timezone
 import os
-from typing import Any, Dict, Optional, Callable
+from typing import TYPE_CHECKING, Any, Dict, Optional, Callable
 
-import pyotp
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 
 from . import models, schemas
 from .database import get_db
+from .utils.password_hashing import password_hasher
+from .utils.principal_cache import principal_cache, user_version
+
+if TYPE_CHECKING:
+    import pyotp
 
 # JWT configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "change_this_in_production_to_a_secure_random_value")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))  # 24h
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
-#def get_password_hash(password: str) -> str:
- #   return pwd_context.hash(password)
-
-
-#def verify_password(plain_password: str, hashed_password: str) -> bool:
-  #  return pwd_context.verify(plain_password, hashed_password)
-
-def _normalize_password(password: str) -> bytes:
-    """
-    Normalize password for bcrypt:
-    - encode to UTF-8
-    - truncate to 72 bytes (bcrypt limit)
-    """
-    password_bytes = password.encode("utf-8")
-    if len(password_bytes) > 72:
-        password_bytes = password_bytes[:72]
-    return password_bytes
-
-
 def get_password_hash(password: str) -> str:
-    password_bytes = _normalize_password(password)
-    return pwd_context.hash(password_bytes)
+    # Runs on the dedicated hashing pool; raises 503 when it is saturated.
+    return password_hasher.hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    password_bytes = _normalize_password(plain_password)
-    return pwd_context.verify(password_bytes, hashed_password)
+    return password_hasher.verify(plain_password, hashed_password)
 
 
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
@@ -59,14 +40,19 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
     return encoded_jwt
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-) -> models.User:
+def get_user_from_token(token: str, db: Session) -> models.User:
+    """
+    Resolve a bearer token to its user, raising 401 if it is invalid.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    cached = principal_cache.get(token, db)
+    if cached is not None:
+        return cached
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: Optional[str] = payload.get("sub")
@@ -77,12 +63,22 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
 
+    version = user_version(db, token_data.user_id) if principal_cache.enabled else 0
     user = db.query(models.User).filter(models.User.id == token_data.user_id).first()
     if user is None:
         raise credentials_exception
+    principal_cache.put(token, user, version, payload.get("exp"))
     return user
 
 
+def get_current_user(
+    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+) -> models.User:
+    # Plain `def` so FastAPI runs it in the threadpool: the DB lookup on a cache
+    # miss must not block the event loop.
+    return get_user_from_token(token, db)
+
+
 async def get_current_active_user(
     current_user: models.User = Depends(get_current_user),
 ) -> models.User:
@@ -110,6 +106,8 @@ def create_totp_secret() -> str:
     """
     Generate a new TOTP secret for a user.
     """
+    import pyotp  # 2FA is rare; keep it off the import path
+
     return pyotp.random_base32()
 
 
@@ -121,10 +119,12 @@ def get_totp_uri(email: str, secret: str, issuer: str = "TazaBolsyn") -> str:
     return totp.provisioning_uri(name=email, issuer_name=issuer)
 
 
-def new_totp(secret: str) -> pyotp.TOTP:
+def new_totp(secret: str) -> "pyotp.TOTP":
     """
     Create a TOTP instance from a secret.
     """
+    import pyotp
+
     return pyotp.TOTP(secret)
 
 
@@ -0,0 +1,134 @@
+"""
+One-time database bootstrap: create tables, apply migrations, seed the admin.
+
+Runs from the app lifespan (unless BOOTSTRAP_ON_STARTUP=0) or explicitly:
+
+    python -m backend.bootstrap
+
+A lock serialises concurrent runs, so when several workers start together
+one does the work and the others find it already done: a file lock for SQLite
+(and other single-host setups), an advisory lock on PostgreSQL so it also holds
+across hosts.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from . import models
+from .auth import get_password_hash
+from .database import DATABASE_BACKEND, Base, SessionLocal, engine
+from .utils.db_migrations import LATEST_VERSION, run_migrations, stored_version
+
+BOOTSTRAP_ON_STARTUP = os.getenv("BOOTSTRAP_ON_STARTUP", "1") == "1"
+_PG_ADVISORY_LOCK_KEY = 0x7A7A_B001
+
+
+def _lock_path() -> Path:
+    database = engine.url.database
+    if engine.url.get_backend_name() == "sqlite" and database and database != ":memory:":
+        return Path(f"{database}.bootstrap.lock")
+    return Path(tempfile.gettempdir()) / "tazabolsyn-bootstrap.lock"
+
+
+@contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    """
+    Exclusive advisory lock held for the duration of the block (blocks until acquired).
+    """
+    with open(path, "a+b") as handle:
+        if sys.platform == "win32":
+            import msvcrt
+
+            handle.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK gives up after ~10s; keep waiting
+            try:
+                yield
+            finally:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def _bootstrap_lock() -> Iterator[None]:
+    if DATABASE_BACKEND != "postgresql":
+        with _file_lock(_lock_path()):
+            yield
+        return
+    with engine.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": _PG_ADVISORY_LOCK_KEY})
+        conn.commit()  # the lock is session-level; don't sit idle in a transaction
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _PG_ADVISORY_LOCK_KEY})
+            conn.commit()
+
+
+def seed_admin_account() -> None:
+    """Create default admin account if it doesn't exist."""
+    db: Session = SessionLocal()
+    try:
+        admin_email = os.getenv("ADMIN_EMAIL", "admin@tazabolsyn.com")
+        admin_password = os.getenv("ADMIN_PASSWORD", "admin123")
+
+        existing_admin = db.query(models.User.id).filter(
+            models.User.email == admin_email
+        ).first()
+
+        if not existing_admin:
+            admin_user = models.User(
+                name="Admin",
+                surname="User",
+                email=admin_email,
+                password_hash=get_password_hash(admin_password),
+                role="admin",
+            )
+            db.add(admin_user)
+            db.commit()
+            print(f"✓ Admin account created: {admin_email} / {admin_password}")
+        else:
+            print(f"✓ Admin account already exists: {admin_email}")
+    except Exception as e:
+        print(f"✗ Error seeding admin account: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def bootstrap_database() -> None:
+    """
+    Create missing tables, apply pending migrations and seed the admin account.
+    Idempotent; once done, a rerun costs a version check and one lookup.
+    """
+    with _bootstrap_lock():
+        # An up-to-date schema skips create_all's per-table inspection and the
+        # migration runner's DDL; only a new or older database pays for them.
+        if stored_version(engine) < LATEST_VERSION:
+            Base.metadata.create_all(bind=engine)
+            run_migrations(engine)
+        seed_admin_account()
+
+
+if __name__ == "__main__":
+    bootstrap_database()
@@ -0,0 +1,322 @@
+"""
+Batch auto-dispatch: match pending orders to available cleaners in one pass.
+
+Cleaners only have a city, so every cleaner is placed at that city's centre
+(`utils.geo.CITY_CENTROIDS`) and cleaners in the same city are interchangeable.
+That turns the orders x cleaners distance matrix into orders x cities, which is
+small enough to compute in full, and the matching into a transport problem:
+cities supply as many slots as they have idle cleaners, each order takes at
+most one. It is solved exactly (most orders matched, then least total
+distance) by successive shortest paths over the cities; see
+`_min_cost_assignment`.
+"""
+from __future__ import annotations
+
+import heapq
+import math
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, exists, or_, select, update
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import session_scope
+from .serializers import ORDER_LOAD, order_to_schema
+from .utils.etag import bump_order_versions
+from .utils.geo import EARTH_RADIUS_KM, city_centroid
+from .utils.order_board import ORDER_TAKEN, order_board
+
+ACTIVE_STATUSES = {"accepted", "going", "started"}
+
+MAX_DISPATCH_DISTANCE_KM = float(os.getenv("DISPATCH_MAX_DISTANCE_KM", "30"))
+# 0 disables the periodic background pass; the admin endpoint always works.
+DISPATCH_INTERVAL_SECONDS = int(os.getenv("DISPATCH_INTERVAL_SECONDS", "0"))
+
+# (order_id, latitude, longitude, city), oldest first
+OrderRow = Tuple[int, Optional[float], Optional[float], Optional[str]]
+# (cleaner user_id, city)
+CleanerRow = Tuple[int, Optional[str]]
+
+
+@dataclass(frozen=True)
+class Assignment:
+    order_id: int
+    cleaner_id: int
+    distance_km: float
+
+
+@dataclass
+class DispatchResult:
+    pending_orders: int
+    available_cleaners: int
+    assignments: List[Assignment]
+
+
+_orders = models.Order.__table__
+_other_orders = _orders.alias("other_orders")
+# Built once: claims run in tight loops (dispatch) and under contention (take).
+_CLAIM = (
+    update(_orders)
+    .where(
+        _orders.c.id == bindparam("claim_order_id"),
+        _orders.c.cleaner_id.is_(None),
+        _orders.c.status == "pending",
+        ~exists().where(
+            _other_orders.c.cleaner_id == bindparam("claim_cleaner_id"),
+            # OR'd equalities rather than IN: expanding IN can't be used with executemany.
+            or_(*(_other_orders.c.status == s for s in sorted(ACTIVE_STATUSES))),
+        ),
+    )
+    .values(cleaner_id=bindparam("claim_cleaner_id"), status="accepted")
+)
+
+
+def claim_order(db: Session, order_id: int, cleaner_id: int) -> bool:
+    """
+    Atomically assign a pending order to a cleaner with no active order.
+    Returns False if the order was already taken or the cleaner is busy.
+    """
+    result = db.execute(_CLAIM, {"claim_order_id": order_id, "claim_cleaner_id": cleaner_id})
+    return result.rowcount == 1
+
+
+def claim_orders(db: Session, assignments: Sequence[Assignment]) -> List[Assignment]:
+    """
+    Batch form of `claim_order` (one executemany). Returns the assignments
+    that actually took effect.
+    """
+    if not assignments:
+        return []
+    db.execute(
+        _CLAIM,
+        [{"claim_order_id": a.order_id, "claim_cleaner_id": a.cleaner_id} for a in assignments],
+    )
+    owners = dict(
+        db.execute(
+            select(models.Order.id, models.Order.cleaner_id).where(
+                models.Order.id.in_([a.order_id for a in assignments])
+            )
+        ).all()
+    )
+    return [a for a in assignments if owners.get(a.order_id) == a.cleaner_id]
+
+
+def _min_cost_assignment(options: Sequence[Sequence[Tuple[int, float]]], capacity: Sequence[int]) -> List[Optional[int]]:
+    """
+    Give each order (`options[i]`: its reachable `(city, km)` pairs) at most one
+    city, no city more orders than its `capacity`, matching as many orders as
+    possible at the least total distance. Returns the city per order, or None.
+
+    Successive shortest paths: every augmenting path starts at a city with a
+    free slot, may pass orders on from city to city (a takes an order from b,
+    so b now has the free slot) and ends by taking an unassigned order. Paths
+    only visit cities, so Bellman-Ford runs over the handful of cities; heaps
+    keep the cheapest unassigned order per city and the cheapest order to pass
+    on per city pair, with stale entries dropped when they surface.
+    """
+    spare = list(capacity)
+    owner: List[Optional[int]] = [None] * len(options)
+    km = [dict(reachable) for reachable in options]
+    unassigned: List[List[Tuple[float, int]]] = [[] for _ in capacity]  # (km, order), older first on ties
+    for oi, reachable in enumerate(options):
+        for ci, d in reachable:
+            unassigned[ci].append((d, oi))
+    for heap in unassigned:
+        heapq.heapify(heap)
+    # (a, b) -> (extra km if a serves it instead, order) for orders held by b that a can reach
+    handovers: Dict[Tuple[int, int], List[Tuple[float, int]]] = {}
+
+    def assign(oi: int, ci: int) -> None:
+        owner[oi] = ci
+        for other, d in options[oi]:
+            if other != ci:
+                heapq.heappush(handovers.setdefault((other, ci), []), (d - km[oi][ci], oi))
+
+    def cheapest(heap: List[Tuple[float, int]], held_by: Optional[int]) -> Optional[Tuple[float, int]]:
+        while heap and owner[heap[0][1]] != held_by:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    cities = range(len(capacity))
+    while True:
+        dist = [0.0 if spare[ci] > 0 else math.inf for ci in cities]
+        via: List[Optional[Tuple[int, int]]] = [None] * len(capacity)  # (previous city, order handed over)
+        edges = []
+        for (a, b), heap in handovers.items():
+            top = cheapest(heap, b)
+            if top is not None:
+                edges.append((a, b, top))
+        for _ in cities:
+            relaxed = False
+            for a, b, (extra, oi) in edges:
+                if dist[a] + extra < dist[b] - 1e-9:
+                    dist[b] = dist[a] + extra
+                    via[b] = (a, oi)
+                    relaxed = True
+            if not relaxed:
+                break
+
+        best: Optional[Tuple[float, int, int]] = None
+        for ci in cities:
+            if dist[ci] < math.inf:
+                top = cheapest(unassigned[ci], None)
+                if top is not None and (best is None or (dist[ci] + top[0], top[1]) < best[:2]):
+                    best = (dist[ci] + top[0], top[1], ci)
+        if best is None:
+            return owner
+
+        _, oi, ci = best
+        assign(oi, ci)
+        while via[ci] is not None:
+            prev_ci, handed = via[ci]
+            assign(handed, prev_ci)
+            ci = prev_ci
+        spare[ci] -= 1
+
+
+def plan_assignments(
+    orders: Sequence[OrderRow],
+    cleaners: Iterable[CleanerRow],
+    max_distance_km: float = MAX_DISPATCH_DISTANCE_KM,
+) -> List[Assignment]:
+    """
+    Pure matching step: at most one order per cleaner, as many orders as
+    possible, and among those matchings the least total distance. Orders
+    without coordinates fall back to their city centre; cleaners in unknown
+    cities are skipped.
+    """
+    pools: Dict[Tuple[float, float], List[int]] = {}
+    for user_id, city in cleaners:
+        centre = city_centroid(city)
+        if centre is not None:
+            pools.setdefault(centre, []).append(user_id)
+    if not pools:
+        return []
+
+    order_ids: List[int] = []
+    points: List[Tuple[float, float, float]] = []  # (lat rad, lng rad, cos lat)
+    for order_id, lat, lng, city in orders:
+        if lat is None or lng is None:
+            centre = city_centroid(city)
+            if centre is None:
+                continue
+            lat, lng = centre
+        lat_r = math.radians(lat)
+        order_ids.append(order_id)
+        points.append((lat_r, math.radians(lng), math.cos(lat_r)))
+
+    # Compare in haversine space so rejected pairs never pay for asin/sqrt.
+    h_max = math.sin(max_distance_km / (2 * EARTH_RADIUS_KM)) ** 2
+    centres = list(pools)
+    options: List[List[Tuple[int, float]]] = [[] for _ in points]
+    for ci, (clat, clng) in enumerate(centres):
+        lat_c, lng_c = math.radians(clat), math.radians(clng)
+        cos_c = math.cos(lat_c)
+        sin = math.sin
+        for oi, (lat_o, lng_o, cos_o) in enumerate(points):
+            h = sin((lat_o - lat_c) / 2) ** 2 + cos_o * cos_c * sin((lng_o - lng_c) / 2) ** 2
+            if h <= h_max:
+                options[oi].append((ci, 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))))
+
+    owner = _min_cost_assignment(options, [len(pools[centre]) for centre in centres])
+    assignments: List[Assignment] = []
+    for oi, ci in enumerate(owner):  # oldest first
+        if ci is not None:
+            assignments.append(
+                Assignment(
+                    order_id=order_ids[oi],
+                    cleaner_id=pools[centres[ci]].pop(),
+                    distance_km=dict(options[oi])[ci],
+                )
+            )
+    return assignments
+
+
+def run_dispatch(db: Session, max_distance_km: float = MAX_DISPATCH_DISTANCE_KM) -> DispatchResult:
+    """
+    Match every pending order against every idle cleaner and commit all
+    assignments in one transaction. Each assignment is a conditional claim,
+    so orders taken manually in the meantime are simply skipped.
+    """
+    orders = db.execute(
+        select(models.Order.id, models.Order.latitude, models.Order.longitude, models.Order.city)
+        .where(models.Order.cleaner_id.is_(None), models.Order.status == "pending")
+        .order_by(models.Order.created_at, models.Order.id)
+    ).all()
+    busy = select(models.Order.cleaner_id).where(
+        models.Order.cleaner_id.is_not(None), models.Order.status.in_(list(ACTIVE_STATUSES))
+    )
+    cleaners = db.execute(
+        select(models.Cleaner.user_id, models.User.city)
+        .join(models.User, models.User.id == models.Cleaner.user_id)
+        .where(
+            models.Cleaner.availability.is_(True),
+            models.User.role == "cleaner",
+            models.Cleaner.user_id.not_in(busy),
+        )
+        .order_by(models.Cleaner.user_id.desc())
+    ).all()
+
+    planned = plan_assignments(orders, cleaners, max_distance_km)
+    committed = claim_orders(db, planned)
+    if committed:
+        db.execute(
+            update(models.Cleaner)
+            .where(models.Cleaner.user_id.in_([a.cleaner_id for a in committed]))
+            .values(availability=False)
+            .execution_options(synchronize_session=False)
+        )
+        customers = db.execute(
+            select(models.Order.user_id).where(models.Order.id.in_([a.order_id for a in committed]))
+        ).scalars()
+        bump_order_versions(db, *customers, *(a.cleaner_id for a in committed))
+    db.commit()
+
+    if committed:
+        assigned = (
+            db.query(models.Order)
+            .options(*ORDER_LOAD)
+            .filter(models.Order.id.in_([a.order_id for a in committed]))
+        )
+        for order in assigned:
+            order_board.publish(ORDER_TAKEN, order_to_schema(order))
+
+    return DispatchResult(
+        pending_orders=len(orders),
+        available_cleaners=len(cleaners),
+        assignments=committed,
+    )
+
+
+_stop_periodic = threading.Event()
+
+
+def start_periodic_dispatch(interval_seconds: int = DISPATCH_INTERVAL_SECONDS) -> Optional[threading.Thread]:
+    """
+    Run `run_dispatch` every `interval_seconds` on a daemon thread.
+    Safe with several workers: claims are conditional, so passes never collide.
+    """
+    if interval_seconds <= 0:
+        return None
+    _stop_periodic.clear()
+
+    def loop() -> None:
+        while not _stop_periodic.wait(interval_seconds):
+            try:
+                with session_scope() as db:
+                    result = run_dispatch(db)
+                if result.assignments:
+                    print(f"[DISPATCH] Assigned {len(result.assignments)} of {result.pending_orders} pending orders")
+            except Exception as e:
+                print(f"[DISPATCH ERROR] Periodic dispatch failed: {e}")
+
+    thread = threading.Thread(target=loop, name="auto-dispatch", daemon=True)
+    thread.start()
+    return thread
+
+
+def stop_periodic_dispatch() -> None:
+    _stop_periodic.set()
@@ -1,12 +1,44 @@
 """
-Email service for sending password reset codes via SMTP.
-Uses environment variables for SMTP configuration.
+Email service: precompiled templates, a durable outbox and a background sender.
+
+Requests only enqueue (`enqueue_email`, in the same transaction as the change
+that triggers the mail) and wake the sender. The sender thread delivers due
+rows in batches over one reused, authenticated SMTP connection and retries
+failures with exponential backoff. Several workers may each run a sender:
+rows are claimed with a lease, so a sender that dies mid-batch only delays its
+rows until the lease runs out.
+
+SMTP configuration comes from environment variables.
 """
+from __future__ import annotations
+
+import json
 import os
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from typing import Optional
+import random
+import string
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import SessionLocal
+
+if TYPE_CHECKING:
+    import smtplib
+
+EMAIL_SENDER_INTERVAL_SECONDS = float(os.getenv("EMAIL_SENDER_INTERVAL_SECONDS", "5"))  # poll; enqueues also wake it
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "50"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "6"))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "30"))
+EMAIL_RETRY_MAX_SECONDS = float(os.getenv("EMAIL_RETRY_MAX_SECONDS", "3600"))
+SMTP_IDLE_TIMEOUT_SECONDS = float(os.getenv("SMTP_IDLE_TIMEOUT_SECONDS", "60"))
+_CLAIM_LEASE_SECONDS = 300
 
 
 def get_smtp_config() -> Optional[dict]:
@@ -30,36 +62,32 @@ def get_smtp_config() -> Optional[dict]:
             "user": smtp_user,
             "password": smtp_password,
             "from_email": smtp_from,
+            "starttls": os.getenv("SMTP_STARTTLS", "1") == "1",
         }
     except ValueError:
         return None
 
 
-def send_password_reset_email(email: str, reset_code: str) -> bool:
-    """
-    Send a password reset code email to the user.
-    Returns True if email was sent successfully, False otherwise.
-    """
-    config = get_smtp_config()
-    if not config:
-        # SMTP not configured (demo mode). Do not log sensitive codes.
-        print(f"[EMAIL] SMTP is not configured. Password reset email not sent to {email}.")
-        return False
+# ---- templates ----
 
-    try:
-        # Create message
-        msg = MIMEMultipart("alternative")
-        msg["Subject"] = "TazaBolsyn - Password Reset Code"
-        msg["From"] = config["from_email"]
-        msg["To"] = email
-
-        # Email body
-        text_content = f"""
+@dataclass(frozen=True)
+class EmailTemplate:
+    """Parsed once at import; sending only substitutes the variables."""
+
+    subject: string.Template
+    text: string.Template
+    html: string.Template
+
+
+TEMPLATES: Dict[str, EmailTemplate] = {
+    "password_reset": EmailTemplate(
+        subject=string.Template("TazaBolsyn - Password Reset Code"),
+        text=string.Template("""
 Hello,
 
 You requested a password reset for your TazaBolsyn account.
 
-Your reset code is: {reset_code}
+Your reset code is: $code
 
 This code will expire in 15 minutes.
 
@@ -67,19 +95,18 @@ If you did not request this reset, please ignore this email.
 
 Best regards,
 TazaBolsyn Team
-"""
-
-        html_content = f"""
+"""),
+        html=string.Template("""
 <!DOCTYPE html>
 <html>
 <head>
     <meta charset="UTF-8">
     <style>
-        body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-        .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-        .code {{ font-size: 24px; font-weight: bold; color: #0066cc; letter-spacing: 4px; 
-                padding: 15px; background: #f0f0f0; text-align: center; margin: 20px 0; }}
-        .footer {{ margin-top: 30px; font-size: 12px; color: #666; }}
+        body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+        .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+        .code { font-size: 24px; font-weight: bold; color: #0066cc; letter-spacing: 4px;
+                padding: 15px; background: #f0f0f0; text-align: center; margin: 20px 0; }
+        .footer { margin-top: 30px; font-size: 12px; color: #666; }
     </style>
 </head>
 <body>
@@ -87,7 +114,7 @@ TazaBolsyn Team
         <h2>Password Reset Request</h2>
         <p>Hello,</p>
         <p>You requested a password reset for your TazaBolsyn account.</p>
-        <div class="code">{reset_code}</div>
+        <div class="code">$code</div>
         <p>This code will expire in 15 minutes.</p>
         <p>If you did not request this reset, please ignore this email.</p>
         <div class="footer">
@@ -96,26 +123,259 @@ TazaBolsyn Team
     </div>
 </body>
 </html>
-"""
+"""),
+    ),
+}
+
+
+def render_email(template: str, from_email: str, to_email: str, context: Dict[str, Any]):
+    """
+    Build the multipart (plain text + HTML) message for a template.
+    """
+    # Imported here so the app doesn't load the email package until a mail is sent.
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
 
-        # Attach parts
-        part1 = MIMEText(text_content, "plain")
-        part2 = MIMEText(html_content, "html")
-        msg.attach(part1)
-        msg.attach(part2)
+    tmpl = TEMPLATES[template]
+    msg = MIMEMultipart("alternative")
+    msg["Subject"] = tmpl.subject.substitute(context)
+    msg["From"] = from_email
+    msg["To"] = to_email
+    msg.attach(MIMEText(tmpl.text.substitute(context), "plain"))
+    msg.attach(MIMEText(tmpl.html.substitute(context), "html"))
+    return msg
+
+
+# ---- outbox ----
+
+def enqueue_email(db: Session, to_email: str, template: str, **context: Any) -> Optional[models.EmailOutbox]:
+    """
+    Add an email to the outbox in the caller's transaction; the caller commits
+    and then calls `email_sender.wake()`. Returns None if SMTP is not configured.
+    """
+    if template not in TEMPLATES:
+        raise KeyError(f"Unknown email template: {template}")
+    if get_smtp_config() is None:
+        # SMTP not configured (demo mode). Do not log sensitive codes.
+        print(f"[EMAIL] SMTP is not configured. Email '{template}' not sent to {to_email}.")
+        return None
+    row = models.EmailOutbox(to_email=to_email, template=template, context=json.dumps(context))
+    db.add(row)
+    return row
 
-        # Send email
-        with smtplib.SMTP(config["host"], config["port"]) as server:
-            server.starttls()
-            server.login(config["user"], config["password"])
-            server.send_message(msg)
 
-        print(f"[EMAIL] Password reset code sent to {email}")
+def enqueue_password_reset_email(db: Session, email: str, reset_code: str) -> Optional[models.EmailOutbox]:
+    return enqueue_email(db, email, "password_reset", code=reset_code)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _retry_delay(attempts: int) -> float:
+    delay = min(EMAIL_RETRY_MAX_SECONDS, EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _is_smtp_reply(error: Exception) -> bool:
+    """The server answered with an error code (the connection itself is fine)."""
+    import smtplib
+
+    return isinstance(error, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused))
+
+
+def _is_permanent(error: Exception) -> bool:
+    import smtplib
+
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
         return True
+    return isinstance(error, smtplib.SMTPResponseException) and 500 <= error.smtp_code < 600
+
+
+class OutboxSender:
+    """
+    Background thread that drains `email_outbox` over one SMTP connection.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = EMAIL_BATCH_SIZE,
+        interval_seconds: float = EMAIL_SENDER_INTERVAL_SECONDS,
+        max_attempts: int = EMAIL_MAX_ATTEMPTS,
+    ) -> None:
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self.max_attempts = max_attempts
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._smtp: Optional["smtplib.SMTP"] = None
+        self._smtp_used_at = 0.0
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.connections = 0
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def start(self) -> Optional[threading.Thread]:
+        if self._thread is not None and self._thread.is_alive():
+            return None
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="email-outbox", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                while self.run_once() == self.batch_size and not self._stop.is_set():
+                    pass  # backlog: keep going without waiting
+            except Exception as e:
+                print(f"[EMAIL ERROR] Outbox pass failed: {e}")
+            if self._smtp is not None and time.monotonic() - self._smtp_used_at > SMTP_IDLE_TIMEOUT_SECONDS:
+                self._disconnect()
+            self._wake.wait(self.interval_seconds)
+            self._wake.clear()
+        self._disconnect()
+
+    def run_once(self) -> int:
+        """
+        Claim and send one batch of due emails; returns how many were claimed.
+        """
+        config = get_smtp_config()
+        if config is None:
+            return 0
+        rows = self._claim()
+        if not rows:
+            return 0
+
+        sent: List[int] = []
+        failures: List[tuple] = []
+        for row in rows:
+            try:
+                msg = render_email(row.template, config["from_email"], row.to_email, json.loads(row.context or "{}"))
+                self._send(config, msg)
+                sent.append(row.id)
+            except Exception as e:
+                if not _is_smtp_reply(e):
+                    self._disconnect()  # connection state unknown
+                failures.append((row, e))
+        self._record(sent, failures)
+        return len(rows)
+
+    def _claim(self) -> list:
+        now = _utcnow()
+        token = uuid.uuid4().hex
+        outbox = models.EmailOutbox
+        with SessionLocal() as db:
+            due = db.scalars(
+                select(outbox.id)
+                .where(outbox.status == "pending", outbox.next_attempt_at <= now)
+                .order_by(outbox.next_attempt_at, outbox.id)
+                .limit(self.batch_size)
+            ).all()
+            if not due:
+                return []
+            # Conditional on still being due, so a row another sender got first is skipped.
+            db.execute(
+                update(outbox)
+                .where(outbox.id.in_(due), outbox.status == "pending", outbox.next_attempt_at <= now)
+                .values(
+                    claimed_by=token,
+                    attempts=outbox.attempts + 1,
+                    next_attempt_at=now + timedelta(seconds=_CLAIM_LEASE_SECONDS),
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            return db.execute(
+                select(outbox.id, outbox.to_email, outbox.template, outbox.context, outbox.attempts)
+                .where(outbox.claimed_by == token)
+                .order_by(outbox.id)
+            ).all()
+
+    def _record(self, sent: List[int], failures: List[tuple]) -> None:
+        now = _utcnow()
+        outbox = models.EmailOutbox
+        with SessionLocal() as db:
+            if sent:
+                db.execute(
+                    update(outbox)
+                    .where(outbox.id.in_(sent))
+                    .values(status="sent", sent_at=now, context=None, claimed_by=None, last_error=None)
+                    .execution_options(synchronize_session=False)
+                )
+            for row, error in failures:
+                give_up = _is_permanent(error) or row.attempts >= self.max_attempts
+                db.execute(
+                    update(outbox)
+                    .where(outbox.id == row.id)
+                    .values(
+                        status="failed" if give_up else "pending",
+                        next_attempt_at=now + timedelta(seconds=0 if give_up else _retry_delay(row.attempts)),
+                        claimed_by=None,
+                        last_error=str(error)[:500],
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                if give_up:
+                    self.failed += 1
+                    print(f"[EMAIL ERROR] Giving up on email {row.id} to {row.to_email} after {row.attempts} attempt(s): {error}")
+                else:
+                    self.retried += 1
+            db.commit()
+        self.sent += len(sent)
+        if sent:
+            print(f"[EMAIL] Sent {len(sent)} email(s)")
+
+    def _send(self, config: dict, msg) -> None:
+        import smtplib
+
+        reused = self._smtp is not None
+        try:
+            self._connection(config).send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            if not reused:
+                raise
+            # The server dropped the idle connection; reconnect once.
+            self._disconnect()
+            self._connection(config).send_message(msg)
+        self._smtp_used_at = time.monotonic()
+
+    def _connection(self, config: dict) -> "smtplib.SMTP":
+        # Imported here so the app doesn't load smtplib/ssl until a mail is sent.
+        import smtplib
+
+        if self._smtp is None:
+            smtp = smtplib.SMTP(config["host"], config["port"], timeout=30)
+            try:
+                if config["starttls"]:
+                    smtp.starttls()
+                smtp.login(config["user"], config["password"])
+            except Exception:
+                smtp.close()
+                raise
+            self._smtp = smtp
+            self.connections += 1
+        return self._smtp
 
-    except Exception as e:
-        print(f"[EMAIL ERROR] Failed to send email to {email}: {e}")
-        # Fallback: do not log sensitive codes
-        return False
+    def _disconnect(self) -> None:
+        smtp, self._smtp = self._smtp, None
+        if smtp is None:
+            return
+        try:
+            smtp.quit()
+        except Exception:
+            smtp.close()
 
 
+email_sender = OutboxSender()
@@ -1,65 +1,54 @@
+from contextlib import asynccontextmanager
 from pathlib import Path
-import os
+from typing import AsyncIterator
 
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy.orm import Session
 
 # Load environment variables from .env file (if present)
 load_dotenv()
 
 # IMPORTANT: use package-relative import so `backend` works as a package
-from .database import Base, engine, SessionLocal
-from .utils.db_migrations import apply_sqlite_migrations
+from .bootstrap import BOOTSTRAP_ON_STARTUP, bootstrap_database
 from .routers import auth as auth_router
 from .routers import users as users_router
 from .routers import orders as orders_router
 from .routers import cleaners as cleaners_router
 from .routers import admin as admin_router
-from . import models
-from .auth import get_password_hash
-
-# Create database tables (for development / simple deployments).
-# In production, prefer using Alembic migrations.
-Base.metadata.create_all(bind=engine)
-apply_sqlite_migrations(engine)
-
-# Seed admin account if it doesn't exist
-def seed_admin_account():
-    """Create default admin account if it doesn't exist."""
-    db: Session = SessionLocal()
-    try:
-        admin_email = os.getenv("ADMIN_EMAIL", "admin@tazabolsyn.com")
-        admin_password = os.getenv("ADMIN_PASSWORD", "admin123")
-        
-        existing_admin = db.query(models.User).filter(
-            models.User.email == admin_email
-        ).first()
-        
-        if not existing_admin:
-            admin_user = models.User(
-                name="Admin",
-                surname="User",
-                email=admin_email,
-                password_hash=get_password_hash(admin_password),
-                role="admin",
-            )
-            db.add(admin_user)
-            db.commit()
-            print(f"✓ Admin account created: {admin_email} / {admin_password}")
-        else:
-            print(f"✓ Admin account already exists: {admin_email}")
-    except Exception as e:
-        print(f"✗ Error seeding admin account: {e}")
-        db.rollback()
-    finally:
-        db.close()
-
-seed_admin_account()
-
-app = FastAPI(title="TazaBolsyn API", version="1.0.0")
+from .routers import pricing as pricing_router
+from .dispatch import start_periodic_dispatch, stop_periodic_dispatch
+from .email_service import email_sender
+from .pricing import pricing_catalog
+from .utils.metrics import MetricsMiddleware, metrics_response
+from .utils.password_hashing import password_hasher
+from .utils.query_stats import QueryStatsMiddleware
+from .utils.rate_limit import limiter
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Bootstrap runs here rather than at import time so importing the app stays
+    # cheap; with BOOTSTRAP_ON_STARTUP=0 run `python -m backend.bootstrap` once.
+    if BOOTSTRAP_ON_STARTUP:
+        await run_in_threadpool(bootstrap_database)
+    # Compile the pricing catalog before the first order needs it.
+    await run_in_threadpool(pricing_catalog.load)
+    # Spawn the bcrypt workers up front so the first logins don't pay for it.
+    await run_in_threadpool(password_hasher.start)
+    start_periodic_dispatch()
+    limiter.start_sweeper()
+    email_sender.start()
+    yield
+    email_sender.stop()
+    limiter.stop_sweeper()
+    stop_periodic_dispatch()
+    password_hasher.shutdown()
+
+
+app = FastAPI(title="TazaBolsyn API", version="1.0.0", lifespan=lifespan)
 
 # CORS configuration - adjust origins for your frontend URLs
 origins = [
@@ -77,6 +66,9 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Outermost, so Server-Timing and the latency histograms cover everything below them.
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 # Mount static frontend (optional; you can also serve via a separate static server)
 BASE_DIR = Path(__file__).resolve().parent
@@ -90,11 +82,20 @@ def read_root():
     return {"message": "TazaBolsyn API is running"}
 
 
+@app.get("/metrics", tags=["health"], include_in_schema=False)
+def read_metrics(request: Request) -> Response:
+    """
+    Prometheus metrics for this process (see `utils/metrics.py`).
+    """
+    return metrics_response(request)
+
+
 # Routers
 app.include_router(auth_router.router, prefix="/auth", tags=["auth"])
 app.include_router(users_router.router, prefix="/users", tags=["users"])
 app.include_router(orders_router.router, prefix="/orders", tags=["orders"])
 app.include_router(cleaners_router.router, prefix="/cleaner", tags=["cleaner"])
 app.include_router(admin_router.router, prefix="/admin", tags=["admin"])
+app.include_router(pricing_router.router, prefix="/pricing", tags=["pricing"])
 
 
@@ -6,14 +6,46 @@ from sqlalchemy import (
     DateTime,
     Float,
     ForeignKey,
+    Index,
     Integer,
+    LargeBinary,
     String,
+    Text,
+    TypeDecorator,
 )
 from sqlalchemy.orm import relationship
 
 from .database import Base
 
 
+class UTCDateTime(TypeDecorator):
+    """
+    `DateTime(timezone=True)` that always reads back as an aware UTC datetime.
+    SQLite keeps no offset (values are written in UTC) and PostgreSQL answers
+    in the session time zone, so without this a row serialised straight after
+    its INSERT and the same row read back later would differ.
+    """
+
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    @property
+    def python_type(self) -> type:
+        return datetime  # keyset cursors decode by the key column's type
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc)
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -29,7 +61,7 @@ class User(Base):
     city = Column(String(120), nullable=True)
     reward_points = Column(Integer, default=0, nullable=False)
     reset_code = Column(String(6), nullable=True)
-    reset_expires_at = Column(DateTime(timezone=True), nullable=True)
+    reset_expires_at = Column(UTCDateTime, nullable=True)
 
     # Relationships
     addresses = relationship(
@@ -49,7 +81,7 @@ class Address(Base):
     __tablename__ = "addresses"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     address = Column(String(255), nullable=False)
     apartment = Column(String(50), nullable=True)
     latitude = Column(Float, nullable=True)
@@ -69,7 +101,7 @@ class Order(Base):
         String(50), nullable=False, default="pending"
     )  # pending, accepted, going, started, finished, paid
     total_price = Column(Float, nullable=False, default=0.0)
-    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    created_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc))
 
     # Order details
     property_type = Column(String(50), nullable=True)  # Apartment / Private House
@@ -82,6 +114,7 @@ class Order(Base):
     phone = Column(String(50), nullable=True)
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
+    geo_cell = Column(Integer, nullable=True)  # see utils.geo.geo_cell
 
     user = relationship("User", foreign_keys=[user_id], back_populates="orders")
     cleaner = relationship("User", foreign_keys=[cleaner_id])
@@ -89,12 +122,24 @@ class Order(Base):
         "OrderItem", back_populates="order", cascade="all, delete-orphan"
     )
 
+    __table_args__ = (
+        # "Near me" lookups for available orders: status='pending' AND geo_cell BETWEEN ...
+        Index("ix_orders_status_geo_cell", "status", "geo_cell"),
+        # Keyset pagination on (created_at, id) for each order listing's filter.
+        Index("ix_orders_created_at_id", "created_at", "id"),
+        Index("ix_orders_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_orders_cleaner_id_created_at_id", "cleaner_id", "created_at", "id"),
+        Index("ix_orders_status_cleaner_id_created_at_id", "status", "cleaner_id", "created_at", "id"),
+        # "Does this cleaner already have an active order?" (take, claim, status updates).
+        Index("ix_orders_cleaner_id_status", "cleaner_id", "status"),
+    )
+
 
 class OrderItem(Base):
     __tablename__ = "order_items"
 
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
     service_name = Column(String(255), nullable=False)
     quantity = Column(Integer, nullable=False, default=1)
     price = Column(Float, nullable=False)  # price per unit
@@ -120,9 +165,129 @@ class Feedback(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     comment = Column(String(1000), nullable=False)
     rating = Column(Integer, nullable=True)  # Optional rating 1-5
-    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    created_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc))
 
     order = relationship("Order", foreign_keys=[order_id])
     user = relationship("User", foreign_keys=[user_id])
 
+    __table_args__ = (
+        Index("ix_feedbacks_created_at_id", "created_at", "id"),
+        # One feedback per (order, user) check on submit.
+        Index("ix_feedbacks_order_id_user_id", "order_id", "user_id"),
+    )
+
+
+class EmailOutbox(Base):
+    """
+    Outgoing email, written in the same transaction as the change that triggers
+    it and delivered by the background sender in `email_service`.
+    """
+
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    to_email = Column(String(255), nullable=False)
+    template = Column(String(50), nullable=False)  # key of email_service.TEMPLATES
+    context = Column(Text, nullable=True)  # JSON template variables; cleared once sent
+    status = Column(String(20), default="pending", nullable=False)  # pending | sent | failed
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    claimed_by = Column(String(32), nullable=True)
+    last_error = Column(String(500), nullable=True)
+    created_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc))
+    sent_at = Column(UTCDateTime, nullable=True)
+
+    __table_args__ = (
+        # The sender's "what is due" scan.
+        Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+
+class ResourceVersion(Base):
+    """
+    Change counter behind the ETags of cacheable GET endpoints (see
+    `utils.etag`). Bumped in the same transaction as the change it covers.
+    """
+
+    __tablename__ = "resource_versions"
+
+    key = Column(String(64), primary_key=True)  # e.g. "user:12", "orders:12", "orders"
+    version = Column(Integer, default=0, nullable=False)
+
 
+class PricingService(Base):
+    """
+    Bookable extra service and its standard price (see `pricing`).
+    """
+
+    __tablename__ = "pricing_services"
+
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String(50), unique=True, nullable=False)  # stable id used by the calculator
+    name = Column(String(255), nullable=False)  # stored on order items as service_name
+    price = Column(Float, nullable=False)
+    position = Column(Integer, default=0, nullable=False)  # display order
+    active = Column(Boolean, default=True, nullable=False)
+
+
+class PricingCityAdjustment(Base):
+    """
+    Amount added to every service price for orders in a city ("*" = any city
+    not listed). Orders without a city get standard prices.
+    """
+
+    __tablename__ = "pricing_city_adjustments"
+
+    city = Column(String(120), primary_key=True)
+    adjustment = Column(Float, default=0.0, nullable=False)  # e.g. -500 for a 500₸ discount
+
+
+class PricingBaseRate(Base):
+    """
+    Base cleaning price per cleaning type, plus per-room and per-bathroom rates.
+    """
+
+    __tablename__ = "pricing_base_rates"
+
+    cleaning_type = Column(String(50), primary_key=True)  # standard | deep
+    base = Column(Float, nullable=False)
+    per_room = Column(Float, default=0.0, nullable=False)
+    per_bathroom = Column(Float, default=0.0, nullable=False)
+
+
+class IdempotencyKey(Base):
+    """
+    First successful response to a request sent with an `Idempotency-Key`,
+    replayed to retries until it expires (see `utils.idempotency`).
+    """
+
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True, autoincrement=False)
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(32), nullable=False)  # hash of method, path and body
+    status_code = Column(Integer, nullable=False)
+    body = Column(LargeBinary, nullable=False)  # the JSON response as sent
+    created_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    expires_at = Column(UTCDateTime, nullable=False, index=True)  # the sweep's range scan
+
+
+class RewardLedgerEntry(Base):
+    """
+    Append-only reward-point history (see `rewards`). Entries are never
+    updated or deleted; `users.reward_points` caches their sum per user.
+    """
+
+    __tablename__ = "reward_ledger"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=True)
+    points = Column(Integer, nullable=False)  # negative for corrections and redemptions
+    reason = Column(String(50), nullable=False)  # order | opening
+    created_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    __table_args__ = (
+        # Per-user history and the balance rebuild's grouped sum.
+        Index("ix_reward_ledger_user_id_id", "user_id", "id"),
+    )
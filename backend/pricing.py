@@ -0,0 +1,256 @@
+"""
+Server-side pricing: extra services, per-city adjustments and base rates.
+
+The catalog lives in three small tables (`pricing_services`,
+`pricing_city_adjustments`, `pricing_base_rates`), seeded by migration 7 with
+the prices the calculator used to hard-code. Each process compiles them into
+a `PricingCatalog` (dicts keyed the way orders look prices up, plus the JSON
+body and ETag of `/pricing/catalog`) and keeps it in memory. The tables are
+re-read at most every `PRICING_RELOAD_SECONDS`; a new catalog is swapped in
+only when the rows changed, so edits apply without a restart.
+
+Quoting an order is a few dict lookups (`benchmarks/pricing.py`):
+
+    total = base(cleaning type) + rooms * per_room + bathrooms * per_bathroom
+            + sum(quantity * max(0, service price + city adjustment))
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import Connection, insert, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from . import models
+from .database import read_engine
+
+PRICING_RELOAD_SECONDS = float(os.getenv("PRICING_RELOAD_SECONDS", "30"))
+CATALOG_CACHE_CONTROL = "public, max-age=60"
+ANY_CITY = "*"
+DEFAULT_CLEANING_TYPE = "standard"
+
+# What the calculator shipped with; migration 7 seeds the tables from these.
+DEFAULT_SERVICES: List[Tuple[str, str, float]] = [
+    ("window", "Window cleaning", 4200),
+    ("fridge", "Refrigerator cleaning", 3500),
+    ("dishwashing", "Dishwashing (hour)", 3500),
+    ("ironing", "Ironing (hour)", 3500),
+    ("closet", "Closet / Pantry", 2500),
+    ("chandelier", "Chandelier", 2000),
+    ("balcony", "Balcony", 6000),
+    ("wall", "Wall washing (10 m²)", 10000),
+    ("blinds", "Blinds (per m²)", 1500),
+    ("extra_cleaner", "Extra cleaner", 7000),
+    ("kitchen_set", "Kitchen set", 8000),
+    ("oven", "Oven", 4500),
+    ("microwave", "Microwave", 2000),
+    ("dishwasher", "Dishwasher", 2000),
+    ("curtains", "Curtains", 2500),
+    ("ceiling", "Ceiling (per m²)", 1500),
+    ("key_delivery", "Key delivery", 2000),
+]
+# Standard prices in the three largest cities, 500₸ off everywhere else.
+DEFAULT_CITY_ADJUSTMENTS: Dict[str, float] = {"Almaty": 0, "Astana": 0, "Shymkent": 0, ANY_CITY: -500}
+DEFAULT_BASE_RATES: Dict[str, Tuple[float, float, float]] = {
+    "standard": (4000, 2000, 1500),
+    "deep": (6000, 2000, 1500),
+}
+
+
+class PricingError(ValueError):
+    """
+    The order asks for something the catalog does not price.
+    """
+
+
+class Service(NamedTuple):
+    key: str
+    name: str
+    price: float
+
+
+class BaseRate(NamedTuple):
+    base: float
+    per_room: float
+    per_bathroom: float
+
+
+class Quote(NamedTuple):
+    items: List[Tuple[str, int, float]]  # (service name, quantity, unit price)
+    total: float
+
+
+class PricingCatalog:
+    def __init__(
+        self, services: List[Service], city_adjustments: Dict[str, float], base_rates: Dict[str, BaseRate]
+    ) -> None:
+        self.services = services
+        self._by_name: Dict[str, Service] = {}
+        for service in services:
+            self._by_name[service.key.lower()] = service
+            self._by_name[service.name.strip().lower()] = service
+        self._cities = {city.strip().lower(): adj for city, adj in city_adjustments.items() if city != ANY_CITY}
+        self._other_cities = city_adjustments.get(ANY_CITY, 0.0)
+        self._base_rates = {kind.lower(): rate for kind, rate in base_rates.items()}
+
+        document = {
+            "services": [s._asdict() for s in services],
+            "city_adjustments": {c: a for c, a in city_adjustments.items() if c != ANY_CITY},
+            "other_city_adjustment": self._other_cities,
+            "base_rates": {kind: rate._asdict() for kind, rate in base_rates.items()},
+        }
+        self.body = json.dumps(document, ensure_ascii=False, separators=(",", ":")).encode()
+        self.etag = f'W/"{hashlib.blake2b(self.body, digest_size=12).hexdigest()}"'
+
+    def city_adjustment(self, city: Optional[str]) -> float:
+        if not city or not city.strip():
+            return 0.0
+        return self._cities.get(city.strip().lower(), self._other_cities)
+
+    def quote(
+        self,
+        items: Iterable[Tuple[str, int]],
+        city: Optional[str] = None,
+        cleaning_type: Optional[str] = None,
+        rooms: Optional[int] = None,
+        bathrooms: Optional[int] = None,
+    ) -> Quote:
+        """
+        Catalog prices for (service name or key, quantity) pairs plus the base
+        cleaning price. Raises `PricingError` for unknown services or types.
+        """
+        rate = self._base_rates.get((cleaning_type or DEFAULT_CLEANING_TYPE).strip().lower())
+        if rate is None:
+            raise PricingError(f"Unknown cleaning type: {cleaning_type}")
+        total = rate.base + (rooms or 0) * rate.per_room + (bathrooms or 0) * rate.per_bathroom
+
+        adjustment = self.city_adjustment(city)
+        lines = []
+        for name, quantity in items:
+            service = self._by_name.get(name.strip().lower())
+            if service is None:
+                raise PricingError(f"Unknown service: {name}")
+            unit_price = max(0.0, service.price + adjustment)
+            lines.append((service.name, quantity, unit_price))
+            total += unit_price * quantity
+        return Quote(lines, total)
+
+
+def default_catalog() -> PricingCatalog:
+    return PricingCatalog(
+        [Service(*row) for row in DEFAULT_SERVICES],
+        DEFAULT_CITY_ADJUSTMENTS,
+        {kind: BaseRate(*rate) for kind, rate in DEFAULT_BASE_RATES.items()},
+    )
+
+
+def read_catalog(conn: Connection) -> PricingCatalog:
+    services = [
+        Service(*row)
+        for row in conn.execute(
+            select(models.PricingService.key, models.PricingService.name, models.PricingService.price)
+            .where(models.PricingService.active.is_(True))
+            .order_by(models.PricingService.position, models.PricingService.id)
+        )
+    ]
+    cities = dict(
+        conn.execute(select(models.PricingCityAdjustment.city, models.PricingCityAdjustment.adjustment)).all()
+    )
+    base_rates = {
+        kind: BaseRate(base, per_room, per_bathroom)
+        for kind, base, per_room, per_bathroom in conn.execute(
+            select(
+                models.PricingBaseRate.cleaning_type,
+                models.PricingBaseRate.base,
+                models.PricingBaseRate.per_room,
+                models.PricingBaseRate.per_bathroom,
+            )
+        )
+    }
+    return PricingCatalog(services, cities, base_rates)
+
+
+def seed_catalog(conn: Connection) -> None:
+    """
+    Fill empty pricing tables with the defaults (used by migration 7).
+    """
+    if conn.execute(select(models.PricingService.id).limit(1)).first() is None:
+        conn.execute(
+            insert(models.PricingService),
+            [
+                {"key": key, "name": name, "price": price, "position": position, "active": True}
+                for position, (key, name, price) in enumerate(DEFAULT_SERVICES)
+            ],
+        )
+    if conn.execute(select(models.PricingCityAdjustment.city).limit(1)).first() is None:
+        conn.execute(
+            insert(models.PricingCityAdjustment),
+            [{"city": city, "adjustment": adj} for city, adj in DEFAULT_CITY_ADJUSTMENTS.items()],
+        )
+    if conn.execute(select(models.PricingBaseRate.cleaning_type).limit(1)).first() is None:
+        conn.execute(
+            insert(models.PricingBaseRate),
+            [
+                {"cleaning_type": kind, "base": base, "per_room": room, "per_bathroom": bath}
+                for kind, (base, room, bath) in DEFAULT_BASE_RATES.items()
+            ],
+        )
+
+
+class PricingCache:
+    """
+    The compiled catalog for this process, refreshed from the tables at most
+    every `PRICING_RELOAD_SECONDS` by whichever request notices it is due.
+    """
+
+    def __init__(self, reload_seconds: float = PRICING_RELOAD_SECONDS) -> None:
+        self.reload_seconds = reload_seconds
+        self._catalog: Optional[PricingCatalog] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def load(self) -> PricingCatalog:
+        """
+        Read the tables now. Falls back to the defaults (or keeps the current
+        catalog) if they cannot be read, e.g. before the database is bootstrapped.
+        """
+        try:
+            with read_engine.connect() as conn:
+                catalog = read_catalog(conn)
+        except SQLAlchemyError as exc:
+            print(f"[PRICING] Could not read the pricing tables: {exc}")
+            catalog = self._catalog or default_catalog()
+        self._checked_at = time.monotonic()
+        if self._catalog is None or catalog.etag != self._catalog.etag:
+            if self._catalog is not None:
+                print("[PRICING] Catalog changed, reloaded")
+            self._catalog = catalog
+            self.reloads += 1
+        return self._catalog
+
+    def get(self) -> PricingCatalog:
+        catalog = self._catalog
+        if catalog is not None and time.monotonic() - self._checked_at < self.reload_seconds:
+            return catalog
+        # One thread re-reads; the others keep using the current catalog meanwhile.
+        if not self._lock.acquire(blocking=catalog is None):
+            return catalog
+        try:
+            if self._catalog is None or time.monotonic() - self._checked_at >= self.reload_seconds:
+                return self.load()
+            return self._catalog
+        finally:
+            self._lock.release()
+
+
+pricing_catalog = PricingCache()
+
+
+def get_catalog() -> PricingCatalog:
+    return pricing_catalog.get()
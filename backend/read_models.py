@@ -0,0 +1,213 @@
+"""
+Read-only list queries on SQLAlchemy Core.
+
+The ORM list path builds an ORM instance per row, copies it into a pydantic
+model, and FastAPI then validates that model again against `response_model`
+and runs it through `jsonable_encoder`. For listings nothing is modified, so
+these functions select just the response columns as tuples, wrap them in
+small `__slots__` rows and return JSON-ready dicts that routers hand straight
+to a `FastJSONResponse` (keeping `response_model` for the OpenAPI docs).
+
+Each row's `to_json()` must produce exactly what the matching
+`serializers.*_to_schema` + FastAPI encoding produces, same keys in the same
+order.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models
+from .utils.pagination import PageParams, keyset_select, split_page
+from .utils.responses import FastJSONResponse
+
+ORDER_PAGE_KEYS = (models.Order.created_at, models.Order.id)
+USER_PAGE_KEYS = (models.User.id,)
+
+
+class OrderItemRow:
+    __slots__ = ("id", "order_id", "service_name", "quantity", "price")
+
+    def __init__(self, id, order_id, service_name, quantity, price) -> None:
+        self.id = id
+        self.order_id = order_id
+        self.service_name = service_name
+        self.quantity = quantity
+        self.price = price
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "service_name": self.service_name,
+            "quantity": self.quantity,
+            "price": float(self.price),
+            "id": self.id,
+        }
+
+
+class OrderRow:
+    __slots__ = (
+        "id", "user_id", "cleaner_id", "status", "total_price", "created_at", "property_type", "rooms",
+        "bathrooms", "cleaning_type", "address", "apartment", "city", "phone", "latitude", "longitude", "items",
+    )
+
+    def __init__(self, row: Sequence[Any]) -> None:
+        (
+            self.id, self.user_id, self.cleaner_id, self.status, self.total_price, self.created_at,
+            self.property_type, self.rooms, self.bathrooms, self.cleaning_type, self.address, self.apartment,
+            self.city, self.phone, self.latitude, self.longitude,
+        ) = row
+        self.items: List[OrderItemRow] = []
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "property_type": self.property_type,
+            "rooms": self.rooms,
+            "bathrooms": self.bathrooms,
+            "cleaning_type": self.cleaning_type,
+            "address": self.address,
+            "apartment": self.apartment,
+            "city": self.city,
+            "phone": self.phone,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "id": self.id,
+            "user_id": self.user_id,
+            "cleaner_id": self.cleaner_id,
+            "status": self.status,
+            "total_price": float(self.total_price),
+            "created_at": self.created_at.isoformat() if self.created_at is not None else None,
+            "items": [item.to_json() for item in self.items],
+        }
+
+
+class AddressRow:
+    __slots__ = ("id", "user_id", "address", "apartment", "latitude", "longitude")
+
+    def __init__(self, id, user_id, address, apartment, latitude, longitude) -> None:
+        self.id = id
+        self.user_id = user_id
+        self.address = address
+        self.apartment = apartment
+        self.latitude = latitude
+        self.longitude = longitude
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "address": self.address,
+            "apartment": self.apartment,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "id": self.id,
+        }
+
+
+class UserRow:
+    __slots__ = (
+        "id", "name", "surname", "email", "phone", "role", "city", "reward_points", "is_totp_enabled",
+        "totp_secret", "addresses",
+    )
+
+    def __init__(self, row: Sequence[Any]) -> None:
+        (
+            self.id, self.name, self.surname, self.email, self.phone, self.role, self.city, self.reward_points,
+            self.is_totp_enabled, self.totp_secret,
+        ) = row
+        self.addresses: List[AddressRow] = []
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "surname": self.surname,
+            "email": self.email,
+            "phone": self.phone,
+            "city": self.city,
+            "id": self.id,
+            "role": self.role,
+            "reward_points": self.reward_points,
+            "totp_enabled": bool(self.is_totp_enabled and self.totp_secret),
+            "totp_setup_pending": bool(self.totp_secret and not self.is_totp_enabled),
+            "addresses": [a.to_json() for a in self.addresses],
+        }
+
+
+_ORDER_COLUMNS = (
+    models.Order.id, models.Order.user_id, models.Order.cleaner_id, models.Order.status,
+    models.Order.total_price, models.Order.created_at, models.Order.property_type, models.Order.rooms,
+    models.Order.bathrooms, models.Order.cleaning_type, models.Order.address, models.Order.apartment,
+    models.Order.city, models.Order.phone, models.Order.latitude, models.Order.longitude,
+)
+_ORDER_ITEM_COLUMNS = (
+    models.OrderItem.id, models.OrderItem.order_id, models.OrderItem.service_name,
+    models.OrderItem.quantity, models.OrderItem.price,
+)
+_USER_COLUMNS = (
+    models.User.id, models.User.name, models.User.surname, models.User.email, models.User.phone,
+    models.User.role, models.User.city, models.User.reward_points, models.User.is_totp_enabled,
+    models.User.totp_secret,
+)
+_ADDRESS_COLUMNS = (
+    models.Address.id, models.Address.user_id, models.Address.address, models.Address.apartment,
+    models.Address.latitude, models.Address.longitude,
+)
+
+
+def order_rows(db: Session, rows: Iterable[Sequence[Any]]) -> List[OrderRow]:
+    """
+    OrderRows for selected `_ORDER_COLUMNS` tuples, with items loaded in one query.
+    """
+    orders = [OrderRow(r) for r in rows]
+    if orders:
+        by_id = {o.id: o for o in orders}
+        stmt = (
+            select(*_ORDER_ITEM_COLUMNS)
+            .where(models.OrderItem.order_id.in_(list(by_id)))
+            .order_by(models.OrderItem.id)
+        )
+        for item in db.execute(stmt):
+            by_id[item[1]].items.append(OrderItemRow(*item))
+    return orders
+
+
+def user_rows(db: Session, rows: Iterable[Sequence[Any]]) -> List[UserRow]:
+    """
+    UserRows for selected `_USER_COLUMNS` tuples, with addresses loaded in one query.
+    """
+    users = [UserRow(r) for r in rows]
+    if users:
+        by_id = {u.id: u for u in users}
+        stmt = (
+            select(*_ADDRESS_COLUMNS)
+            .where(models.Address.user_id.in_(list(by_id)))
+            .order_by(models.Address.id)
+        )
+        for addr in db.execute(stmt):
+            by_id[addr[1]].addresses.append(AddressRow(*addr))
+    return users
+
+
+def select_orders(*criteria: Any):
+    return select(*_ORDER_COLUMNS).where(*criteria)
+
+
+def order_page(db: Session, page: PageParams, *criteria: Any) -> FastJSONResponse:
+    """
+    One keyset page of orders matching `criteria`, newest first, as a `Page[Order]` response.
+    """
+    stmt = keyset_select(select_orders(*criteria), ORDER_PAGE_KEYS, page)
+    rows, next_cursor = split_page(db.execute(stmt).all(), ORDER_PAGE_KEYS, page)
+    return page_response(order_rows(db, rows), next_cursor)
+
+
+def user_page(db: Session, page: PageParams, *criteria: Any) -> FastJSONResponse:
+    """
+    One keyset page of users matching `criteria`, oldest first, as a `Page[User]` response.
+    """
+    stmt = keyset_select(select(*_USER_COLUMNS).where(*criteria), USER_PAGE_KEYS, page, descending=False)
+    rows, next_cursor = split_page(db.execute(stmt).all(), USER_PAGE_KEYS, page)
+    return page_response(user_rows(db, rows), next_cursor)
+
+
+def page_response(rows: Iterable[Any], next_cursor: Optional[str] = None) -> FastJSONResponse:
+    return FastJSONResponse({"items": [r.to_json() for r in rows], "next_cursor": next_cursor})
@@ -0,0 +1,146 @@
+"""
+Reward points: an append-only ledger with a cached balance on the user row.
+
+Every credit is a `reward_ledger` entry written in the same transaction as
+the orders that earned it. Entries are never changed; a correction is a new
+entry. `users.reward_points` holds the running sum. Each credit adds its
+points with one relative `UPDATE` (no read-modify-write), so concurrent
+orders from one account cannot lose points, and `/users/me` and the other
+user views read the balance from the row they already load.
+
+The ledger is the source of truth. `rebuild_balances` recomputes the cached
+sums from it in bulk, e.g. after a manual correction entry or a restore:
+
+    python -m backend.rewards rebuild               # every user
+    python -m backend.rewards rebuild --user 12 --dry-run
+"""
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Engine, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from . import models
+from .utils.etag import bump_versions, user_key
+
+TENGE_PER_POINT = 1000  # 1 point per 1000₸ of order total
+ORDER = "order"
+OPENING = "opening"  # balance carried over when the ledger was introduced
+REBUILD_BATCH = 1000
+
+_ledger = models.RewardLedgerEntry.__table__
+_users = models.User.__table__
+
+
+@dataclass(frozen=True)
+class Correction:
+    user_id: int
+    cached: Optional[int]
+    ledger: int
+
+
+def points_for(total: float) -> int:
+    return int(total // TENGE_PER_POINT)
+
+
+def credit_orders(session: Session, user_id: int, orders: Iterable[Tuple[int, float]]) -> int:
+    """
+    Credit `user_id` for new `(order_id, total_price)` orders inside the
+    caller's transaction: one ledger entry per order that earns points and
+    one relative update of the cached balance. Returns the points credited.
+    """
+    created_at = datetime.now(timezone.utc)
+    credited = [(order_id, points_for(total)) for order_id, total in orders]
+    entries = [
+        {"user_id": user_id, "order_id": order_id, "points": points, "reason": ORDER, "created_at": created_at}
+        for order_id, points in credited
+        if points
+    ]
+    if not entries:
+        return 0
+    earned = sum(entry["points"] for entry in entries)
+    session.execute(insert(_ledger), entries)
+    session.execute(
+        update(_users)
+        .where(_users.c.id == user_id)
+        .values(reward_points=func.coalesce(_users.c.reward_points, 0) + earned)
+    )
+    return earned
+
+
+def _ledger_sum(user_id: Any) -> Any:
+    return (
+        select(func.coalesce(func.sum(_ledger.c.points), 0))
+        .where(_ledger.c.user_id == user_id)
+        .scalar_subquery()
+    )
+
+
+def find_drift(engine: Engine, user_ids: Optional[Sequence[int]] = None) -> List[Correction]:
+    """
+    Users whose cached balance differs from their ledger sum, in one grouped
+    scan of the ledger.
+    """
+    sums = select(_ledger.c.user_id, func.sum(_ledger.c.points).label("points")).group_by(_ledger.c.user_id)
+    if user_ids is not None:
+        sums = sums.where(_ledger.c.user_id.in_(user_ids))
+    sums = sums.subquery()
+    ledger = func.coalesce(sums.c.points, 0)
+    query = (
+        select(_users.c.id, _users.c.reward_points, ledger)
+        .select_from(_users.outerjoin(sums, sums.c.user_id == _users.c.id))
+        .where(_users.c.reward_points.is_distinct_from(ledger))
+        .order_by(_users.c.id)
+    )
+    if user_ids is not None:
+        query = query.where(_users.c.id.in_(user_ids))
+    with engine.connect() as conn:
+        return [Correction(*row) for row in conn.execute(query)]
+
+
+def rebuild_balances(
+    engine: Engine, user_ids: Optional[Sequence[int]] = None, batch: int = REBUILD_BATCH
+) -> List[Correction]:
+    """
+    Reset drifted cached balances to their ledger sums and bump those users'
+    version counters (their ETags and cached principals in every process),
+    `batch` users per transaction. The sum is taken inside each UPDATE,
+    so credits committed meanwhile are not lost. Returns what was corrected.
+    """
+    drift = find_drift(engine, user_ids)
+    for start in range(0, len(drift), batch):
+        ids = [c.user_id for c in drift[start : start + batch]]
+        with engine.begin() as conn:
+            conn.execute(update(_users).where(_users.c.id.in_(ids)).values(reward_points=_ledger_sum(_users.c.id)))
+            bump_versions(conn, *(user_key(uid) for uid in ids))
+    return drift
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="TazaBolsyn reward points")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rebuild = sub.add_parser("rebuild", help="recompute cached balances from the ledger")
+    rebuild.add_argument("--user", type=int, action="append", dest="user_ids", help="only this user (repeatable)")
+    rebuild.add_argument("--dry-run", action="store_true", help="report drifted balances without changing them")
+    args = parser.parse_args(argv)
+
+    from .database import engine
+
+    drift = find_drift(engine, args.user_ids) if args.dry_run else rebuild_balances(engine, args.user_ids)
+    for c in drift[:50]:
+        print(f"  user {c.user_id}: cached {c.cached} -> ledger {c.ledger}")
+    if len(drift) > 50:
+        print(f"  ... and {len(drift) - 50} more")
+    verb = "drifted" if args.dry_run else "corrected"
+    print(f"{len(drift)} balance(s) {verb}")
+    if drift and not args.dry_run:
+        # The version bumps make every worker reload these users and their ETags change.
+        print("Running servers show the corrected balances from the next request on.")
+
+
+if __name__ == "__main__":
+    main()
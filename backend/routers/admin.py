@@ -1,77 +1,40 @@
-from typing import List, Optional
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 
 from .. import models, schemas
 from ..auth import require_role, get_password_hash
 from ..database import get_db
+from ..serializers import (
+    CLEANER_LOAD,
+    FEEDBACK_LOAD,
+    cleaner_to_schema,
+    feedback_to_schema,
+    order_to_schema,
+)
+from ..dispatch import MAX_DISPATCH_DISTANCE_KM, run_dispatch
+from ..read_models import order_page, user_page
+from ..utils.etag import ORDERS, bump_order_versions, bump_versions, conditional_response, user_key
+from ..utils.order_board import ORDER_STATUS, order_board
+from ..utils.pagination import PageParams, keyset_paginate
+from ..utils.password_hashing import password_hasher
+from ..utils.responses import trusted_output
 
 router = APIRouter()
 
 
-def _order_to_schema(order: models.Order) -> schemas.Order:
-    return schemas.Order(
-        id=order.id,
-        user_id=order.user_id,
-        cleaner_id=order.cleaner_id,
-        status=order.status,
-        total_price=order.total_price,
-        created_at=order.created_at,
-        property_type=order.property_type,
-        rooms=order.rooms,
-        bathrooms=order.bathrooms,
-        cleaning_type=order.cleaning_type,
-        address=order.address,
-        apartment=order.apartment,
-        city=order.city,
-        phone=order.phone,
-        items=[
-            schemas.OrderItem(
-                id=i.id,
-                service_name=i.service_name,
-                quantity=i.quantity,
-                price=i.price,
-            )
-            for i in order.items
-        ],
-    )
-
-
-@router.get("/users", response_model=List[schemas.User])
+@router.get("/users", response_model=schemas.Page[schemas.User])
 def list_users(
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
     current_admin: models.User = Depends(require_role("admin")),
-) -> List[schemas.User]:
+) -> JSONResponse:
     """
-    List all users (admin only).
+    List all users (admin only), oldest first (keyset-paginated).
     """
-    users = db.query(models.User).all()
-    return [
-        schemas.User(
-            id=u.id,
-            name=u.name,
-            surname=u.surname,
-            email=u.email,
-            phone=u.phone,
-            role=u.role,
-            city=u.city,
-            reward_points=u.reward_points,
-            totp_enabled=bool(u.is_totp_enabled and u.totp_secret),
-            totp_setup_pending=bool(u.totp_secret and not u.is_totp_enabled),
-            addresses=[
-                schemas.Address(
-                    id=a.id,
-                    address=a.address,
-                    apartment=a.apartment,
-                    latitude=a.latitude,
-                    longitude=a.longitude,
-                )
-                for a in u.addresses
-            ],
-        )
-        for u in users
-    ]
+    return user_page(db, page)
 
 
 @router.post("/cleaners", response_model=schemas.Cleaner, status_code=status.HTTP_201_CREATED)
@@ -97,36 +60,11 @@ def create_cleaner(
     cleaner = models.Cleaner(user_id=user.id, availability=payload.availability)
     db.add(user)
     db.add(cleaner)
+    bump_versions(db, user_key(user.id))
     db.commit()
     db.refresh(cleaner)
 
-    return schemas.Cleaner(
-        id=cleaner.id,
-        user_id=cleaner.user_id,
-        availability=cleaner.availability,
-        user=schemas.User(
-            id=user.id,
-            name=user.name,
-            surname=user.surname,
-            email=user.email,
-            phone=user.phone,
-            role=user.role,
-            city=user.city,
-            reward_points=user.reward_points,
-            totp_enabled=bool(user.is_totp_enabled and user.totp_secret),
-            totp_setup_pending=bool(user.totp_secret and not user.is_totp_enabled),
-            addresses=[
-                schemas.Address(
-                    id=a.id,
-                    address=a.address,
-                    apartment=a.apartment,
-                    latitude=a.latitude,
-                    longitude=a.longitude,
-                )
-                for a in user.addresses
-            ],
-        ),
-    )
+    return cleaner_to_schema(cleaner)
 
 
 @router.post(
@@ -166,94 +104,46 @@ def create_cleaner_account(
     db.commit()
     db.refresh(cleaner)
 
-    return schemas.Cleaner(
-        id=cleaner.id,
-        user_id=cleaner.user_id,
-        availability=cleaner.availability,
-        user=schemas.User(
-            id=user.id,
-            name=user.name,
-            surname=user.surname,
-            email=user.email,
-            phone=user.phone,
-            role=user.role,
-            city=user.city,
-            reward_points=user.reward_points,
-            totp_enabled=bool(user.is_totp_enabled and user.totp_secret),
-            totp_setup_pending=bool(user.totp_secret and not user.is_totp_enabled),
-            addresses=[
-                schemas.Address(
-                    id=a.id,
-                    address=a.address,
-                    apartment=a.apartment,
-                    latitude=a.latitude,
-                    longitude=a.longitude,
-                )
-                for a in user.addresses
-            ],
-        ),
-    )
+    return cleaner_to_schema(cleaner)
 
 
-@router.get("/cleaners", response_model=List[schemas.Cleaner])
+@router.get("/cleaners", response_model=schemas.Page[schemas.Cleaner])
+@trusted_output
 def list_cleaners(
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
     current_admin: models.User = Depends(require_role("admin")),
-) -> List[schemas.Cleaner]:
+) -> schemas.Page[schemas.Cleaner]:
     """
-    List all cleaners with their user info.
+    List all cleaners with their user info (keyset-paginated).
     """
-    cleaners = db.query(models.Cleaner).all()
-    return [
-        schemas.Cleaner(
-            id=c.id,
-            user_id=c.user_id,
-            availability=c.availability,
-            user=schemas.User(
-                id=c.user.id,
-                name=c.user.name,
-                surname=c.user.surname,
-                email=c.user.email,
-                phone=c.user.phone,
-                role=c.user.role,
-                city=c.user.city,
-                reward_points=c.user.reward_points,
-                totp_enabled=bool(c.user.is_totp_enabled and c.user.totp_secret),
-                totp_setup_pending=bool(c.user.totp_secret and not c.user.is_totp_enabled),
-                addresses=[
-                    schemas.Address(
-                        id=a.id,
-                        address=a.address,
-                        apartment=a.apartment,
-                        latitude=a.latitude,
-                        longitude=a.longitude,
-                    )
-                    for a in c.user.addresses
-                ],
-            ),
-        )
-        for c in cleaners
-    ]
+    query = db.query(models.Cleaner).options(*CLEANER_LOAD)
+    cleaners, next_cursor = keyset_paginate(query, (models.Cleaner.id,), page, descending=False)
+    return schemas.Page[schemas.Cleaner](
+        items=[cleaner_to_schema(c) for c in cleaners],
+        next_cursor=next_cursor,
+    )
 
 
-@router.get("/orders", response_model=List[schemas.Order])
+@router.get("/orders", response_model=schemas.Page[schemas.Order])
 def list_orders(
+    request: Request,
     status_filter: Optional[str] = Query(default=None, description="Filter by order status"),
     city: Optional[str] = Query(default=None, description="Filter by city"),
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
     current_admin: models.User = Depends(require_role("admin")),
-) -> List[schemas.Order]:
+) -> Response:
     """
-    List all orders with optional filtering (admin only).
+    List all orders with optional filtering (admin only), newest first
+    (keyset-paginated). Supports `If-None-Match`.
     """
-    query = db.query(models.Order)
+    criteria = []
     if status_filter:
-        query = query.filter(models.Order.status == status_filter)
+        criteria.append(models.Order.status == status_filter)
     if city:
-        query = query.filter(models.Order.city == city)
-
-    orders = query.order_by(models.Order.created_at.desc()).all()
-    return [_order_to_schema(o) for o in orders]
+        criteria.append(models.Order.city == city)
+    return conditional_response(request, db, [ORDERS], lambda: order_page(db, page, *criteria))
 
 
 @router.patch("/orders/{order_id}", response_model=schemas.Order)
@@ -270,6 +160,7 @@ def update_order_admin(
     if not order:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
 
+    previous_cleaner_id = order.cleaner_id
     if payload.status is not None:
         order.status = payload.status
 
@@ -283,38 +174,64 @@ def update_order_admin(
         order.cleaner_id = cleaner_user.id
 
     db.add(order)
+    bump_order_versions(db, order.user_id, previous_cleaner_id, order.cleaner_id)
     db.commit()
     db.refresh(order)
-    return _order_to_schema(order)
+    result = order_to_schema(order)
+    order_board.publish(ORDER_STATUS, result)
+    return result
 
 
-@router.get("/feedbacks", response_model=List[schemas.Feedback])
-def list_feedbacks(
+@router.post("/dispatch", response_model=schemas.DispatchResult)
+def run_auto_dispatch(
+    max_distance_km: float = Query(
+        default=MAX_DISPATCH_DISTANCE_KM, gt=0, le=500, description="Maximum order-to-cleaner distance"
+    ),
     db: Session = Depends(get_db),
     current_admin: models.User = Depends(require_role("admin")),
-) -> List[schemas.Feedback]:
+) -> schemas.DispatchResult:
     """
-    List all feedbacks (admin only).
+    Assign pending orders to available cleaners in one batch (admin only).
     """
-    feedbacks = db.query(models.Feedback).order_by(models.Feedback.created_at.desc()).all()
-    return [
-        schemas.Feedback(
-            id=f.id,
-            order_id=f.order_id,
-            user_id=f.user_id,
-            comment=f.comment,
-            rating=f.rating,
-            created_at=f.created_at,
-            user=schemas.UserBase(
-                name=f.user.name,
-                surname=f.user.surname,
-                email=f.user.email,
-                phone=f.user.phone,
-                city=f.user.city,
-            ) if f.user else None,
-        )
-        for f in feedbacks
-    ]
+    result = run_dispatch(db, max_distance_km=max_distance_km)
+    return schemas.DispatchResult(
+        pending_orders=result.pending_orders,
+        available_cleaners=result.available_cleaners,
+        assigned=len(result.assignments),
+        assignments=[
+            schemas.DispatchAssignment(
+                order_id=a.order_id,
+                cleaner_id=a.cleaner_id,
+                distance_km=round(a.distance_km, 3),
+            )
+            for a in result.assignments
+        ],
+    )
+
 
+@router.get("/stats/password-hashing", response_model=schemas.PasswordHashingStats)
+def password_hashing_stats(
+    current_admin: models.User = Depends(require_role("admin")),
+) -> schemas.PasswordHashingStats:
+    """
+    Queue depth, rejections and latency of the bcrypt worker pool (admin only).
+    """
+    return schemas.PasswordHashingStats(**password_hasher.stats())
 
 
+@router.get("/feedbacks", response_model=schemas.Page[schemas.Feedback])
+@trusted_output
+def list_feedbacks(
+    page: PageParams = Depends(),
+    db: Session = Depends(get_db),
+    current_admin: models.User = Depends(require_role("admin")),
+) -> schemas.Page[schemas.Feedback]:
+    """
+    List all feedbacks (admin only), newest first (keyset-paginated).
+    """
+    query = db.query(models.Feedback).options(*FEEDBACK_LOAD)
+    feedbacks, next_cursor = keyset_paginate(query, (models.Feedback.created_at, models.Feedback.id), page)
+    return schemas.Page[schemas.Feedback](
+        items=[feedback_to_schema(f) for f in feedbacks],
+        next_cursor=next_cursor,
+    )
@@ -15,38 +15,15 @@ from ..auth import (
     verify_totp_code,
 )
 from ..database import get_db
-from ..email_service import send_password_reset_email
+from ..serializers import user_to_schema
+from ..email_service import email_sender, enqueue_password_reset_email
+from ..utils.etag import bump_versions, user_key
 from ..utils.qr import qr_png_base64
 from ..utils.rate_limit import rate_limit
 
 router = APIRouter()
 
 
-def _user_to_schema(user: models.User) -> schemas.User:
-    return schemas.User(
-        id=user.id,
-        name=user.name,
-        surname=user.surname,
-        email=user.email,
-        phone=user.phone,
-        role=user.role,
-        city=user.city,
-        reward_points=user.reward_points,
-        totp_enabled=bool(user.is_totp_enabled and user.totp_secret),
-        totp_setup_pending=bool(user.totp_secret and not user.is_totp_enabled),
-        addresses=[
-            schemas.Address(
-                id=addr.id,
-                address=addr.address,
-                apartment=addr.apartment,
-                latitude=addr.latitude,
-                longitude=addr.longitude,
-            )
-            for addr in user.addresses
-        ],
-    )
-
-
 @router.post("/signup", response_model=schemas.Token)
 def signup(payload: schemas.UserCreate, db: Session = Depends(get_db)) -> schemas.Token:
     """
@@ -78,7 +55,7 @@ def signup(payload: schemas.UserCreate, db: Session = Depends(get_db)) -> schema
     db.refresh(user)
 
     token = create_access_token({"sub": str(user.id), "role": user.role})
-    return schemas.Token(access_token=token, token_type="bearer", user=_user_to_schema(user))
+    return schemas.Token(access_token=token, token_type="bearer", user=user_to_schema(user))
 
 
 @router.post(
@@ -112,7 +89,7 @@ def login(payload: schemas.LoginRequest, db: Session = Depends(get_db)) -> schem
             )
 
     token = create_access_token({"sub": str(user.id), "role": user.role})
-    return schemas.Token(access_token=token, token_type="bearer", user=_user_to_schema(user))
+    return schemas.Token(access_token=token, token_type="bearer", user=user_to_schema(user))
 
 
 @router.post(
@@ -125,9 +102,8 @@ def request_password_reset(
     """
     Request a password reset code to be sent to the user's email.
 
-    For production, integrate with an email/SMS provider.
-    In this demo implementation, the code is stored in the database and
-    NOT returned to the client.
+    The code is stored in the database and NOT returned to the client. The
+    email is only queued here; the outbox sender delivers it in the background.
     """
     user = db.query(models.User).filter(models.User.email == payload.email).first()
     if user:
@@ -135,9 +111,10 @@ def request_password_reset(
         user.reset_code = code
         user.reset_expires_at = datetime.now(timezone.utc) + timedelta(minutes=15)
         db.add(user)
+        queued = enqueue_password_reset_email(db, user.email, code)
         db.commit()
-        # Send password reset code via email
-        send_password_reset_email(user.email, code)
+        if queued is not None:
+            email_sender.wake()
 
     # Always respond with generic message to avoid leaking whether email exists
     return {"message": "If an account with that email exists, a reset code has been sent."}
@@ -215,6 +192,7 @@ def setup_totp(
     current_user.totp_secret = secret
     current_user.is_totp_enabled = False
     db.add(current_user)
+    bump_versions(db, user_key(current_user.id))
     db.commit()
     db.refresh(current_user)
 
@@ -257,6 +235,7 @@ def verify_totp_setup(
 
     current_user.is_totp_enabled = True
     db.add(current_user)
+    bump_versions(db, user_key(current_user.id))
     db.commit()
     db.refresh(current_user)
     return schemas.TotpVerifyResponse(
@@ -1,72 +1,31 @@
-from typing import List
+import asyncio
+from typing import AsyncGenerator, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import or_, select, update
 from sqlalchemy.orm import Session
 
 from .. import models, schemas
-from ..auth import get_current_active_user, require_role
-from ..database import get_db
+from ..auth import get_current_active_user, get_user_from_token, require_role
+from ..database import SessionLocal, get_db
+from ..read_models import order_page, order_rows, page_response, select_orders
+from ..serializers import order_to_schema, user_to_schema
+from ..dispatch import ACTIVE_STATUSES, claim_order
 from ..auth import create_access_token, get_password_hash, verify_password, verify_totp_code
+from ..utils.etag import ORDERS, bump_order_versions, conditional_response, orders_key
+from ..utils.geo import cell_ranges, haversine_km
+from ..utils.idempotency import IdempotencyKey, idempotency_key, run_idempotent
+from ..utils.order_board import READY, ORDER_STATUS, ORDER_TAKEN, order_board
+from ..utils.pagination import PageParams
 
 router = APIRouter()
 
 ALLOWED_STATUSES = ["pending", "accepted", "going", "started", "finished", "paid"]
-ACTIVE_STATUSES = {"accepted", "going", "started"}
-
-
-def _user_to_schema(user: models.User) -> schemas.User:
-    return schemas.User(
-        id=user.id,
-        name=user.name,
-        surname=user.surname,
-        email=user.email,
-        phone=user.phone,
-        role=user.role,
-        city=user.city,
-        reward_points=user.reward_points,
-        totp_enabled=bool(user.is_totp_enabled and user.totp_secret),
-        totp_setup_pending=bool(user.totp_secret and not user.is_totp_enabled),
-        addresses=[
-            schemas.Address(
-                id=addr.id,
-                address=addr.address,
-                apartment=addr.apartment,
-                latitude=addr.latitude,
-                longitude=addr.longitude,
-            )
-            for addr in user.addresses
-        ],
-    )
-
-
-def _order_to_schema(order: models.Order) -> schemas.Order:
-    return schemas.Order(
-        id=order.id,
-        user_id=order.user_id,
-        cleaner_id=order.cleaner_id,
-        status=order.status,
-        total_price=order.total_price,
-        created_at=order.created_at,
-        property_type=order.property_type,
-        rooms=order.rooms,
-        bathrooms=order.bathrooms,
-        cleaning_type=order.cleaning_type,
-        address=order.address,
-        apartment=order.apartment,
-        city=order.city,
-        phone=order.phone,
-        latitude=order.latitude,
-        longitude=order.longitude,
-        items=[
-            schemas.OrderItem(
-                id=i.id,
-                service_name=i.service_name,
-                quantity=i.quantity,
-                price=i.price,
-            )
-            for i in order.items
-        ],
-    )
+STREAM_KEEPALIVE_SECONDS = 15
+DEFAULT_RADIUS_KM = 25.0
+MAX_RADIUS_KM = 200.0
 
 
 @router.post("/signup", response_model=schemas.Token)
@@ -105,7 +64,7 @@ def cleaner_signup(payload: schemas.CleanerSignupRequest, db: Session = Depends(
     db.refresh(user)
 
     token = create_access_token({"sub": str(user.id), "role": user.role})
-    return schemas.Token(access_token=token, token_type="bearer", user=_user_to_schema(user))
+    return schemas.Token(access_token=token, token_type="bearer", user=user_to_schema(user))
 
 
 @router.post("/login", response_model=schemas.Token)
@@ -130,24 +89,117 @@ def cleaner_login(payload: schemas.CleanerLoginRequest, db: Session = Depends(ge
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="INVALID_TOTP")
 
     token = create_access_token({"sub": str(user.id), "role": user.role})
-    return schemas.Token(access_token=token, token_type="bearer", user=_user_to_schema(user))
+    return schemas.Token(access_token=token, token_type="bearer", user=user_to_schema(user))
 
 
-@router.get("/orders/available", response_model=List[schemas.Order])
+@router.get("/orders/available", response_model=schemas.Page[schemas.Order])
 def list_available_orders(
+    request: Request,
+    lat: Optional[float] = Query(default=None, ge=-90, le=90, description="Cleaner latitude"),
+    lng: Optional[float] = Query(default=None, ge=-180, le=180, description="Cleaner longitude"),
+    radius_km: float = Query(default=DEFAULT_RADIUS_KM, gt=0, le=MAX_RADIUS_KM),
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(require_role("cleaner")),
-) -> List[schemas.Order]:
+) -> Response:
     """
-    List customer orders that are not assigned to any cleaner yet.
+    List customer orders that are not assigned to any cleaner yet, newest
+    first (keyset-paginated).
+
+    With `lat`/`lng` only the `limit` nearest orders within `radius_km` are
+    returned, nearest first, using the `geo_cell` grid index. Orders without
+    coordinates are not included in that mode and there is no next page.
+
+    Supports `If-None-Match`: polls get 304 until some order changes.
     """
-    orders = (
-        db.query(models.Order)
-        .filter(models.Order.cleaner_id.is_(None), models.Order.status == "pending")
-        .order_by(models.Order.created_at.desc())
-        .all()
+    if (lat is None) != (lng is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="lat and lng must be provided together",
+        )
+
+    unassigned = (models.Order.cleaner_id.is_(None), models.Order.status == "pending")
+
+    def render() -> JSONResponse:
+        if lat is None:
+            return order_page(db, page, *unassigned)
+
+        cells = or_(*(models.Order.geo_cell.between(lo, hi) for lo, hi in cell_ranges(lat, lng, radius_km)))
+        nearby = []
+        for row in db.execute(select_orders(*unassigned, cells)):
+            distance = haversine_km(lat, lng, row.latitude, row.longitude)
+            if distance <= radius_km:
+                nearby.append((distance, row))
+        nearby.sort(key=lambda pair: pair[0])
+        return page_response(order_rows(db, [row for _, row in nearby[: page.limit]]))
+
+    return conditional_response(request, db, [ORDERS], render)
+
+
+def _authenticate_stream(token: str) -> int:
+    db = SessionLocal()
+    try:
+        user = get_user_from_token(token, db)
+        if user.role != "cleaner":
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not enough permissions",
+            )
+        return user.id
+    finally:
+        db.close()
+
+
+@router.get("/orders/stream")
+async def stream_orders(
+    request: Request,
+    token: str = Query(..., description="Access token (EventSource cannot send headers)"),
+) -> StreamingResponse:
+    """
+    Server-Sent Events feed of order-board deltas for the current cleaner.
+
+    Emits `ready` once subscribed (clients should do one full fetch then),
+    followed by `order.created`, `order.taken`, `order.status`,
+    `order.removed` and, if the client falls behind, `resync`.
+    """
+    user_id = await run_in_threadpool(_authenticate_stream, token)
+
+    async def events() -> AsyncGenerator[str, None]:
+        sub_id, sub = order_board.subscribe(user_id)
+        try:
+            yield f"retry: 3000\nevent: {READY}\ndata: {{}}\n\n"
+            while not await request.is_disconnected():
+                try:
+                    yield await asyncio.wait_for(sub.queue.get(), timeout=STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            order_board.unsubscribe(sub_id)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    return [_order_to_schema(o) for o in orders]
+
+
+def _raise_take_conflict(db: Session, order_id: int, cleaner_id: int) -> None:
+    """
+    Explain why a claim matched no row. Only runs on the losing path.
+    """
+    has_active = db.execute(
+        select(models.Order.id)
+        .where(models.Order.cleaner_id == cleaner_id, models.Order.status.in_(list(ACTIVE_STATUSES)))
+        .limit(1)
+    ).first()
+    if has_active:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="CLEANER_HAS_ACTIVE_ORDER",
+        )
+    if db.get(models.Order, order_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
+    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="ORDER_ALREADY_TAKEN")
 
 
 @router.post("/orders/{order_id}/take", response_model=schemas.Order)
@@ -155,60 +207,53 @@ def take_order(
     order_id: int,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(require_role("cleaner")),
+    idempotency: Optional[IdempotencyKey] = Depends(idempotency_key),
 ) -> schemas.Order:
     """
     Take an available order.
     Business rule: a cleaner can have only one active order at a time.
+
+    The claim is a single conditional UPDATE, so when many cleaners race for the
+    same order exactly one wins and the others get a fast 409. A retry with the
+    same `Idempotency-Key` gets the winning 200 back instead of a 409.
     """
-    active = (
-        db.query(models.Order)
-        .filter(models.Order.cleaner_id == current_user.id, models.Order.status.in_(list(ACTIVE_STATUSES)))
-        .first()
-    )
-    if active:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="CLEANER_HAS_ACTIVE_ORDER",
+    cleaner_id = current_user.id
+
+    def write(session: Session) -> schemas.Order:
+        if not claim_order(session, order_id, cleaner_id):
+            _raise_take_conflict(session, order_id, cleaner_id)
+
+        # mark cleaner unavailable
+        session.execute(
+            update(models.Cleaner)
+            .where(models.Cleaner.user_id == cleaner_id)
+            .values(availability=False)
+            .execution_options(synchronize_session=False)
         )
+        order = session.get(models.Order, order_id)
+        bump_order_versions(session, order.user_id, cleaner_id)
+        return order_to_schema(order)
 
-    order = (
-        db.query(models.Order)
-        .filter(models.Order.id == order_id, models.Order.cleaner_id.is_(None), models.Order.status == "pending")
-        .first()
-    )
-    if not order:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not available")
-
-    order.cleaner_id = current_user.id
-    order.status = "accepted"
+    result = run_idempotent(db, idempotency, write)
+    if isinstance(result, Response):
+        return result
+    order_board.publish(ORDER_TAKEN, result)
+    return result
 
-    # mark cleaner unavailable
-    cleaner_profile = db.query(models.Cleaner).filter(models.Cleaner.user_id == current_user.id).first()
-    if cleaner_profile:
-        cleaner_profile.availability = False
-        db.add(cleaner_profile)
 
-    db.add(order)
-    db.commit()
-    db.refresh(order)
-    return _order_to_schema(order)
-
-
-@router.get("/orders", response_model=List[schemas.Order])
+@router.get("/orders", response_model=schemas.Page[schemas.Order])
 def list_assigned_orders(
+    request: Request,
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(require_role("cleaner")),
-) -> List[schemas.Order]:
+) -> Response:
     """
-    List orders assigned to the current cleaner.
+    List orders assigned to the current cleaner, newest first (keyset-paginated).
+    Supports `If-None-Match`.
     """
-    orders = (
-        db.query(models.Order)
-        .filter(models.Order.cleaner_id == current_user.id)
-        .order_by(models.Order.created_at.desc())
-        .all()
-    )
-    return [_order_to_schema(o) for o in orders]
+    assigned = models.Order.cleaner_id == current_user.id
+    return conditional_response(request, db, [orders_key(current_user.id)], lambda: order_page(db, page, assigned))
 
 
 @router.patch("/orders/{order_id}/status", response_model=schemas.Order)
@@ -217,10 +262,12 @@ def update_order_status(
     payload: schemas.StatusUpdate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(require_role("cleaner")),
+    idempotency: Optional[IdempotencyKey] = Depends(idempotency_key),
 ) -> schemas.Order:
     """
     Update the status of an assigned order.
     Allowed statuses: pending, accepted, going, started, finished, paid.
+    Supports `Idempotency-Key` like `take`.
     """
     if payload.status not in ALLOWED_STATUSES:
         raise HTTPException(
@@ -228,50 +275,59 @@ def update_order_status(
             detail=f"Invalid status. Allowed: {', '.join(ALLOWED_STATUSES)}",
         )
 
-    order = (
-        db.query(models.Order)
-        .filter(models.Order.id == order_id, models.Order.cleaner_id == current_user.id)
-        .first()
-    )
-    if not order:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
+    cleaner_id = current_user.id
 
-    # Enforce a simple forward-only flow for real tracking.
-    allowed_next = {
-        "accepted": {"going"},
-        "going": {"started"},
-        "started": {"finished"},
-        "finished": set(),
-        "paid": set(),
-        "pending": {"accepted"},  # shouldn't happen for assigned cleaner, but keep safe
-    }
-    current = order.status
-    if payload.status != current:
-        if payload.status not in allowed_next.get(current, set()):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"INVALID_STATUS_TRANSITION:{current}->{payload.status}",
-            )
-
-    order.status = payload.status
-    db.add(order)
-
-    # If finished, mark cleaner available (as long as no other active orders exist).
-    if payload.status == "finished":
-        other_active = (
-            db.query(models.Order)
-            .filter(models.Order.cleaner_id == current_user.id, models.Order.status.in_(list(ACTIVE_STATUSES)))
+    def write(session: Session) -> schemas.Order:
+        order = (
+            session.query(models.Order)
+            .filter(models.Order.id == order_id, models.Order.cleaner_id == cleaner_id)
             .first()
         )
-        if not other_active:
-            cleaner_profile = db.query(models.Cleaner).filter(models.Cleaner.user_id == current_user.id).first()
-            if cleaner_profile:
-                cleaner_profile.availability = True
-                db.add(cleaner_profile)
-
-    db.commit()
-    db.refresh(order)
-    return _order_to_schema(order)
+        if not order:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
+
+        # Enforce a simple forward-only flow for real tracking.
+        allowed_next = {
+            "accepted": {"going"},
+            "going": {"started"},
+            "started": {"finished"},
+            "finished": set(),
+            "paid": set(),
+            "pending": {"accepted"},  # shouldn't happen for assigned cleaner, but keep safe
+        }
+        current = order.status
+        if payload.status != current:
+            if payload.status not in allowed_next.get(current, set()):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"INVALID_STATUS_TRANSITION:{current}->{payload.status}",
+                )
+
+        order.status = payload.status
+        session.add(order)
+        bump_order_versions(session, order.user_id, cleaner_id)
+
+        # If finished, mark cleaner available (as long as no other active orders exist).
+        if payload.status == "finished":
+            other_active = (
+                session.query(models.Order)
+                .filter(models.Order.cleaner_id == cleaner_id, models.Order.status.in_(list(ACTIVE_STATUSES)))
+                .first()
+            )
+            if not other_active:
+                cleaner_profile = session.query(models.Cleaner).filter(models.Cleaner.user_id == cleaner_id).first()
+                if cleaner_profile:
+                    cleaner_profile.availability = True
+                    session.add(cleaner_profile)
+
+        session.flush()
+        return order_to_schema(order)
+
+    result = run_idempotent(db, idempotency, write)
+    if isinstance(result, Response):
+        return result
+    order_board.publish(ORDER_STATUS, result)
+    return result
 
 
 
@@ -1,143 +1,200 @@
-from typing import List
+from datetime import datetime, timezone
+from typing import Any, Iterable, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from .. import models, schemas
 from ..auth import get_current_active_user
-from ..database import get_db
+from ..database import DATABASE_BACKEND, get_db
+from ..pricing import PricingError, Quote, get_catalog
+from ..read_models import order_page
+from ..rewards import credit_orders
+from ..serializers import order_to_schema
+from ..utils.etag import bump_order_versions, bump_versions, conditional_response, orders_key, user_key
+from ..utils.geo import geo_cell
+from ..utils.idempotency import IdempotencyKey, idempotency_key, run_idempotent
+from ..utils.order_board import ORDER_CREATED, order_board
+from ..utils.pagination import PageParams
+from ..utils.principal_cache import principal_cache
+from ..utils.responses import trusted_output
+from ..utils.write_queue import run_write
 
 router = APIRouter()
 
 
+def _quote(payload: schemas.OrderCreate, city: Optional[str]) -> Quote:
+    if not payload.items:
+        raise PricingError("At least one service must be selected.")
+    return get_catalog().quote(
+        ((i.service_name, i.quantity) for i in payload.items),
+        city=city,
+        cleaning_type=payload.cleaning_type,
+        rooms=payload.rooms,
+        bathrooms=payload.bathrooms,
+    )
+
+
+def _order_values(payload: schemas.OrderCreate, user_id: int, city: Optional[str], total_price: float) -> dict:
+    return {
+        "user_id": user_id,
+        "cleaner_id": None,
+        "status": "pending",
+        "total_price": total_price,
+        "property_type": payload.property_type,
+        "rooms": payload.rooms,
+        "bathrooms": payload.bathrooms,
+        "cleaning_type": payload.cleaning_type,
+        "address": payload.address,
+        "apartment": payload.apartment,
+        "city": city,
+        "phone": payload.phone,
+        "latitude": payload.latitude,
+        "longitude": payload.longitude,
+        "geo_cell": geo_cell(payload.latitude, payload.longitude),
+    }
+
+
+def _credit_new_orders(session: Session, user_id: int, orders: Iterable[Tuple[int, float]]) -> None:
+    """
+    Reward points for the user's new `(order_id, total_price)` orders and the
+    ETag bumps they need.
+    """
+    credit_orders(session, user_id, orders)
+    bump_versions(session, user_key(user_id))
+    bump_order_versions(session, user_id)
+
+
+def _insert_returning_ids(session: Session, model: Any, rows: List[dict]) -> List[int]:
+    """
+    Multi-row INSERT ... RETURNING id; ids come back in the order of `rows`.
+    SQLAlchemy can only batch `sort_by_parameter_order` where the dialect has
+    a sentinel strategy. SQLite has none and would get one statement per row,
+    but there the writer holds the lock and rowids are assigned in VALUES
+    order, so sorting the returned ids restores the order.
+    """
+    table = model.__table__
+    if DATABASE_BACKEND == "sqlite":
+        return sorted(session.execute(insert(table).returning(table.c.id), rows).scalars())
+    return session.execute(insert(table).returning(table.c.id, sort_by_parameter_order=True), rows).scalars().all()
+
+
 @router.post("/", response_model=schemas.Order, status_code=status.HTTP_201_CREATED)
 def create_order(
     payload: schemas.OrderCreate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user),
+    idempotency: Optional[IdempotencyKey] = Depends(idempotency_key),
 ) -> schemas.Order:
     """
     Create a new cleaning order for the current user.
-    Total price is calculated from the provided items.
-    City-based pricing is already applied in frontend, so we use the prices as-is.
+    Item prices and the total (base cleaning + services, city-adjusted) come
+    from the pricing catalog; prices sent by the client are ignored.
+    Retries sent with the same `Idempotency-Key` get the first response back.
     """
-    if not payload.items:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="At least one service must be selected.",
-        )
+    user_id = current_user.id
+    city = payload.city or current_user.city
+    try:
+        quote = _quote(payload, city)
+    except PricingError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
 
-    # Prices are already adjusted by city in frontend, so we use them directly
-    total_price = sum(i.price * i.quantity for i in payload.items)
-    order = models.Order(
-        user_id=current_user.id,
-        cleaner_id=None,
-        status="pending",
-        total_price=total_price,
-        property_type=payload.property_type,
-        rooms=payload.rooms,
-        bathrooms=payload.bathrooms,
-        cleaning_type=payload.cleaning_type,
-        address=payload.address,
-        apartment=payload.apartment,
-        city=payload.city or current_user.city,
-        phone=payload.phone,
-        latitude=payload.latitude,
-        longitude=payload.longitude,
-    )
-    db.add(order)
-    db.flush()  # get order.id
-
-    for item in payload.items:
-        db_item = models.OrderItem(
-            order_id=order.id,
-            service_name=item.service_name,
-            quantity=item.quantity,
-            price=item.price,
+    def write(session: Session) -> schemas.Order:
+        order = models.Order(
+            **_order_values(payload, user_id, city, quote.total),
+            items=[
+                models.OrderItem(service_name=name, quantity=quantity, price=price)
+                for name, quantity, price in quote.items
+            ],
         )
-        db.add(db_item)
-
-    # Simple reward points: 1 point per 1000₸
-    points_earned = int(total_price // 1000)
-    current_user.reward_points = (current_user.reward_points or 0) + points_earned
-
-    db.add(current_user)
-    db.commit()
-    db.refresh(order)
-
-    return schemas.Order(
-        id=order.id,
-        user_id=order.user_id,
-        cleaner_id=order.cleaner_id,
-        status=order.status,
-        total_price=order.total_price,
-        created_at=order.created_at,
-        property_type=order.property_type,
-        rooms=order.rooms,
-        bathrooms=order.bathrooms,
-        cleaning_type=order.cleaning_type,
-        address=order.address,
-        apartment=order.apartment,
-        city=order.city,
-        phone=order.phone,
-        latitude=order.latitude,
-        longitude=order.longitude,
-        items=[
-            schemas.OrderItem(
-                id=i.id,
-                service_name=i.service_name,
-                quantity=i.quantity,
-                price=i.price,
-            )
-            for i in order.items
-        ],
-    )
+        session.add(order)
+        session.flush()
+        _credit_new_orders(session, user_id, [(order.id, quote.total)])
+        return order_to_schema(order)
 
+    result = run_idempotent(db, idempotency, write, status.HTTP_201_CREATED)
+    if isinstance(result, Response):  # a retry: nothing was written
+        return result
+    principal_cache.invalidate_user(user_id)  # reward points changed via Core UPDATE
+    order_board.publish(ORDER_CREATED, result)
+    return result
 
-@router.get("/me", response_model=List[schemas.Order])
-def list_my_orders(
+
+@router.post("/bulk", response_model=schemas.OrderBulkResult)
+@trusted_output
+def create_orders_bulk(
+    payload: schemas.OrderBulkCreate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user),
-) -> List[schemas.Order]:
+) -> schemas.OrderBulkResult:
     """
-    Get order history for the current user.
+    Create up to 500 orders for the current user in one transaction (e.g. a
+    company booking many apartments). Each order is priced like `POST /orders/`;
+    one that cannot be priced is reported by its index and the rest are still
+    created. Orders and items are written with one multi-row
+    INSERT ... RETURNING each, and reward points are credited once.
     """
-    orders = (
-        db.query(models.Order)
-        .filter(models.Order.user_id == current_user.id)
-        .order_by(models.Order.created_at.desc())
-        .all()
-    )
-    return [
-        schemas.Order(
-            id=o.id,
-            user_id=o.user_id,
-            cleaner_id=o.cleaner_id,
-            status=o.status,
-            total_price=o.total_price,
-            created_at=o.created_at,
-            property_type=o.property_type,
-            rooms=o.rooms,
-            bathrooms=o.bathrooms,
-            cleaning_type=o.cleaning_type,
-            address=o.address,
-            apartment=o.apartment,
-            city=o.city,
-            phone=o.phone,
-            latitude=o.latitude,
-            longitude=o.longitude,
-            items=[
-                schemas.OrderItem(
-                    id=i.id,
-                    service_name=i.service_name,
-                    quantity=i.quantity,
-                    price=i.price,
-                )
-                for i in o.items
-            ],
+    user_id = current_user.id
+    results: List[Optional[schemas.OrderBulkItemResult]] = [None] * len(payload.orders)
+    accepted: List[Tuple[int, dict, Quote]] = []
+    for index, order in enumerate(payload.orders):
+        city = order.city or current_user.city
+        try:
+            quote = _quote(order, city)
+        except PricingError as exc:
+            results[index] = schemas.OrderBulkItemResult(
+                index=index, status=status.HTTP_400_BAD_REQUEST, detail=str(exc)
+            )
+            continue
+        accepted.append((index, _order_values(order, user_id, city, quote.total), quote))
+
+    def write(session: Session) -> List[schemas.Order]:
+        created_at = datetime.now(timezone.utc)
+        order_ids = _insert_returning_ids(
+            session, models.Order, [{**values, "created_at": created_at} for _, values, _ in accepted]
         )
-        for o in orders
-    ]
+        item_rows = [
+            {"order_id": order_id, "service_name": name, "quantity": quantity, "price": price}
+            for order_id, (_, _, quote) in zip(order_ids, accepted)
+            for name, quantity, price in quote.items
+        ]
+        item_ids = iter(_insert_returning_ids(session, models.OrderItem, item_rows))
+        _credit_new_orders(session, user_id, zip(order_ids, (quote.total for _, _, quote in accepted)))
+        return [
+            schemas.Order(
+                id=order_id,
+                created_at=created_at,
+                items=[
+                    schemas.OrderItem(id=next(item_ids), service_name=name, quantity=quantity, price=price)
+                    for name, quantity, price in quote.items
+                ],
+                **values,
+            )
+            for order_id, (_, values, quote) in zip(order_ids, accepted)
+        ]
 
+    created = run_write(db, write) if accepted else []
+    if created:
+        principal_cache.invalidate_user(user_id)  # reward points changed via Core UPDATE
+    for (index, _, _), order in zip(accepted, created):
+        results[index] = schemas.OrderBulkItemResult(index=index, status=status.HTTP_201_CREATED, order=order)
+        order_board.publish(ORDER_CREATED, order)
+    return schemas.OrderBulkResult(
+        created=len(created), rejected=len(payload.orders) - len(created), results=results
+    )
 
 
+@router.get("/me", response_model=schemas.Page[schemas.Order])
+def list_my_orders(
+    request: Request,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user),
+) -> Response:
+    """
+    Get order history for the current user, newest first (keyset-paginated).
+    Supports `If-None-Match` (304 while none of the user's orders changed).
+    """
+    owned = models.Order.user_id == current_user.id
+    return conditional_response(request, db, [orders_key(current_user.id)], lambda: order_page(db, page, owned))
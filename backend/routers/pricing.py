@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Request, Response
+
+from ..pricing import CATALOG_CACHE_CONTROL, get_catalog
+from ..utils.etag import etag_matches
+
+router = APIRouter()
+
+
+@router.get("/catalog")
+def read_pricing_catalog(request: Request) -> Response:
+    """
+    Services, city adjustments and base rates the calculator prices with
+    (the same catalog `create_order` charges from). Public and cacheable;
+    supports `If-None-Match`.
+    """
+    catalog = get_catalog()
+    headers = {"ETag": catalog.etag, "Cache-Control": CATALOG_CACHE_CONTROL}
+    if etag_matches(request, catalog.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(catalog.body, media_type="application/json", headers=headers)
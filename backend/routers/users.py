@@ -1,48 +1,41 @@
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 
 from .. import models, schemas
 from ..auth import get_current_active_user
 from ..database import get_db
+from ..read_models import order_page
+from ..serializers import address_to_schema, feedback_to_schema, user_to_schema
+from ..utils.etag import bump_versions, conditional_response, orders_key, user_key
+from ..utils.pagination import PageParams
 
 router = APIRouter()
 
 
-def _user_to_schema(user: models.User) -> schemas.User:
-    return schemas.User(
-        id=user.id,
-        name=user.name,
-        surname=user.surname,
-        email=user.email,
-        phone=user.phone,
-        role=user.role,
-        city=user.city,
-        reward_points=user.reward_points,
-        totp_enabled=bool(user.is_totp_enabled and user.totp_secret),
-        totp_setup_pending=bool(user.totp_secret and not user.is_totp_enabled),
-        addresses=[
-            schemas.Address(
-                id=addr.id,
-                address=addr.address,
-                apartment=addr.apartment,
-                latitude=addr.latitude,
-                longitude=addr.longitude,
-            )
-            for addr in user.addresses
-        ],
-    )
+def _fresh(db: Session, user: models.User) -> models.User:
+    """
+    `user` reloaded after the ETag's version was read. The principal may come
+    from the auth cache, and a body older than its tag would be pinned by 304s.
+    """
+    db.refresh(user)
+    return user
 
 
 @router.get("/me", response_model=schemas.User)
 def read_me(
+    request: Request,
+    db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user),
-) -> schemas.User:
+) -> Response:
     """
     Get current authenticated user profile, including addresses and reward points.
+    Supports `If-None-Match` (304 while the profile is unchanged).
     """
-    return _user_to_schema(current_user)
+    return conditional_response(
+        request, db, [user_key(current_user.id)], lambda: user_to_schema(_fresh(db, current_user))
+    )
 
 
 @router.put("/me", response_model=schemas.User)
@@ -64,28 +57,27 @@ def update_me(
         current_user.city = payload.city
 
     db.add(current_user)
+    bump_versions(db, user_key(current_user.id))
     db.commit()
     db.refresh(current_user)
-    return _user_to_schema(current_user)
+    return user_to_schema(current_user)
 
 
 @router.get("/me/addresses", response_model=List[schemas.Address])
 def list_my_addresses(
+    request: Request,
+    db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user),
-) -> List[schemas.Address]:
+) -> Response:
     """
-    List saved addresses for the current user.
+    List saved addresses for the current user. Supports `If-None-Match`.
     """
-    return [
-        schemas.Address(
-            id=a.id,
-            address=a.address,
-            apartment=a.apartment,
-            latitude=a.latitude,
-            longitude=a.longitude,
-        )
-        for a in current_user.addresses
-    ]
+    return conditional_response(
+        request,
+        db,
+        [user_key(current_user.id)],
+        lambda: [address_to_schema(a) for a in _fresh(db, current_user).addresses],
+    )
 
 
 @router.post("/me/addresses", response_model=schemas.Address, status_code=status.HTTP_201_CREATED)
@@ -105,15 +97,10 @@ def add_address(
         longitude=payload.longitude,
     )
     db.add(addr)
+    bump_versions(db, user_key(current_user.id))
     db.commit()
     db.refresh(addr)
-    return schemas.Address(
-        id=addr.id,
-        address=addr.address,
-        apartment=addr.apartment,
-        latitude=addr.latitude,
-        longitude=addr.longitude,
-    )
+    return address_to_schema(addr)
 
 
 @router.delete("/me/addresses/{address_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -133,51 +120,23 @@ def delete_address(
     if not addr:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Address not found")
     db.delete(addr)
+    bump_versions(db, user_key(current_user.id))
     db.commit()
 
 
-@router.get("/me/orders", response_model=List[schemas.Order])
+@router.get("/me/orders", response_model=schemas.Page[schemas.Order])
 def list_my_orders(
+    request: Request,
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user),
-) -> List[schemas.Order]:
+) -> Response:
     """
-    Get order history for the current user.
+    Get order history for the current user, newest first (keyset-paginated).
+    Supports `If-None-Match`.
     """
-    orders = (
-        db.query(models.Order)
-            .filter(models.Order.user_id == current_user.id)
-            .order_by(models.Order.created_at.desc())
-            .all()
-    )
-    return [
-        schemas.Order(
-            id=o.id,
-            user_id=o.user_id,
-            cleaner_id=o.cleaner_id,
-            status=o.status,
-            total_price=o.total_price,
-            created_at=o.created_at,
-            property_type=o.property_type,
-            rooms=o.rooms,
-            bathrooms=o.bathrooms,
-            cleaning_type=o.cleaning_type,
-            address=o.address,
-            apartment=o.apartment,
-            city=o.city,
-            phone=o.phone,
-            items=[
-                schemas.OrderItem(
-                    id=i.id,
-                    service_name=i.service_name,
-                    quantity=i.quantity,
-                    price=i.price,
-                )
-                for i in o.items
-            ],
-        )
-        for o in orders
-    ]
+    owned = models.Order.user_id == current_user.id
+    return conditional_response(request, db, [orders_key(current_user.id)], lambda: order_page(db, page, owned))
 
 
 @router.post("/me/feedback", response_model=schemas.Feedback, status_code=status.HTTP_201_CREATED)
@@ -229,21 +188,4 @@ def create_feedback(
     db.commit()
     db.refresh(feedback)
     
-    return schemas.Feedback(
-        id=feedback.id,
-        order_id=feedback.order_id,
-        user_id=feedback.user_id,
-        comment=feedback.comment,
-        rating=feedback.rating,
-        created_at=feedback.created_at,
-        user=schemas.UserBase(
-            name=current_user.name,
-            surname=current_user.surname,
-            email=current_user.email,
-            phone=current_user.phone,
-            city=current_user.city,
-        ),
-    )
-
-
-
+    return feedback_to_schema(feedback)
@@ -1,7 +1,10 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Generic, List, Optional, TypeVar
 
 from pydantic import BaseModel, EmailStr, Field
+from pydantic.generics import GenericModel
+
+T = TypeVar("T")
 
 
 # Shared / nested schemas
@@ -34,7 +37,8 @@ class OrderItemBase(BaseModel):
 
 
 class OrderItemCreate(OrderItemBase):
-    pass
+    # Ignored: the server prices items from the catalog (see `pricing`).
+    price: Optional[float] = Field(default=None, ge=0)
 
 
 class OrderItem(OrderItemBase):
@@ -74,6 +78,26 @@ class Order(OrderBase):
         orm_mode = True
 
 
+MAX_BULK_ORDERS = 500
+
+
+class OrderBulkCreate(BaseModel):
+    orders: List[OrderCreate] = Field(..., min_items=1, max_items=MAX_BULK_ORDERS)
+
+
+class OrderBulkItemResult(BaseModel):
+    index: int  # position in the request's `orders`
+    status: int  # 201 created, 400 rejected
+    order: Optional[Order] = None
+    detail: Optional[str] = None
+
+
+class OrderBulkResult(BaseModel):
+    created: int
+    rejected: int
+    results: List[OrderBulkItemResult]
+
+
 class UserBase(BaseModel):
     name: Optional[str] = None
     surname: Optional[str] = None
@@ -194,6 +218,30 @@ class AdminUpdateOrder(BaseModel):
     cleaner_id: Optional[int] = None
 
 
+class DispatchAssignment(BaseModel):
+    order_id: int
+    cleaner_id: int
+    distance_km: float
+
+
+class DispatchResult(BaseModel):
+    pending_orders: int
+    available_cleaners: int
+    assigned: int
+    assignments: List[DispatchAssignment] = []
+
+
+class PasswordHashingStats(BaseModel):
+    workers: int
+    max_pending: int
+    pending: int
+    queued: int
+    completed: int
+    rejected: int
+    latency_p50_ms: float
+    latency_p99_ms: float
+
+
 class StatusUpdate(BaseModel):
     status: str
 
@@ -217,3 +265,11 @@ class Feedback(BaseModel):
         orm_mode = True
 
 
+class Page(GenericModel, Generic[T]):
+    """
+    One page of a keyset-paginated listing. Pass `next_cursor` back as
+    `?cursor=` to get the following page; it is null on the last page.
+    """
+
+    items: List[T]
+    next_cursor: Optional[str] = None
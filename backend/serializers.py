@@ -0,0 +1,99 @@
+"""
+ORM -> response schema conversion shared by all routers.
+
+List endpoints must pair these with the matching loader options below
+(`ORDER_LOAD`, `USER_LOAD`, ...) so relationships are fetched up front in a
+constant number of queries instead of one lazy load per row.
+"""
+from sqlalchemy.orm import joinedload, selectinload
+
+from . import models, schemas
+
+ORDER_LOAD = (selectinload(models.Order.items),)
+USER_LOAD = (selectinload(models.User.addresses),)
+CLEANER_LOAD = (joinedload(models.Cleaner.user).selectinload(models.User.addresses),)
+FEEDBACK_LOAD = (joinedload(models.Feedback.user),)
+
+
+def address_to_schema(addr: models.Address) -> schemas.Address:
+    return schemas.Address(
+        id=addr.id,
+        address=addr.address,
+        apartment=addr.apartment,
+        latitude=addr.latitude,
+        longitude=addr.longitude,
+    )
+
+
+def user_to_schema(user: models.User) -> schemas.User:
+    return schemas.User(
+        id=user.id,
+        name=user.name,
+        surname=user.surname,
+        email=user.email,
+        phone=user.phone,
+        role=user.role,
+        city=user.city,
+        reward_points=user.reward_points,
+        totp_enabled=bool(user.is_totp_enabled and user.totp_secret),
+        totp_setup_pending=bool(user.totp_secret and not user.is_totp_enabled),
+        addresses=[address_to_schema(a) for a in user.addresses],
+    )
+
+
+def order_to_schema(order: models.Order) -> schemas.Order:
+    return schemas.Order(
+        id=order.id,
+        user_id=order.user_id,
+        cleaner_id=order.cleaner_id,
+        status=order.status,
+        total_price=order.total_price,
+        created_at=order.created_at,
+        property_type=order.property_type,
+        rooms=order.rooms,
+        bathrooms=order.bathrooms,
+        cleaning_type=order.cleaning_type,
+        address=order.address,
+        apartment=order.apartment,
+        city=order.city,
+        phone=order.phone,
+        latitude=order.latitude,
+        longitude=order.longitude,
+        items=[
+            schemas.OrderItem(
+                id=i.id,
+                service_name=i.service_name,
+                quantity=i.quantity,
+                price=i.price,
+            )
+            for i in order.items
+        ],
+    )
+
+
+def cleaner_to_schema(cleaner: models.Cleaner) -> schemas.Cleaner:
+    return schemas.Cleaner(
+        id=cleaner.id,
+        user_id=cleaner.user_id,
+        availability=cleaner.availability,
+        user=user_to_schema(cleaner.user),
+    )
+
+
+def feedback_to_schema(feedback: models.Feedback) -> schemas.Feedback:
+    user = feedback.user
+    return schemas.Feedback(
+        id=feedback.id,
+        order_id=feedback.order_id,
+        user_id=feedback.user_id,
+        comment=feedback.comment,
+        rating=feedback.rating,
+        created_at=feedback.created_at,
+        user=schemas.UserBase(
+            name=user.name,
+            surname=user.surname,
+            email=user.email,
+            phone=user.phone,
+            city=user.city,
+        ) if user else None,
+    )
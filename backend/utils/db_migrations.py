@@ -1,50 +1,246 @@
+"""
+Versioned schema migrations (no Alembic), for SQLite and server databases.
+
+Applied versions are recorded in `schema_version`, so a normal boot costs a
+single `SELECT MAX(version)`. Each step runs in its own transaction together
+with its version row. Steps must stay safe on databases created by
+`Base.metadata.create_all`, which already has the latest columns and indexes,
+and use only DDL that SQLite, PostgreSQL and MySQL all accept.
+
+    python -m backend.utils.db_migrations            # create tables + upgrade
+    python -m backend.utils.db_migrations status
+"""
 from __future__ import annotations
 
-from sqlalchemy import Engine, text
+import argparse
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from sqlalchemy import (
+    Column,
+    Connection,
+    DateTime,
+    Engine,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    func,
+    inspect,
+    select,
+    text,
+)
+
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from .geo import geo_cell
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[[Connection], None]
+
+
+def _has_column(conn: Connection, table_name: str, column_name: str) -> bool:
+    return any(c["name"] == column_name for c in inspect(conn).get_columns(table_name))
+
+
+def _add_column(conn: Connection, table_name: str, column_name: str, ddl: str) -> bool:
+    if _has_column(conn, table_name, column_name):
+        return False
+    conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {ddl}"))
+    return True
+
+
+def _create_indexes(conn: Connection, table_name: str, indexes: List[tuple]) -> None:
+    existing = {ix["name"] for ix in inspect(conn).get_indexes(table_name)}
+    for index_name, columns in indexes:
+        if index_name not in existing:
+            conn.execute(text(f"CREATE INDEX {index_name} ON {table_name} ({columns})"))
+
+
+def _legacy_columns(conn: Connection) -> None:
+    _add_column(conn, "users", "phone", "VARCHAR(50)")
+    if _add_column(conn, "users", "is_totp_enabled", "BOOLEAN NOT NULL DEFAULT FALSE"):
+        # Preserve old behavior: if a user already has totp_secret set, treat as enabled.
+        conn.execute(text("UPDATE users SET is_totp_enabled = TRUE WHERE totp_secret IS NOT NULL"))
+    _add_column(conn, "addresses", "latitude", "FLOAT")
+    _add_column(conn, "addresses", "longitude", "FLOAT")
+    _add_column(conn, "orders", "latitude", "FLOAT")
+    _add_column(conn, "orders", "longitude", "FLOAT")
+
+
+def _order_geo_cell(conn: Connection) -> None:
+    if _add_column(conn, "orders", "geo_cell", "INTEGER"):
+        # Backfill grid cells for orders that already have coordinates.
+        rows = conn.execute(
+            text("SELECT id, latitude, longitude FROM orders WHERE latitude IS NOT NULL AND longitude IS NOT NULL")
+        ).fetchall()
+        if rows:
+            conn.execute(
+                text("UPDATE orders SET geo_cell = :cell WHERE id = :id"),
+                [{"id": r[0], "cell": geo_cell(r[1], r[2])} for r in rows],
+            )
+    _create_indexes(conn, "orders", [("ix_orders_status_geo_cell", "status, geo_cell")])
+
+
+def _pagination_indexes(conn: Connection) -> None:
+    _create_indexes(
+        conn,
+        "orders",
+        [
+            ("ix_orders_created_at_id", "created_at, id"),
+            ("ix_orders_user_id_created_at_id", "user_id, created_at, id"),
+            ("ix_orders_cleaner_id_created_at_id", "cleaner_id, created_at, id"),
+            ("ix_orders_status_cleaner_id_created_at_id", "status, cleaner_id, created_at, id"),
+        ],
+    )
+    _create_indexes(conn, "feedbacks", [("ix_feedbacks_created_at_id", "created_at, id")])
+
+
+def _lookup_indexes(conn: Connection) -> None:
+    # Active-order checks (take/claim/status updates) and duplicate-feedback checks.
+    _create_indexes(conn, "orders", [("ix_orders_cleaner_id_status", "cleaner_id, status")])
+    _create_indexes(conn, "feedbacks", [("ix_feedbacks_order_id_user_id", "order_id, user_id")])
+
+
+def _foreign_key_indexes(conn: Connection) -> None:
+    # Batched item/address loads for listings (`WHERE order_id IN (...)`, `WHERE user_id IN (...)`).
+    _create_indexes(conn, "order_items", [("ix_order_items_order_id", "order_id")])
+    _create_indexes(conn, "addresses", [("ix_addresses_user_id", "user_id")])
+
+
+def _email_outbox(conn: Connection) -> None:
+    from ..models import EmailOutbox
+
+    EmailOutbox.__table__.create(conn, checkfirst=True)
 
 
-def _sqlite_has_column(conn, table_name: str, column_name: str) -> bool:
-    rows = conn.execute(text(f"PRAGMA table_info({table_name})")).fetchall()
-    # PRAGMA table_info returns: cid, name, type, notnull, dflt_value, pk
-    return any(r[1] == column_name for r in rows)
+def _resource_versions(conn: Connection) -> None:
+    from ..models import ResourceVersion
 
+    ResourceVersion.__table__.create(conn, checkfirst=True)
 
-def apply_sqlite_migrations(engine: Engine) -> None:
+
+def _pricing_catalog(conn: Connection) -> None:
+    from ..models import PricingBaseRate, PricingCityAdjustment, PricingService
+    from ..pricing import seed_catalog
+
+    for model in (PricingService, PricingCityAdjustment, PricingBaseRate):
+        model.__table__.create(conn, checkfirst=True)
+    seed_catalog(conn)
+
+
+def _idempotency_keys(conn: Connection) -> None:
+    from ..models import IdempotencyKey
+
+    IdempotencyKey.__table__.create(conn, checkfirst=True)
+
+
+def _reward_ledger(conn: Connection) -> None:
+    from ..models import RewardLedgerEntry
+    from ..rewards import OPENING
+
+    RewardLedgerEntry.__table__.create(conn, checkfirst=True)
+    # Carry existing balances over as one opening entry each, so the ledger
+    # sums match `users.reward_points` from the start.
+    conn.execute(
+        text(
+            "INSERT INTO reward_ledger (user_id, points, reason, created_at) "
+            "SELECT id, reward_points, :reason, CURRENT_TIMESTAMP FROM users "
+            "WHERE reward_points <> 0 AND NOT EXISTS (SELECT 1 FROM reward_ledger WHERE reward_ledger.user_id = users.id)"
+        ),
+        {"reason": OPENING},
+    )
+
+
+# Append-only: never renumber or edit a released step, add a new one instead.
+MIGRATIONS: List[Migration] = [
+    Migration(1, "legacy columns (phone, TOTP flag, coordinates)", _legacy_columns),
+    Migration(2, "orders.geo_cell with backfill and index", _order_geo_cell),
+    Migration(3, "keyset pagination indexes", _pagination_indexes),
+    Migration(4, "cleaner active-order and feedback lookup indexes", _lookup_indexes),
+    Migration(5, "email_outbox table", _email_outbox),
+    Migration(6, "resource_versions table (ETags)", _resource_versions),
+    Migration(7, "pricing catalog tables with the calculator's prices", _pricing_catalog),
+    Migration(8, "idempotency_keys table", _idempotency_keys),
+    Migration(9, "reward_ledger table with opening balances", _reward_ledger),
+    Migration(10, "order_items.order_id and addresses.user_id indexes", _foreign_key_indexes),
+]
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+_schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("name", String(255), nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False, server_default=func.now()),
+)
+
+
+def stored_version(engine: Engine) -> int:
     """
-    Lightweight SQLite migrations for dev/demo (no Alembic).
-    Safe to call multiple times.
+    The recorded schema version in one read and without DDL; 0 when
+    `schema_version` does not exist yet (a new or pre-migration database).
     """
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(func.coalesce(func.max(_schema_version.c.version), 0))).scalar_one()
+    except (OperationalError, ProgrammingError):
+        return 0
+
+
+def current_version(engine: Engine) -> int:
     with engine.begin() as conn:
-        # ---- users table ----
-        # Add is_totp_enabled flag.
-        if _sqlite_has_column(conn, "users", "id"):
-            if not _sqlite_has_column(conn, "users", "phone"):
-                conn.execute(text("ALTER TABLE users ADD COLUMN phone VARCHAR(50)"))
-            if not _sqlite_has_column(conn, "users", "is_totp_enabled"):
-                conn.execute(
-                    text(
-                        "ALTER TABLE users ADD COLUMN is_totp_enabled BOOLEAN NOT NULL DEFAULT 0"
-                    )
-                )
-                # Preserve old behavior: if a user already has totp_secret set, treat as enabled.
-                conn.execute(
-                    text(
-                        "UPDATE users SET is_totp_enabled = 1 WHERE totp_secret IS NOT NULL"
-                    )
-                )
-
-        # ---- addresses table ----
-        if _sqlite_has_column(conn, "addresses", "id"):
-            if not _sqlite_has_column(conn, "addresses", "latitude"):
-                conn.execute(text("ALTER TABLE addresses ADD COLUMN latitude FLOAT"))
-            if not _sqlite_has_column(conn, "addresses", "longitude"):
-                conn.execute(text("ALTER TABLE addresses ADD COLUMN longitude FLOAT"))
-
-        # ---- orders table ----
-        if _sqlite_has_column(conn, "orders", "id"):
-            if not _sqlite_has_column(conn, "orders", "latitude"):
-                conn.execute(text("ALTER TABLE orders ADD COLUMN latitude FLOAT"))
-            if not _sqlite_has_column(conn, "orders", "longitude"):
-                conn.execute(text("ALTER TABLE orders ADD COLUMN longitude FLOAT"))
+        _schema_version.create(conn, checkfirst=True)
+        return conn.execute(select(func.coalesce(func.max(_schema_version.c.version), 0))).scalar_one()
+
+
+def run_migrations(engine: Engine, target: Optional[int] = None) -> List[Migration]:
+    """
+    Apply pending migrations up to `target` (default: latest) and return the
+    steps that ran. Safe to call on every boot.
+    """
+    target = LATEST_VERSION if target is None else target
+    version = current_version(engine)
+    applied: List[Migration] = []
+    for migration in MIGRATIONS:
+        if migration.version <= version or migration.version > target:
+            continue
+        with engine.begin() as conn:
+            migration.apply(conn)
+            conn.execute(_schema_version.insert().values(version=migration.version, name=migration.name))
+        applied.append(migration)
+        print(f"[MIGRATE] Applied {migration.version}: {migration.name}")
+    return applied
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="TazaBolsyn schema migrations")
+    sub = parser.add_subparsers(dest="command")
+    upgrade = sub.add_parser("upgrade", help="create missing tables and apply pending migrations (default)")
+    upgrade.add_argument("--to", type=int, default=None, help="stop at this version")
+    sub.add_parser("status", help="show the current and latest schema version")
+    args = parser.parse_args(argv)
+
+    from .. import models  # noqa: F401  (registers tables on Base.metadata)
+    from ..database import Base, engine
+
+    if args.command == "status":
+        version = current_version(engine)
+        print(f"schema version {version} (latest {LATEST_VERSION})")
+        for migration in MIGRATIONS:
+            mark = "x" if migration.version <= version else " "
+            print(f"  [{mark}] {migration.version}: {migration.name}")
+        return
+
+    Base.metadata.create_all(bind=engine)
+    applied = run_migrations(engine, getattr(args, "to", None))
+    print(f"schema version {current_version(engine)} ({len(applied)} migration(s) applied)")
 
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Weak ETags and conditional GET from per-resource version counters.
+
+Every cacheable representation is covered by one or more keys in
+`resource_versions`:
+
+    user:<id>     the user's profile (`/users/me`, addresses, reward points)
+    orders:<id>   orders the user placed or is assigned to as a cleaner
+    orders        any order at all (order board, admin listing)
+
+Mutating endpoints call `bump_versions` / `bump_order_versions` on the session
+that carries the change, so a counter moves exactly when the change commits.
+A GET reads its counters with one primary-key lookup and answers a matching
+`If-None-Match` with 304 before any listing query or serialization runs.
+Responses carry `Cache-Control: private, no-cache`, so browsers revalidate
+with the stored ETag on every `fetch` without any client changes.
+"""
+from __future__ import annotations
+
+import hashlib
+from typing import Any, Callable, Iterable, Optional, Sequence
+
+from fastapi import Request, Response
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..database import DATABASE_BACKEND
+from .responses import as_response
+
+ORDERS = "orders"
+CACHE_CONTROL = "private, no-cache"
+
+
+def user_key(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def orders_key(user_id: int) -> str:
+    return f"orders:{user_id}"
+
+
+def _upsert(keys: Sequence[str]):
+    table = models.ResourceVersion.__table__
+    rows = [{"key": k, "version": 1} for k in keys]
+    if DATABASE_BACKEND == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+
+        stmt = insert(table).values(rows)
+        return stmt.on_duplicate_key_update(version=table.c.version + 1)
+    if DATABASE_BACKEND == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table).values(rows).on_conflict_do_update(
+        index_elements=[table.c.key], set_={"version": table.c.version + 1}
+    )
+
+
+def bump_versions(db: Session, *keys: str) -> None:
+    """
+    Increment the counters for `keys` inside the caller's transaction.
+    """
+    unique = sorted(set(keys))  # fixed order: concurrent bumps lock rows in the same sequence
+    if unique:
+        db.execute(_upsert(unique))
+
+
+def bump_order_versions(db: Session, *user_ids: Optional[int]) -> None:
+    """
+    An order changed: bump the global order counter and those of its customer
+    and cleaner(s). `None` ids (unassigned cleaner) are ignored.
+    """
+    bump_versions(db, ORDERS, *(orders_key(uid) for uid in user_ids if uid is not None))
+
+
+def read_versions(db: Session, keys: Iterable[str]) -> str:
+    keys = list(keys)
+    found = dict(
+        db.execute(
+            select(models.ResourceVersion.key, models.ResourceVersion.version).where(
+                models.ResourceVersion.key.in_(keys)
+            )
+        ).all()
+    )
+    return ",".join(f"{k}={found.get(k, 0)}" for k in keys)
+
+
+def make_etag(request: Request, versions: str) -> str:
+    # Path and query are part of the tag: each page / filter is its own representation.
+    raw = f"{versions}|{request.url.path}?{request.url.query}".encode()
+    return f'W/"{hashlib.blake2b(raw, digest_size=12).hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Weak comparison against `If-None-Match` (RFC 9110 13.1.2).
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag[2:]
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+def conditional_response(
+    request: Request, db: Session, keys: Iterable[str], render: Callable[[], Any]
+) -> Response:
+    """
+    304 if the client's ETag is current, otherwise `render()` (a response or
+    a trusted `response_model` instance, see `utils.responses`) with the ETag.
+    """
+    etag = make_etag(request, read_versions(db, keys))
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response = as_response(render())
+    response.headers.update(headers)
+    return response
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import math
+from typing import Dict, List, Optional, Tuple
+
+# Orders are bucketed into a fixed lat/lng grid so "near me" queries can use an
+# index instead of scanning every pending order. 0.1° is ~11 km north-south,
+# which keeps a typical 25 km search to a handful of index ranges.
+CELL_DEG = 0.1
+_ROWS = int(round(180 / CELL_DEG))
+_COLS = int(round(360 / CELL_DEG))
+
+EARTH_RADIUS_KM = 6371.0088
+_KM_PER_DEG_LAT = 111.32
+
+
+def _row(lat: float) -> int:
+    return min(_ROWS - 1, max(0, int(math.floor((lat + 90.0) / CELL_DEG))))
+
+
+def _col(lng: float) -> int:
+    return min(_COLS - 1, max(0, int(math.floor((lng + 180.0) / CELL_DEG))))
+
+
+def geo_cell(lat: Optional[float], lng: Optional[float]) -> Optional[int]:
+    """
+    Grid cell id for a coordinate, or None when the coordinate is missing.
+    Cells are numbered row-major, so cells in one latitude band are contiguous.
+    """
+    if lat is None or lng is None:
+        return None
+    return _row(lat) * _COLS + _col(lng)
+
+
+def cell_ranges(lat: float, lng: float, radius_km: float) -> List[Tuple[int, int]]:
+    """
+    Inclusive (first, last) cell-id ranges covering a circle's bounding box,
+    one range per latitude band. Longitude is clamped rather than wrapped at
+    the antimeridian.
+    """
+    dlat = radius_km / _KM_PER_DEG_LAT
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    dlng = min(180.0, radius_km / (_KM_PER_DEG_LAT * cos_lat))
+    first_col, last_col = _col(lng - dlng), _col(lng + dlng)
+    return [
+        (row * _COLS + first_col, row * _COLS + last_col)
+        for row in range(_row(lat - dlat), _row(lat + dlat) + 1)
+    ]
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """
+    Great-circle distance between two points in kilometres.
+    """
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+# Approximate city centres for the cities offered in the frontend. Cleaners only
+# have a city, so dispatch uses these as their location.
+CITY_CENTROIDS: Dict[str, Tuple[float, float]] = {
+    "almaty": (43.2389, 76.8897),
+    "astana": (51.1694, 71.4491),
+    "shymkent": (42.3417, 69.5901),
+    "karaganda": (49.8047, 73.1094),
+    "aktobe": (50.2839, 57.1670),
+    "pavlodar": (52.2873, 76.9674),
+    "oskemen": (49.9483, 82.6279),
+    "semey": (50.4111, 80.2275),
+    "atyrau": (47.0945, 51.9238),
+    "kostanay": (53.2144, 63.6246),
+    "kyzylorda": (44.8488, 65.4823),
+    "taraz": (42.9000, 71.3667),
+    "petropavl": (54.8753, 69.1628),
+    "temirtau": (50.0549, 72.9646),
+    "oral": (51.2333, 51.3667),
+    "ekibastuz": (51.7298, 75.3266),
+    "aktau": (43.6511, 51.1978),
+}
+
+
+def city_centroid(city: Optional[str]) -> Optional[Tuple[float, float]]:
+    if not city:
+        return None
+    return CITY_CENTROIDS.get(city.strip().lower())
@@ -0,0 +1,190 @@
+"""
+`Idempotency-Key` support for retried writes (mobile clients on flaky networks).
+
+A client sends the same key with every retry of one logical request. The first
+successful response is stored in `idempotency_keys` by the write job itself,
+so it commits (or rolls back) together with the order change: a retry can
+never see the order without the stored response or the other way round.
+Retries then get that response replayed, with `Idempotent-Replayed: true`,
+from one primary-key lookup and never reach the order tables.
+
+- Keys are scoped to the authenticated user and expire after
+  `IDEMPOTENCY_TTL_SECONDS`; expired rows are swept by the write path at most
+  every `IDEMPOTENCY_SWEEP_SECONDS` per process.
+- Reusing a key for a different request (method, path or body) is a 422.
+- Only successful responses are stored. A failed attempt rolled back
+  everything it did, so a retry simply runs again.
+- Concurrent duplicates are settled by the key row itself: the write job
+  inserts it before doing anything else and fills in the response at the
+  end. A duplicate running at the same time blocks on that insert (server
+  databases) or runs after it (SQLite writer queue), then replays the
+  committed response; if the first attempt rolled back, it simply proceeds.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional, TypeVar, Union
+
+from fastapi import Depends, Header, HTTPException, Request, Response, status
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..auth import get_current_user
+from .responses import FastJSONResponse
+from .write_queue import run_write
+
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_SWEEP_SECONDS = float(os.getenv("IDEMPOTENCY_SWEEP_SECONDS", "300"))
+MAX_KEY_LENGTH = 255
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+T = TypeVar("T")
+
+_last_sweep = 0.0
+
+
+@dataclass(frozen=True)
+class IdempotencyKey:
+    user_id: int
+    key: str
+    fingerprint: str
+
+
+async def idempotency_key(
+    request: Request,
+    key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    current_user: models.User = Depends(get_current_user),
+) -> Optional[IdempotencyKey]:
+    """
+    Dependency: the request's `Idempotency-Key`, or None when it sent none.
+    """
+    if key is None:
+        return None
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters",
+        )
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{request.method} {request.url.path}\n".encode())
+    digest.update(await request.body())  # already read (and cached) for the payload
+    return IdempotencyKey(current_user.id, key, digest.hexdigest())
+
+
+def _expired(expires_at: datetime) -> bool:
+    if expires_at.tzinfo is None:  # SQLite drops the offset; values are stored in UTC
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return expires_at <= datetime.now(timezone.utc)
+
+
+def _lookup(session: Session, idem: IdempotencyKey) -> Optional[Any]:
+    table = models.IdempotencyKey.__table__
+    return session.execute(
+        select(table.c.fingerprint, table.c.status_code, table.c.body, table.c.expires_at).where(
+            table.c.user_id == idem.user_id, table.c.key == idem.key
+        )
+    ).first()
+
+
+def _replay(row: Any, idem: IdempotencyKey) -> Response:
+    if row.fingerprint != idem.fingerprint:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used for a different request",
+        )
+    return Response(
+        content=row.body,
+        status_code=row.status_code,
+        media_type="application/json",
+        headers={REPLAYED_HEADER: "true"},
+    )
+
+
+def stored_response(session: Session, idem: IdempotencyKey) -> Optional[Response]:
+    """
+    The stored response for `idem` (to replay), or None if there is none yet.
+    """
+    row = _lookup(session, idem)
+    if row is None or _expired(row.expires_at):
+        return None
+    return _replay(row, idem)
+
+
+def _sweep(session: Session) -> None:
+    global _last_sweep
+    now = time.monotonic()
+    if now - _last_sweep < IDEMPOTENCY_SWEEP_SECONDS:
+        return
+    _last_sweep = now
+    table = models.IdempotencyKey.__table__
+    session.execute(delete(table).where(table.c.expires_at <= datetime.now(timezone.utc)))
+
+
+def _claim(session: Session, idem: IdempotencyKey) -> None:
+    now = datetime.now(timezone.utc)
+    session.execute(
+        insert(models.IdempotencyKey.__table__).values(
+            user_id=idem.user_id,
+            key=idem.key,
+            fingerprint=idem.fingerprint,
+            status_code=0,  # filled in by _complete before the transaction commits
+            body=b"",
+            created_at=now,
+            expires_at=now + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS),
+        )
+    )
+
+
+def _complete(session: Session, idem: IdempotencyKey, status_code: int, result: Any) -> None:
+    table = models.IdempotencyKey.__table__
+    session.execute(
+        update(table)
+        .where(table.c.user_id == idem.user_id, table.c.key == idem.key)
+        .values(status_code=status_code, body=FastJSONResponse(result).body)
+    )
+
+
+def run_idempotent(
+    db: Session,
+    idem: Optional[IdempotencyKey],
+    fn: Callable[[Session], T],
+    status_code: int = status.HTTP_200_OK,
+) -> Union[T, Response]:
+    """
+    `run_write(db, fn)` at most once per key. Returns `fn`'s result, or the
+    stored response as a `Response` when this is a retry; callers return that
+    as is and skip their post-commit side effects (board events, caches).
+    """
+    if idem is None:
+        return run_write(db, fn)
+    replay = stored_response(db, idem)
+    if replay is not None:
+        return replay
+
+    def job(session: Session) -> Union[T, Response]:
+        row = _lookup(session, idem)
+        if row is not None:
+            if not _expired(row.expires_at):
+                return _replay(row, idem)
+            table = models.IdempotencyKey.__table__
+            session.execute(delete(table).where(table.c.user_id == idem.user_id, table.c.key == idem.key))
+        _sweep(session)
+        _claim(session, idem)  # concurrent duplicates wait here until this commits or rolls back
+        result = fn(session)
+        _complete(session, idem, status_code, result)
+        return result
+
+    try:
+        return run_write(db, job)
+    except IntegrityError:
+        # A concurrent duplicate claimed the key first and committed: answer like a retry.
+        replay = stored_response(db, idem)
+        if replay is None:
+            raise
+        return replay
@@ -0,0 +1,237 @@
+"""
+Prometheus metrics at `/metrics` (text exposition format 0.0.4).
+
+`MetricsMiddleware` is a pure ASGI middleware that counts requests and
+records their latency per (method, route template) in fixed histogram
+buckets. It only touches plain ints and lists on the event-loop thread, so
+the cost per request is a few microseconds (`benchmarks/metrics_overhead.py`).
+Everything else (connection pools, bcrypt pool, write queue, auth cache,
+rate limiter, email sender and outbox) is read from the existing counters
+when the endpoint is scraped.
+
+All values are per process: with several workers, scrape each one or sum.
+Set `METRICS_TOKEN` to require `Authorization: Bearer <token>`.
+"""
+from __future__ import annotations
+
+import hmac
+import os
+import time
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Tuple
+
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from .. import models
+from ..database import USE_SQLITE_WRITER, SessionLocal, TimedQueuePool, engine, read_engine
+from ..email_service import email_sender
+from .password_hashing import password_hasher
+from .principal_cache import principal_cache
+from .rate_limit import limiter
+from .write_queue import write_queue
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Latency:
+    __slots__ = ("buckets", "count", "total")
+
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # last one is +Inf
+        self.count = 0
+        self.total = 0.0
+
+
+class RequestMetrics:
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        self.latency: Dict[Tuple[str, str], _Latency] = {}
+
+    def observe(self, method: str, route: str, status_code: int, seconds: float) -> None:
+        key = (method, route, status_code)
+        self.requests[key] = self.requests.get(key, 0) + 1
+        latency = self.latency.get((method, route))
+        if latency is None:
+            latency = self.latency[(method, route)] = _Latency()
+        latency.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        latency.count += 1
+        latency.total += seconds
+
+
+request_metrics = RequestMetrics()
+
+
+class MetricsMiddleware:
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500  # if the app raises before responding
+
+        async def send_with_status(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        request_metrics.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            request_metrics.in_flight -= 1
+            # Route templates, not raw paths, keep the label set bounded.
+            route = scope.get("route")
+            label = route.path if route is not None else scope.get("root_path") or "<unmatched>"
+            request_metrics.observe(scope["method"], label, status_code, time.perf_counter() - started)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels: Any) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class _Exposition:
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+
+    def metric(self, name: str, kind: str, help_text: str, samples: Iterable[Tuple[Dict[str, Any], float]]) -> None:
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            self.lines.append(f"{name}{_labels(**labels)} {value}")
+
+    def single(self, name: str, kind: str, help_text: str, value: float) -> None:
+        self.metric(name, kind, help_text, [({}, value)])
+
+    def render(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def _http(out: _Exposition) -> None:
+    out.single("http_requests_in_flight", "gauge", "Requests being served.", request_metrics.in_flight)
+    out.metric(
+        "http_requests_total",
+        "counter",
+        "Requests served, by method, route template and status.",
+        (
+            ({"method": m, "route": r, "status": s}, n)
+            for (m, r, s), n in sorted(request_metrics.requests.items())
+        ),
+    )
+    out.lines.append("# HELP http_request_duration_seconds Request latency, by method and route template.")
+    out.lines.append("# TYPE http_request_duration_seconds histogram")
+    for (method, route), latency in sorted(request_metrics.latency.items()):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), latency.buckets):
+            cumulative += count
+            labels = _labels(method=method, route=route, le=bound)
+            out.lines.append(f"http_request_duration_seconds_bucket{labels} {cumulative}")
+        labels = _labels(method=method, route=route)
+        out.lines.append(f"http_request_duration_seconds_sum{labels} {latency.total}")
+        out.lines.append(f"http_request_duration_seconds_count{labels} {latency.count}")
+
+
+def _pools(out: _Exposition) -> None:
+    pools = [("writer", engine.pool), ("reader", read_engine.pool)] if USE_SQLITE_WRITER else [("default", engine.pool)]
+    timed = [({"pool": name}, pool) for name, pool in pools if isinstance(pool, TimedQueuePool)]
+    out.metric(
+        "db_pool_checkouts_total",
+        "counter",
+        "Connections checked out of the pool.",
+        ((labels, pool.checkouts) for labels, pool in timed),
+    )
+    out.metric(
+        "db_pool_wait_seconds_total",
+        "counter",
+        "Time spent getting a connection from the pool (waiting or connecting).",
+        ((labels, pool.wait_seconds) for labels, pool in timed),
+    )
+    out.metric(
+        "db_pool_checked_out",
+        "gauge",
+        "Connections currently checked out.",
+        ((labels, pool.checkedout()) for labels, pool in timed),
+    )
+    out.metric("db_pool_size", "gauge", "Pool size without overflow.", ((labels, pool.size()) for labels, pool in timed))
+
+
+def _workers(out: _Exposition) -> None:
+    stats = password_hasher.stats()
+    out.single("password_hash_workers", "gauge", "bcrypt worker processes (0 = inline).", stats["workers"])
+    out.single("password_hash_pending", "gauge", "Hashes queued or running.", stats["pending"])
+    out.single("password_hash_rejected_total", "counter", "Hashes refused with 503.", stats["rejected"])
+    out.metric(
+        "password_hash_duration_seconds",
+        "summary",
+        "bcrypt hash/verify latency including queueing (quantiles over the last 1024).",
+        [
+            ({"quantile": "0.5"}, stats["latency_p50_ms"] / 1000),
+            ({"quantile": "0.99"}, stats["latency_p99_ms"] / 1000),
+        ],
+    )
+    out.lines.append(f"password_hash_duration_seconds_sum {password_hasher.seconds_total}")
+    out.lines.append(f"password_hash_duration_seconds_count {stats['completed']}")
+
+    out.single("write_queue_commits_total", "counter", "Group commits on the SQLite writer.", write_queue.commits)
+    out.single("write_queue_jobs_total", "counter", "Write jobs run on the SQLite writer.", write_queue.jobs)
+    out.single("write_queue_depth", "gauge", "Write jobs waiting for the writer.", write_queue.depth)
+
+    out.single("auth_cache_hits_total", "counter", "Authenticated-user cache hits.", principal_cache.hits)
+    out.single("auth_cache_misses_total", "counter", "Authenticated-user cache misses.", principal_cache.misses)
+
+    out.metric(
+        "rate_limit_rejections_total",
+        "counter",
+        "Requests refused with 429, by endpoint.",
+        (({"endpoint": endpoint}, n) for endpoint, n in sorted(limiter.rejected.items())),
+    )
+    out.single(
+        "rate_limit_evictions_total", "counter", "Limiter keys evicted to stay within the cap.", limiter.evicted
+    )
+
+
+def _email(out: _Exposition) -> None:
+    out.single("email_sent_total", "counter", "Emails delivered by the outbox sender.", email_sender.sent)
+    out.single("email_retried_total", "counter", "Email attempts deferred for retry.", email_sender.retried)
+    out.single("email_failed_total", "counter", "Emails given up on.", email_sender.failed)
+    out.single("email_smtp_connections_total", "counter", "SMTP connections opened.", email_sender.connections)
+    try:
+        with SessionLocal() as db:
+            depth = db.execute(
+                select(models.EmailOutbox.status, func.count()).group_by(models.EmailOutbox.status)
+            ).all()
+    except SQLAlchemyError:  # not bootstrapped yet
+        return
+    out.metric("email_outbox_rows", "gauge", "Outbox rows by status.", (({"status": s}, n) for s, n in depth))
+
+
+def render_metrics() -> str:
+    out = _Exposition()
+    _http(out)
+    _pools(out)
+    _workers(out)
+    _email(out)
+    return out.render()
+
+
+def metrics_response(request: Request) -> Response:
+    if METRICS_TOKEN:
+        supplied = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(supplied.encode(), METRICS_TOKEN.encode()):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
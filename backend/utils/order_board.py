@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+ORDER_CREATED = "order.created"
+ORDER_TAKEN = "order.taken"
+ORDER_STATUS = "order.status"
+ORDER_REMOVED = "order.removed"
+RESYNC = "resync"
+READY = "ready"
+
+
+@dataclass
+class Subscriber:
+    user_id: int
+    loop: asyncio.AbstractEventLoop
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(maxsize=256))
+
+
+class OrderBoard:
+    """
+    Per-process fan-out of order-board deltas to connected cleaners.
+
+    Routers publish from the threadpool after a commit; every subscriber owns an
+    asyncio queue on its event loop, so delivery goes through
+    `call_soon_threadsafe`. A slow subscriber whose queue fills up gets a single
+    `resync` event instead of an unbounded backlog.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._subscribers: Dict[int, Subscriber] = {}
+
+    def subscribe(self, user_id: int) -> tuple[int, Subscriber]:
+        sub = Subscriber(user_id=user_id, loop=asyncio.get_running_loop())
+        with self._lock:
+            sub_id = next(self._ids)
+            self._subscribers[sub_id] = sub
+        return sub_id, sub
+
+    def unsubscribe(self, sub_id: int) -> None:
+        with self._lock:
+            self._subscribers.pop(sub_id, None)
+
+    def publish(self, event: str, order) -> None:
+        """
+        Broadcast an order change (`order` is a serialized `schemas.Order`).
+
+        Unassigned orders go to every cleaner. Once an order has a cleaner, only
+        that cleaner receives the full payload; everyone else just learns that
+        it left the board.
+        """
+        cleaner_id: Optional[int] = order.cleaner_id
+        full = f"event: {event}\ndata: {order.json()}\n\n"
+        removed = f'event: {ORDER_REMOVED}\ndata: {{"id": {order.id}}}\n\n'
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+        for sub in subscribers:
+            message = full if cleaner_id is None or sub.user_id == cleaner_id else removed
+            try:
+                sub.loop.call_soon_threadsafe(_deliver, sub.queue, message)
+            except RuntimeError:
+                # Event loop already closed; the stream's finally-block unsubscribes it.
+                pass
+
+
+def _deliver(queue: asyncio.Queue, message: str) -> None:
+    try:
+        queue.put_nowait(message)
+    except asyncio.QueueFull:
+        # Drop the backlog and ask the client to refetch everything once.
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(f"event: {RESYNC}\ndata: {{}}\n\n")
+
+
+order_board = OrderBoard()
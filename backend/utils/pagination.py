@@ -0,0 +1,92 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Query, status
+from sqlalchemy import Select, literal, tuple_
+from sqlalchemy.orm import Query as OrmQuery
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class PageParams:
+    """
+    Common `?limit=&cursor=` query parameters for list endpoints.
+    """
+
+    def __init__(
+        self,
+        limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(default=None, description="`next_cursor` from the previous page"),
+    ) -> None:
+        self.limit = limit
+        self.cursor = cursor
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, keys: Sequence[Any]) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(raw, list) or len(raw) != len(keys):
+            raise ValueError("cursor shape")
+        values = []
+        for key, value in zip(keys, raw):
+            python_type = key.type.python_type
+            values.append(datetime.fromisoformat(value) if python_type is datetime else python_type(value))
+        return values
+    except (ValueError, TypeError, json.JSONDecodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def keyset_paginate(
+    query: OrmQuery,
+    keys: Sequence[Any],
+    page: PageParams,
+    *,
+    descending: bool = True,
+) -> Tuple[list, Optional[str]]:
+    """
+    Apply keyset pagination over `keys` (e.g. created_at, id) and return
+    (rows, next_cursor). Each page is a bounded index range scan, so page N
+    costs the same as page 1. `keys` must end with a unique column.
+    """
+    rows = _keyset_page(query, keys, page, descending).all()
+    return split_page(rows, keys, page)
+
+
+def keyset_select(stmt: Select, keys: Sequence[Any], page: PageParams, *, descending: bool = True) -> Select:
+    """
+    Core counterpart of `keyset_paginate`: `stmt` restricted to one page (plus
+    one row to detect a next page). Execute it and pass the rows to `split_page`;
+    the selected columns must include `keys`.
+    """
+    return _keyset_page(stmt, keys, page, descending)
+
+
+def split_page(rows: Sequence[Any], keys: Sequence[Any], page: PageParams) -> Tuple[list, Optional[str]]:
+    """
+    (rows, next_cursor) from the `limit + 1` rows fetched for a page.
+    """
+    if len(rows) <= page.limit:
+        return list(rows), None
+    rows = list(rows[: page.limit])
+    last = rows[-1]
+    return rows, encode_cursor([getattr(last, k.key) for k in keys])
+
+
+def _keyset_page(query, keys: Sequence[Any], page: PageParams, descending: bool):
+    # Query.filter and Select.where are the same operation here.
+    if page.cursor:
+        values = decode_cursor(page.cursor, keys)
+        bound = tuple_(*(literal(v, k.type) for k, v in zip(keys, values)))
+        key_tuple = tuple_(*keys)
+        query = query.where(key_tuple < bound if descending else key_tuple > bound)
+    ordering = [k.desc() if descending else k.asc() for k in keys]
+    return query.order_by(*ordering).limit(page.limit + 1)
@@ -0,0 +1,196 @@
+"""
+bcrypt hashing on a dedicated, bounded process pool.
+
+bcrypt is tens of milliseconds of CPU per call. Running it inline on the
+request threadpool lets a burst of logins starve every other endpoint, so
+hashes run on their own small process pool instead. At most
+PASSWORD_HASH_MAX_PENDING jobs may be queued or running; beyond that callers
+get 503 with Retry-After rather than piling up behind the burst.
+
+The pool is started by the app lifespan; until then (scripts, bootstrap run
+from the CLI) hashes run inline, so callers need no `__main__` guard for the
+spawned workers.
+
+Pick the bcrypt cost for this host with:
+
+    python -m backend.utils.password_hashing --target-ms 250
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Deque, Dict, Optional
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("PASSWORD_BCRYPT_ROUNDS", "12"))
+# 0 hashes inline on the calling thread (scripts, single-user setups).
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(2, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(max(1, PASSWORD_HASH_WORKERS) * 8)))
+
+_LATENCY_WINDOW = 1024
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+
+def _normalize_password(password: str) -> bytes:
+    """
+    Normalize password for bcrypt:
+    - encode to UTF-8
+    - truncate to 72 bytes (bcrypt limit)
+    """
+    password_bytes = password.encode("utf-8")
+    if len(password_bytes) > 72:
+        password_bytes = password_bytes[:72]
+    return password_bytes
+
+
+# Module-level so they can be pickled into worker processes.
+def _hash(password_bytes: bytes) -> str:
+    return pwd_context.hash(password_bytes)
+
+
+def _verify(password_bytes: bytes, hashed_password: str) -> bool:
+    return pwd_context.verify(password_bytes, hashed_password)
+
+
+class PasswordHasher:
+    def __init__(self, workers: int, max_pending: int) -> None:
+        self.workers = workers
+        self.max_pending = max_pending
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._latencies: Deque[float] = deque(maxlen=_LATENCY_WINDOW)
+        self.completed = 0
+        self.rejected = 0
+        self.seconds_total = 0.0
+
+    def hash(self, password: str) -> str:
+        return self._run(_hash, _normalize_password(password))
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return self._run(_verify, _normalize_password(plain_password), hashed_password)
+
+    def start(self) -> None:
+        """
+        Spawn and warm the worker processes; hashes run inline until this is called.
+        """
+        if self.workers <= 0:
+            return
+        with self._lock:
+            if self._pool is None:
+                # spawn, not fork: the parent has live threads (writer queue, dispatch).
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+        # Importing passlib/bcrypt in each worker is the slow part of startup.
+        for future in [self._pool.submit(_verify, b"", "") for _ in range(self.workers)]:
+            future.exception()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            pending = self._pending
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": pending,
+            "queued": max(0, pending - self.workers),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "latency_p50_ms": _percentile(latencies, 0.50) * 1000,
+            "latency_p99_ms": _percentile(latencies, 0.99) * 1000,
+        }
+
+    def _run(self, fn: Callable, *args):
+        start = time.perf_counter()
+        pool = self._pool
+        if pool is None:
+            result = fn(*args)
+            self._record(time.perf_counter() - start)
+            return result
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                retry_after = self._retry_after_locked()
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Server is busy. Please try again shortly.",
+                    headers={"Retry-After": str(retry_after)},
+                )
+            self._pending += 1
+        try:
+            future: Future = pool.submit(fn, *args)
+            return future.result()
+        finally:
+            with self._lock:
+                self._pending -= 1
+            self._record(time.perf_counter() - start)
+
+    def _record(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+            self.completed += 1
+            self.seconds_total += seconds
+
+    def _retry_after_locked(self) -> int:
+        # Time for the current backlog to drain, at the recent average latency.
+        avg = sum(self._latencies) / len(self._latencies) if self._latencies else 0.25
+        return max(1, math.ceil(avg * self._pending / max(1, self.workers)))
+
+
+def _percentile(ordered, q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
+
+
+def calibrate(target_ms: float, min_rounds: int = 10, max_rounds: int = 16, samples: int = 3) -> int:
+    """
+    Highest bcrypt cost whose median hash time on this host stays within `target_ms`.
+    """
+    best = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds)
+        times = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            context.hash(b"calibration-password")
+            times.append((time.perf_counter() - start) * 1000)
+        median = sorted(times)[len(times) // 2]
+        print(f"  rounds={rounds:<2}  {median:8.1f} ms")
+        if median > target_ms:
+            break
+        best = rounds
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pick the bcrypt cost for a target hash latency on this host")
+    parser.add_argument("--target-ms", type=float, default=250.0)
+    args = parser.parse_args()
+    rounds = calibrate(args.target_ms)
+    print(f"PASSWORD_BCRYPT_ROUNDS={rounds}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Bounded TTL cache of authenticated principals, keyed by a hash of the token.
+
+A hit skips the JWT decode and the user SELECT: the cached column values
+are attached to the request session with `merge(load=False)`, so routers still
+get a regular `models.User` (relationships lazy-load as usual).
+
+Every entry remembers the user's `user:<id>` counter in `resource_versions`
+(the one behind the profile ETag) and a hit checks it with one primary-key
+lookup, so a change made by another worker or a script is seen on the next
+request, not after the TTL. ORM flushes that touch a user bump the counter
+automatically (see the session hooks below); Core UPDATEs must call
+`bump_versions(..., user_key(id))` in their transaction, as they already do
+for the ETag. In-process writes also drop the entries at once
+(`invalidate_user`).
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from .. import models
+from .etag import bump_versions, user_key
+
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))  # 0 disables the cache
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+
+_USER_COLUMNS = tuple(attr.key for attr in inspect(models.User).column_attrs)
+
+
+@dataclass
+class _Entry:
+    user_id: int
+    columns: Dict[str, Any]
+    version: int
+    expires_at: float
+
+
+def user_version(db: Session, user_id: int) -> int:
+    """
+    The user's `user:<id>` counter; read it before loading the user to cache.
+    """
+    version = db.execute(
+        select(models.ResourceVersion.version).where(models.ResourceVersion.key == user_key(user_id))
+    ).scalar()
+    return version or 0
+
+
+class PrincipalCache:
+    def __init__(self, ttl_seconds: float, max_entries: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    @staticmethod
+    def token_key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str, db: Session) -> Optional[models.User]:
+        """
+        Cached user for `token` attached to `db`, or None on a miss.
+        """
+        if not self.enabled:
+            return None
+        key = self.token_key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            columns = dict(entry.columns)
+        if user_version(db, entry.user_id) != entry.version:  # changed elsewhere since it was cached
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    self._drop(key)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        user = models.User(**columns)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+    def put(self, token: str, user: models.User, version: int, token_expires_at: Optional[float] = None) -> None:
+        """
+        Cache `user`, loaded at counter `version` (see `user_version`), for
+        `token` until the TTL (or the token's own expiry) passes.
+        `token_expires_at` is a Unix timestamp.
+        """
+        if not self.enabled:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds
+        if token_expires_at is not None:
+            expires_at = min(expires_at, time.monotonic() + (token_expires_at - time.time()))
+        columns = {key: getattr(user, key) for key in _USER_COLUMNS}
+        key = self.token_key(token)
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = _Entry(user.id, columns, version, expires_at)
+            self._by_user.setdefault(user.id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            for key in list(self._by_user.get(user_id, ())):
+                self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._by_user.get(entry.user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[entry.user_id]
+
+
+principal_cache = PrincipalCache(AUTH_CACHE_TTL_SECONDS, AUTH_CACHE_MAX_ENTRIES)
+
+
+# ---- invalidation on ORM writes (profile updates, role changes, password resets, 2FA) ----
+
+_CHANGED_USERS = "principal_cache.changed_users"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    changed = {obj.id for obj in session.dirty | session.deleted if isinstance(obj, models.User)}
+    if changed:
+        session.info.setdefault(_CHANGED_USERS, set()).update(changed)
+        # Same transaction as the change: other processes' entries go stale when it commits.
+        bump_versions(session.connection(), *(user_key(user_id) for user_id in changed))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    # After commit, so a concurrent miss can't re-cache the pre-commit row.
+    for user_id in session.info.pop(_CHANGED_USERS, ()):
+        principal_cache.invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session):
+    session.info.pop(_CHANGED_USERS, None)
@@ -3,13 +3,13 @@ from __future__ import annotations
 import base64
 from io import BytesIO
 
-import qrcode
-
 
 def qr_png_base64(data: str, box_size: int = 8, border: int = 2) -> str:
     """
     Generate a PNG QR code for `data` and return it as a base64 string (no data: prefix).
     """
+    import qrcode  # pulls in PIL; only needed during 2FA setup
+
     qr = qrcode.QRCode(
         version=None,
         error_correction=qrcode.constants.ERROR_CORRECT_M,
@@ -0,0 +1,178 @@
+"""
+Per-request SQL instrumentation.
+
+Cursor-execute listeners on `engine` and `read_engine` attribute every
+statement to the `QueryStats` of the current request (a context variable set
+by `QueryStatsMiddleware`, inherited by the threadpool and by jobs on the
+SQLite writer queue). Per request they record the statement count, total DB
+time and how often each statement fingerprint ran, which the middleware turns
+into a `Server-Timing` header and a log line when one statement repeats
+enough to look like an N+1. Statements slower than `SQL_SLOW_QUERY_MS` are
+logged wherever they run.
+
+Query budgets: `SQL_QUERY_BUDGET` caps statements per request (logged when
+exceeded); with `SQL_QUERY_BUDGET_STRICT=1` the statement that goes over the
+budget raises `QueryBudgetExceeded`, so a test client sees the route fail.
+Scripts and benchmarks can use `track_queries(budget=...)` the same way.
+"""
+from __future__ import annotations
+
+import os
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+from ..database import engine, read_engine
+
+SQL_INSTRUMENTATION = os.getenv("SQL_INSTRUMENTATION", "1") == "1"
+SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "200"))  # 0 disables the slow-query log
+SQL_REPEAT_THRESHOLD = int(os.getenv("SQL_REPEAT_THRESHOLD", "5"))  # same statement this often = N+1 suspect
+SQL_QUERY_BUDGET = int(os.getenv("SQL_QUERY_BUDGET", "0"))  # 0 = no budget
+SQL_QUERY_BUDGET_STRICT = os.getenv("SQL_QUERY_BUDGET_STRICT", "0") == "1"
+
+# `IN (?, ?, ?)` / `IN (%(p_1)s, %(p_2)s)` from expanding parameters: one fingerprint whatever the length.
+_PARAM_LIST = re.compile(r"\((?:\?|%\(\w+\)s)(?:,\s*(?:\?|%\(\w+\)s))+\)")
+_SPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    return _PARAM_LIST.sub("(?)", _SPACE.sub(" ", statement).strip())
+
+
+class QueryStats:
+    __slots__ = ("label", "budget", "count", "seconds", "statements")
+
+    def __init__(self, label: str = "", budget: int = SQL_QUERY_BUDGET) -> None:
+        self.label = label
+        self.budget = budget
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.statements[statement] += 1
+
+    def repeated(self, threshold: int = SQL_REPEAT_THRESHOLD) -> List[Tuple[str, int]]:
+        """
+        Statements (as fingerprints) issued at least `threshold` times, most frequent first.
+        """
+        by_fingerprint: Counter = Counter()
+        for statement, times in self.statements.items():
+            by_fingerprint[fingerprint(statement)] += times
+        return [(fp, n) for fp, n in by_fingerprint.most_common() if n >= threshold]
+
+    def server_timing(self, total_seconds: Optional[float] = None) -> str:
+        value = f'db;dur={self.seconds * 1000:.2f};desc="{self.count} queries"'
+        if total_seconds is not None:
+            value += f", total;dur={total_seconds * 1000:.2f}"
+        return value
+
+    def report(self) -> None:
+        """
+        Log N+1 suspects and a blown budget (non-strict mode) for this request.
+        """
+        for statement, times in self.repeated():
+            print(f"[SQL] {self.label}: {times}x same statement (possible N+1): {statement[:300]}")
+        if self.budget and self.count > self.budget and not SQL_QUERY_BUDGET_STRICT:
+            print(f"[SQL] {self.label}: {self.count} queries, over the budget of {self.budget}")
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+@contextmanager
+def track_queries(label: str = "", budget: int = 0) -> Iterator[QueryStats]:
+    """
+    Attribute the statements run inside the block (in this context) to a
+    fresh `QueryStats`. With `budget`, exceeding it raises `QueryBudgetExceeded`.
+    """
+    stats = QueryStats(label, budget)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+    if budget and stats.count > budget:
+        raise QueryBudgetExceeded(f"{label or 'block'}: {stats.count} queries, budget {budget}")
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+        if SQL_QUERY_BUDGET_STRICT and stats.budget and stats.count > stats.budget:
+            raise QueryBudgetExceeded(f"{stats.label}: {stats.count} queries, budget {stats.budget}")
+    if SQL_SLOW_QUERY_MS and elapsed * 1000 >= SQL_SLOW_QUERY_MS:
+        where = stats.label if stats is not None else "background"
+        print(f"[SQL] slow query {elapsed * 1000:.1f} ms ({where}): {fingerprint(statement)[:500]}")
+
+
+def _handle_error(exception_context) -> None:
+    # The statement failed: drop the start time pushed for it.
+    started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+if SQL_INSTRUMENTATION:
+    for _engine in {engine, read_engine}:
+        event.listen(_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(_engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(_engine, "handle_error", _handle_error)
+
+
+class QueryStatsMiddleware:
+    """
+    Pure ASGI middleware: one `QueryStats` per HTTP request, a `Server-Timing`
+    header on the response, N+1 / budget log lines once the request is done.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not SQL_INSTRUMENTATION:
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(f"{scope['method']} {scope['path']}")
+        started = time.perf_counter()
+
+        async def send_with_timing(message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", stats.server_timing(time.perf_counter() - started))
+            await send(message)
+
+        token = _current.set(stats)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            if route is not None:
+                stats.label = f"{scope['method']} {route.path}"
+            stats.report()
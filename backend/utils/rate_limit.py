@@ -1,12 +1,58 @@
+"""
+Rate limiting with GCRA (the generic cell rate algorithm).
+
+GCRA is a token bucket stored as a single number per key: the "theoretical
+arrival time" (TAT) at which the bucket is full again. A hit advances the TAT
+by `window / limit`; it is rejected if that would put the TAT more than one
+window ahead of now. `limit` hits in a burst are allowed, then one every
+`window / limit` seconds, so the long-run rate matches the old sliding window
+without remembering every hit.
+
+Two storages, picked by RATE_LIMIT_STORAGE:
+
+- `shared` (default): a fixed-size hash table in a memory-mapped file that
+  every worker process on the host uses, so N uvicorn workers still enforce
+  one budget per client. Stripes are guarded by fcntl record locks.
+- `memory`: per-process dicts. Keys are spread over lock shards; a key whose
+  TAT has passed holds no information (its bucket is full), so a background
+  sweeper drops those.
+
+Both are bounded by RATE_LIMIT_MAX_KEYS: when full, a key close to refilling
+(or the least recently hit one) is evicted, which at worst resets that
+client's bucket.
+"""
 from __future__ import annotations
 
+import abc
+import hashlib
+import math
+import mmap
+import os
+import struct
+import tempfile
 import threading
 import time
-from collections import defaultdict, deque
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Deque, Dict, Tuple
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
 from fastapi import HTTPException, Request, status
+from sqlalchemy.engine import make_url
+
+from ..database import DATABASE_URL, IS_SQLITE
+
+try:
+    import fcntl
+except ImportError:  # Windows: shared storage unavailable, see _make_limiter
+    fcntl = None
+
+RATE_LIMIT_STORAGE = os.getenv("RATE_LIMIT_STORAGE", "shared")  # shared | memory
+RATE_LIMIT_SHARED_PATH = os.getenv("RATE_LIMIT_SHARED_PATH", "")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "200000"))
+RATE_LIMIT_SWEEP_INTERVAL_SECONDS = float(os.getenv("RATE_LIMIT_SWEEP_INTERVAL_SECONDS", "60"))
+
+_SHARDS = 64  # power of two
 
 
 @dataclass(frozen=True)
@@ -14,33 +60,277 @@ class RateLimit:
     limit: int
     window_seconds: int
 
+    @property
+    def emission_interval(self) -> float:
+        return self.window_seconds / self.limit
+
 
-class InMemoryRateLimiter:
+class RateLimiter(abc.ABC):
     """
-    Simple per-process in-memory rate limiter.
-    Good enough for demos / single-instance deployments.
+    Storage-independent part: turning a rejected hit into a 429 and counting
+    rejections per endpoint (this process only).
     """
 
     def __init__(self) -> None:
-        self._lock = threading.Lock()
-        self._events: Dict[Tuple[str, str], Deque[float]] = defaultdict(deque)
+        self._rejected_lock = threading.Lock()
+        self.rejected: Dict[str, int] = {}
 
     def hit(self, *, key: Tuple[str, str], rule: RateLimit) -> None:
+        retry_after = self.try_hit(key=key, rule=rule)
+        if retry_after is not None:
+            with self._rejected_lock:
+                self.rejected[key[0]] = self.rejected.get(key[0], 0) + 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many attempts. Please wait a moment and try again.",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+
+    @abc.abstractmethod
+    def try_hit(self, *, key: Tuple[str, str], rule: RateLimit, now: Optional[float] = None) -> Optional[float]:
+        """
+        Record a hit; returns None if allowed, else the seconds until the next hit would be.
+        """
+
+    def start_sweeper(self) -> Optional[threading.Thread]:
+        return None
+
+    def stop_sweeper(self) -> None:
+        pass
+
+
+class _Shard:
+    __slots__ = ("lock", "tats", "evicted")
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        # Ordered by last allowed hit, so the first key is the least recently used.
+        self.tats: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self.evicted = 0
+
+
+class InMemoryRateLimiter(RateLimiter):
+    """
+    Per-process GCRA limiter: one float per (endpoint, IP), bounded and swept.
+    Good enough for single-worker deployments.
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS, shards: int = _SHARDS) -> None:
+        super().__init__()
+        self._shards = [_Shard() for _ in range(shards)]
+        self._mask = shards - 1
+        self._max_per_shard = max(1, max_keys // shards)
+        self._stop_sweeper = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
+
+    def try_hit(self, *, key: Tuple[str, str], rule: RateLimit, now: Optional[float] = None) -> Optional[float]:
+        now = time.monotonic() if now is None else now
+        interval = rule.emission_interval
+        shard = self._shards[hash(key) & self._mask]
+        with shard.lock:
+            tats = shard.tats
+            tat = tats.get(key)
+            new_tat = (now if tat is None or tat < now else tat) + interval
+            allow_at = new_tat - rule.window_seconds
+            if allow_at > now:
+                return allow_at - now
+            tats[key] = new_tat
+            if tat is not None:
+                tats.move_to_end(key)
+            elif len(tats) > self._max_per_shard:
+                tats.popitem(last=False)
+                shard.evicted += 1
+        return None
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """
+        Drop keys whose bucket has refilled; returns how many were dropped.
+        """
+        now = time.monotonic() if now is None else now
+        dropped = 0
+        for shard in self._shards:
+            with shard.lock:
+                idle: List[Tuple[str, str]] = [k for k, tat in shard.tats.items() if tat <= now]
+                for k in idle:
+                    del shard.tats[k]
+            dropped += len(idle)
+        return dropped
+
+    @property
+    def evicted(self) -> int:
+        """Keys dropped by the cap while their bucket was still draining."""
+        return sum(shard.evicted for shard in self._shards)
+
+    def __len__(self) -> int:
+        return sum(len(shard.tats) for shard in self._shards)
+
+    def clear(self) -> None:
+        for shard in self._shards:
+            with shard.lock:
+                shard.tats.clear()
+
+    def start_sweeper(self, interval_seconds: float = RATE_LIMIT_SWEEP_INTERVAL_SECONDS) -> Optional[threading.Thread]:
+        """
+        Run `sweep` every `interval_seconds` on a daemon thread.
+        """
+        if interval_seconds <= 0 or (self._sweeper is not None and self._sweeper.is_alive()):
+            return None
+        self._stop_sweeper.clear()
+
+        def loop() -> None:
+            while not self._stop_sweeper.wait(interval_seconds):
+                self.sweep()
+
+        self._sweeper = threading.Thread(target=loop, name="rate-limit-sweeper", daemon=True)
+        self._sweeper.start()
+        return self._sweeper
+
+    def stop_sweeper(self) -> None:
+        self._stop_sweeper.set()
+
+
+# ---- shared storage ----
+#
+# File layout: a 64-byte header (magic, slot count) followed by buckets of 8
+# slots. A bucket is stored as 8 key fingerprints (u64, 0 = empty) then their
+# 8 TATs (f64, Unix time, so they stay meaningful across restarts). A key lives
+# in the bucket its fingerprint selects; the bucket is the probe sequence.
+
+_MAGIC = b"TBRL0001"
+_HEADER = struct.Struct("<8sQ")
+_HEADER_SIZE = 64
+_SLOTS_PER_BUCKET = 8
+_FPS = struct.Struct(f"<{_SLOTS_PER_BUCKET}Q")
+_TATS = struct.Struct(f"<{_SLOTS_PER_BUCKET}d")
+_BUCKET_SIZE = _FPS.size + _TATS.size
+_FINGERPRINT = struct.Struct("<Q")
+_TAT = struct.Struct("<d")
+_MAX_STRIPES = 1024
+
+
+def _default_shared_path() -> Path:
+    if RATE_LIMIT_SHARED_PATH:
+        return Path(RATE_LIMIT_SHARED_PATH)
+    database = make_url(DATABASE_URL).database
+    if IS_SQLITE and database and database != ":memory:":
+        return Path(f"{database}.ratelimit")
+    return Path(tempfile.gettempdir()) / "tazabolsyn-ratelimit.bin"
+
+
+def _fingerprint(key: Tuple[str, str]) -> int:
+    digest = hashlib.blake2b(f"{key[0]}\0{key[1]}".encode("utf-8"), digest_size=8).digest()
+    return _FINGERPRINT.unpack(digest)[0] or 1
+
+
+class SharedFileRateLimiter(RateLimiter):
+    """
+    GCRA limiter whose state all processes on the host share through a
+    memory-mapped file. A stripe of buckets is guarded by a thread lock (record
+    locks are per process) plus an fcntl record lock on one byte of the file.
+    """
+
+    def __init__(self, path: Path, max_keys: int = RATE_LIMIT_MAX_KEYS) -> None:
+        super().__init__()
+        self.path = Path(path)
+        self.max_keys = max_keys
+        self._open_lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._fd = -1
+        self._map: Optional[mmap.mmap] = None
+        self._bucket_mask = 0
+        self._stripe_mask = 0
+        self._stripe_locks: List[threading.Lock] = []
+        self.evicted = 0
+
+    def try_hit(self, *, key: Tuple[str, str], rule: RateLimit, now: Optional[float] = None) -> Optional[float]:
+        now = time.time() if now is None else now
+        if self._pid != os.getpid():
+            self._open()
+        fp = _fingerprint(key)
+        bucket = (fp >> 16) & self._bucket_mask
+        stripe = bucket & self._stripe_mask
+        offset = _HEADER_SIZE + bucket * _BUCKET_SIZE
+        buf = self._map
+
+        with self._stripe_locks[stripe]:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, 8 + stripe)
+            try:
+                fps = _FPS.unpack_from(buf, offset)
+                tats = _TATS.unpack_from(buf, offset + _FPS.size)
+                if fp in fps:
+                    slot = fps.index(fp)
+                    tat = tats[slot]
+                else:
+                    # New key: take the slot closest to (or past) refilling; empty slots have TAT 0.
+                    slot = tats.index(min(tats))
+                    if fps[slot] and tats[slot] > now:
+                        self.evicted += 1
+                    tat = now
+                    _FINGERPRINT.pack_into(buf, offset + slot * 8, fp)
+                new_tat = (tat if tat > now else now) + rule.emission_interval
+                allow_at = new_tat - rule.window_seconds
+                if allow_at > now:
+                    return allow_at - now  # never for a new key: the first hit always fits
+                _TAT.pack_into(buf, offset + (_SLOTS_PER_BUCKET + slot) * 8, new_tat)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, 8 + stripe)
+        return None
+
+    def __len__(self) -> int:
+        if self._pid != os.getpid():
+            self._open()
         now = time.time()
-        cutoff = now - rule.window_seconds
-        with self._lock:
-            q = self._events[key]
-            while q and q[0] < cutoff:
-                q.popleft()
-            if len(q) >= rule.limit:
-                raise HTTPException(
-                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                    detail="Too many attempts. Please wait a moment and try again.",
-                )
-            q.append(now)
+        count = 0
+        for bucket in range(self._bucket_mask + 1):
+            offset = _HEADER_SIZE + bucket * _BUCKET_SIZE
+            fps = _FPS.unpack_from(self._map, offset)
+            tats = _TATS.unpack_from(self._map, offset + _FPS.size)
+            count += sum(1 for fp, tat in zip(fps, tats) if fp and tat > now)
+        return count
+
+    def _open(self) -> None:
+        """
+        Map the table, creating it if needed (per process: reopened after fork).
+        An existing file keeps its size even if RATE_LIMIT_MAX_KEYS changed.
+        """
+        with self._open_lock:
+            if self._pid == os.getpid():
+                return
+            buckets = 1 << max(0, math.ceil(math.log2(max(1, self.max_keys) / _SLOTS_PER_BUCKET)))
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.lockf(fd, fcntl.LOCK_EX, 8, 0)
+            try:
+                header = os.pread(fd, _HEADER.size, 0)
+                if len(header) == _HEADER.size and header[:8] == _MAGIC:
+                    buckets = _HEADER.unpack(header)[1] // _SLOTS_PER_BUCKET
+                else:
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, _HEADER_SIZE + buckets * _BUCKET_SIZE)
+                    os.pwrite(fd, _HEADER.pack(_MAGIC, buckets * _SLOTS_PER_BUCKET), 0)
+            finally:
+                fcntl.lockf(fd, fcntl.LOCK_UN, 8, 0)
+            if self._map is not None:
+                self._map.close()
+                os.close(self._fd)
+            stripes = min(_MAX_STRIPES, buckets)
+            self._fd = fd
+            self._map = mmap.mmap(fd, _HEADER_SIZE + buckets * _BUCKET_SIZE)
+            self._bucket_mask = buckets - 1
+            self._stripe_mask = stripes - 1
+            self._stripe_locks = [threading.Lock() for _ in range(stripes)]
+            self._pid = os.getpid()
+
 
+def _make_limiter() -> RateLimiter:
+    if RATE_LIMIT_STORAGE == "memory":
+        return InMemoryRateLimiter()
+    if fcntl is None:
+        print("[RATE LIMIT] Shared storage needs fcntl; falling back to per-process limits")
+        return InMemoryRateLimiter()
+    return SharedFileRateLimiter(_default_shared_path())
 
-limiter = InMemoryRateLimiter()
+
+limiter = _make_limiter()
 
 
 def rate_limit(endpoint: str, *, limit: int, window_seconds: int):
@@ -51,5 +341,3 @@ def rate_limit(endpoint: str, *, limit: int, window_seconds: int):
         limiter.hit(key=(endpoint, ip), rule=rule)
 
     return dep
-
-
@@ -0,0 +1,75 @@
+"""
+Fast JSON responses for list endpoints.
+
+`FastJSONResponse` renders with orjson when it is installed (`pip install
+orjson`) and falls back to the stdlib encoder otherwise; both produce the same
+bytes for the payloads these endpoints return (compact separators, UTF-8,
+ISO-8601 datetimes from `.isoformat()`).
+
+`trusted_output` is for endpoints that already build their `schemas.*`
+response by hand: FastAPI would otherwise validate that model again against
+`response_model` and walk it with `jsonable_encoder`. The wrapped endpoint
+returns a `FastJSONResponse` instead, which FastAPI passes through untouched,
+while the route keeps `response_model` for the OpenAPI schema.
+"""
+from __future__ import annotations
+
+import functools
+import inspect
+import json
+from datetime import date
+from typing import Any, Callable
+
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json is used instead
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.dict()
+    if isinstance(obj, date):  # orjson encodes these itself, the same way
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return json.dumps(
+                content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+            ).encode("utf-8")
+        return orjson.dumps(content, default=_default)
+
+
+def as_response(result: Any) -> Response:
+    if isinstance(result, Response):
+        return result
+    return FastJSONResponse(result)
+
+
+def trusted_output(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Skip response-model validation for `endpoint` and render its result with
+    `FastJSONResponse` (status 200). Place it below the route decorator.
+
+    Only for endpoints whose result is already a `response_model` instance (or
+    plain JSON data of that shape): nothing checks it.
+    """
+    if inspect.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Response:
+            return as_response(await endpoint(*args, **kwargs))
+
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args: Any, **kwargs: Any) -> Response:
+        return as_response(endpoint(*args, **kwargs))
+
+    return wrapper
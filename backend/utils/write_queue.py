@@ -0,0 +1,127 @@
+"""
+Single-writer queue with group commit for SQLite.
+
+Write jobs (`fn(session) -> result`) run one after another on a dedicated
+thread that owns the writer connection. Jobs that queue up while a commit is
+in flight are run together, each in its own SAVEPOINT, and share one COMMIT:
+a failing job only rolls back its own savepoint, and every caller gets its
+result only after the commit it belongs to is durable. Jobs run in a copy of
+the submitting caller's context, so per-request state such as
+`query_stats` follows them onto the writer thread.
+"""
+from __future__ import annotations
+
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from contextvars import copy_context
+from typing import Callable, List, Optional, Tuple, TypeVar
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from ..database import USE_SQLITE_WRITER, engine
+
+T = TypeVar("T")
+WriteJob = Callable[[Session], T]
+
+MAX_GROUP_COMMIT = int(os.getenv("SQLITE_MAX_GROUP_COMMIT", "64"))
+
+_WriterSession = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+
+class WriteQueue:
+    def __init__(self, max_batch: int = MAX_GROUP_COMMIT) -> None:
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Tuple[WriteJob, Future]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.commits = 0
+        self.jobs = 0
+
+    def submit(self, fn: WriteJob) -> "Future[T]":
+        self._ensure_started()
+        future: Future = Future()
+        context = copy_context()
+        self._queue.put((lambda session: context.run(fn, session), future))
+        return future
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def run(self, fn: WriteJob) -> T:
+        """
+        Run `fn` on the writer and block until its transaction has committed.
+        Exceptions raised by `fn` are re-raised here.
+        """
+        return self.submit(fn).result()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="sqlite-writer", daemon=True)
+                self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._commit_batch(batch)
+
+    def _commit_batch(self, batch: List[Tuple[WriteJob, Future]]) -> None:
+        outcomes = []
+        session = _WriterSession()
+        try:
+            for fn, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    with session.begin_nested():
+                        outcomes.append((future, fn(session), None))
+                except Exception as exc:
+                    outcomes.append((future, None, exc))
+            session.commit()
+        except Exception as exc:
+            session.rollback()
+            print(f"[DB ERROR] Group commit of {len(batch)} write(s) failed: {exc}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        finally:
+            session.close()
+
+        self.commits += 1
+        self.jobs += len(outcomes)
+        for future, result, exc in outcomes:
+            if exc is not None:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+
+write_queue = WriteQueue()
+
+
+def run_write(db: Session, fn: WriteJob) -> T:
+    """
+    Run a write job and commit it. On SQLite (wal mode) it goes through the
+    shared writer queue; otherwise it runs on the request session `db`.
+    `fn` must not commit and should return plain data (e.g. a response schema).
+    """
+    if USE_SQLITE_WRITER:
+        return write_queue.run(fn)
+    try:
+        result = fn(db)
+        db.commit()
+        return result
+    except Exception:
+        db.rollback()
+        raise
@@ -0,0 +1,8 @@
+"""
+Offline benchmarks for the TazaBolsyn backend.
+
+Each module is runnable with `python -m benchmarks.<name>` from the project
+root and works against a throwaway SQLite database in a temp directory,
+except the load-test tools (`generate_data`, `scenarios`, `report`), which
+use the configured database and a running server.
+"""
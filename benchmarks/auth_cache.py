@@ -0,0 +1,103 @@
+"""
+Authenticated-request throughput with and without the principal cache.
+
+Measures the auth dependency on its own (token -> user) and end to end
+(GET /users/me through the app) for many users. Each mode runs in its own
+interpreter because the cache TTL is read at import time.
+
+    python -m benchmarks.auth_cache --users 200 --requests 5000 --threads 16
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .common import PROJECT_ROOT, print_summary, summarize, use_temp_workdir
+
+MODES = {"no-cache": "0", "cache": "60"}
+
+
+def run_mode(args: argparse.Namespace) -> None:
+    use_temp_workdir()
+    from fastapi.testclient import TestClient
+
+    from backend import models
+    from backend.auth import create_access_token, get_user_from_token
+    from backend.bootstrap import bootstrap_database
+    from backend.database import SessionLocal
+    from backend.main import app
+
+    bootstrap_database()
+    with SessionLocal() as db:
+        users = [
+            models.User(email=f"user{i}@bench.example.com", password_hash="x", role="user")
+            for i in range(args.users)
+        ]
+        db.add_all(users)
+        db.commit()
+        tokens = [create_access_token({"sub": str(u.id), "role": "user"}) for u in users]
+
+    rng = random.Random(args.seed)
+    plan = [rng.choice(tokens) for _ in range(args.requests)]
+
+    def resolve(token: str) -> float:
+        start = time.perf_counter()
+        with SessionLocal() as db:
+            get_user_from_token(token, db)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    direct = [resolve(t) for t in plan]
+    direct_elapsed = time.perf_counter() - start
+
+    client = TestClient(app)
+
+    def request(token: str) -> float:
+        start = time.perf_counter()
+        res = client.get("/users/me", headers={"Authorization": f"Bearer {token}"})
+        assert res.status_code == 200, res.text
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        start = time.perf_counter()
+        http = list(pool.map(request, plan))
+        http_elapsed = time.perf_counter() - start
+
+    print(json.dumps({"direct": summarize(direct, direct_elapsed), "http": summarize(http, http_elapsed)}))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args)
+        return
+
+    for mode, ttl in MODES.items():
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.auth_cache", *sys.argv[1:], "--mode", mode],
+            cwd=PROJECT_ROOT,
+            env={**os.environ, "AUTH_CACHE_TTL_SECONDS": ttl},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        print_summary(f"{mode:<8} token -> user", result["direct"])
+        print_summary(f"{mode:<8} GET /users/me", result["http"])
+
+
+if __name__ == "__main__":
+    main()
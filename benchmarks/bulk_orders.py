@@ -0,0 +1,112 @@
+"""
+500 orders for one corporate customer: `POST /orders/` per unit vs one `POST /orders/bulk`.
+
+Both paths go through the full app (auth, pricing, write path) with the
+same generated payloads. Reports wall time, time per order and the SQL
+statements issued (from `Server-Timing`), and fails unless both produce the
+same orders, items and reward points.
+
+    python -m benchmarks.bulk_orders --orders 500
+    SQLITE_MODE=wal python -m benchmarks.bulk_orders
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+from .common import order_payload, use_temp_workdir
+
+_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    os.environ["PASSWORD_HASH_WORKERS"] = "0"
+    use_temp_workdir()
+    from fastapi.testclient import TestClient
+    from sqlalchemy import func, select
+
+    from backend import models
+    from backend.auth import create_access_token
+    from backend.bootstrap import bootstrap_database
+    from backend.database import SessionLocal
+    from backend.main import app
+
+    bootstrap_database()
+    with SessionLocal() as db:
+        customers = [models.User(email=f"corp{i}@bench.example.com", password_hash="x", role="user") for i in (1, 2)]
+        db.add_all(customers)
+        db.commit()
+        headers = [
+            {"Authorization": f"Bearer {create_access_token({'sub': str(c.id), 'role': 'user'})}"} for c in customers
+        ]
+        customer_ids = [c.id for c in customers]
+
+    rng = random.Random(args.seed)
+    payloads = [order_payload(rng) for _ in range(args.orders)]
+    client = TestClient(app)
+    client.get("/users/me", headers=headers[0])  # warm up the app and the principal cache
+    client.get("/users/me", headers=headers[1])
+
+    queries = 0
+    started = time.perf_counter()
+    for payload in payloads:
+        res = client.post("/orders/", json=payload, headers=headers[0])
+        res.raise_for_status()
+        queries += int(_QUERIES.search(res.headers["Server-Timing"]).group(1))
+    single = time.perf_counter() - started
+    print(
+        f"single x{args.orders:<5} {single * 1000:9.1f} ms  {single / args.orders * 1000:6.2f} ms/order  "
+        f"{queries} queries"
+    )
+
+    started = time.perf_counter()
+    res = client.post("/orders/bulk", json={"orders": payloads}, headers=headers[1])
+    res.raise_for_status()
+    bulk = time.perf_counter() - started
+    print(
+        f"bulk   x{args.orders:<5} {bulk * 1000:9.1f} ms  {bulk / args.orders * 1000:6.2f} ms/order  "
+        f"{_QUERIES.search(res.headers['Server-Timing']).group(1)} queries  ({single / bulk:.1f}x faster)"
+    )
+
+    with SessionLocal() as db:
+        outcome = [
+            (
+                db.execute(
+                    select(func.count(), func.sum(models.Order.total_price)).where(models.Order.user_id == uid)
+                ).one(),
+                db.execute(
+                    select(func.count(models.OrderItem.id))
+                    .join(models.Order, models.Order.id == models.OrderItem.order_id)
+                    .where(models.Order.user_id == uid)
+                ).scalar(),
+                db.get(models.User, uid).reward_points,
+            )
+            for uid in customer_ids
+        ]
+        # Every returned order (and item id) must be the row stored for that payload.
+        returned = [result["order"] for result in res.json()["results"]]
+        mismatched = sum(
+            1
+            for payload, order in zip(payloads, returned)
+            if order["address"] != payload["address"]
+            or [(i.id, i.service_name) for i in db.get(models.Order, order["id"]).items]
+            != [(i["id"], i["service_name"]) for i in order["items"]]
+            or db.get(models.Order, order["id"]).address != payload["address"]
+        )
+    if len(returned) != args.orders or mismatched or outcome[0] != outcome[1]:
+        print(f"FAIL: single and bulk disagree: {outcome}, {mismatched} bulk results not matching their rows")
+        sys.exit(1)
+    print("OK same orders, items and reward points; bulk results match their rows")
+
+
+if __name__ == "__main__":
+    main()
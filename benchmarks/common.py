@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def use_temp_workdir() -> Path:
+    """
+    Switch into a fresh temp directory so the relative SQLite file the backend
+    opens never touches the real `tazabolsyn.db`.
+    Must run before `backend` is imported.
+    """
+    workdir = Path(tempfile.mkdtemp(prefix="tazabolsyn-bench-"))
+    os.chdir(workdir)
+    if str(PROJECT_ROOT) not in sys.path:
+        sys.path.insert(0, str(PROJECT_ROOT))
+    return workdir
+
+
+def seed_orders(db: Any, user_id: int, count: int, rng: random.Random) -> None:
+    """
+    Add `count` orders with 1-4 items each for `user_id`, one minute apart.
+    The caller commits.
+    """
+    from backend import models
+
+    start_time = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    for i in range(count):
+        items = [
+            models.OrderItem(
+                service_name=f"service {j}", quantity=rng.randint(1, 3), price=rng.choice([500, 2500, 15000])
+            )
+            for j in range(rng.randint(1, 4))
+        ]
+        db.add(
+            models.Order(
+                user_id=user_id,
+                status=rng.choice(["pending", "accepted", "finished"]),
+                total_price=sum(it.price * it.quantity for it in items),
+                created_at=start_time + timedelta(minutes=i),
+                address=f"Abay {i}",
+                city=rng.choice(["Almaty", "Astana"]),
+                rooms=rng.randint(1, 5),
+                latitude=43.2 + rng.random() / 10,
+                longitude=76.8 + rng.random() / 10,
+                items=items,
+            )
+        )
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[idx]
+
+
+def summarize(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    """
+    Throughput and latency percentiles (milliseconds) for a batch of samples.
+    """
+    return {
+        "requests": len(latencies),
+        "throughput_rps": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": (max(latencies) if latencies else 0.0) * 1000,
+    }
+
+
+def print_summary(title: str, stats: Dict[str, float]) -> None:
+    print(
+        f"{title:<32} n={int(stats['requests']):>6}  "
+        f"{stats['throughput_rps']:>9.1f} req/s  "
+        f"p50={stats['p50_ms']:.2f}ms  p95={stats['p95_ms']:.2f}ms  "
+        f"p99={stats['p99_ms']:.2f}ms  max={stats['max_ms']:.2f}ms"
+    )
+
+
+# A slice of the calculator's catalogue (frontend/js/calculator.js), for realistic order payloads.
+SERVICES = [
+    ("Window cleaning", 4200),
+    ("Refrigerator cleaning", 3500),
+    ("Closet / Pantry", 2500),
+    ("Balcony", 6000),
+    ("Kitchen set", 8000),
+    ("Oven", 4500),
+    ("Curtains", 2500),
+]
+CITIES = ["Almaty", "Astana", "Shymkent"]
+
+
+def order_payload(rng: random.Random) -> Dict[str, Any]:
+    """
+    Body for `POST /orders/`: 1-3 services in one of the standard-price cities,
+    with coordinates near its centre.
+    """
+    from backend.utils.geo import city_centroid
+
+    city = rng.choice(CITIES)
+    lat, lng = city_centroid(city)
+    return {
+        "items": [
+            {"service_name": name, "quantity": rng.randint(1, 2), "price": price}
+            for name, price in rng.sample(SERVICES, rng.randint(1, 3))
+        ],
+        "address": f"{city}, {rng.randint(1, 300)} Abay Ave",
+        "city": city,
+        "rooms": rng.randint(1, 5),
+        "property_type": rng.choice(["Apartment", "Private House"]),
+        "cleaning_type": "Standard",
+        "latitude": lat + rng.uniform(-0.05, 0.05),
+        "longitude": lng + rng.uniform(-0.05, 0.05),
+    }
@@ -0,0 +1,98 @@
+"""
+Polling with and without ETags: unconditional GETs vs If-None-Match revalidation.
+
+Replays what `cleaner.js` and `account.js` do between changes: repeated GETs
+of /cleaner/orders/available (order board) and /orders/me (200-order
+history). Reports latency and bytes per poll for plain 200s and for 304
+revalidations, and fails unless an order change turns the next poll into a
+200 again.
+
+    python -m benchmarks.conditional_get --orders 2000 --polls 300
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+
+from .common import print_summary, seed_orders, summarize, use_temp_workdir
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--polls", type=int, default=300)
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    use_temp_workdir()
+    from fastapi.testclient import TestClient
+
+    from backend import models
+    from backend.auth import create_access_token
+    from backend.bootstrap import bootstrap_database
+    from backend.database import SessionLocal
+    from backend.main import app
+
+    bootstrap_database()
+    with SessionLocal() as db:
+        customer = models.User(email="customer@bench.example.com", password_hash="x", role="user")
+        cleaner = models.User(email="cleaner@bench.example.com", password_hash="x", role="cleaner")
+        db.add_all([customer, cleaner])
+        db.flush()
+        db.add(models.Cleaner(user_id=cleaner.id, availability=True))
+        seed_orders(db, customer.id, args.orders, random.Random(args.seed))
+        db.commit()
+        headers = {
+            "/orders/me": {"Authorization": f"Bearer {create_access_token({'sub': str(customer.id), 'role': 'user'})}"},
+            "/cleaner/orders/available": {
+                "Authorization": f"Bearer {create_access_token({'sub': str(cleaner.id), 'role': 'cleaner'})}"
+            },
+        }
+
+    client = TestClient(app)
+    params = {"limit": args.limit}
+
+    def poll(path: str, etag: str = ""):
+        extra = {"If-None-Match": etag} if etag else {}
+        latencies, sizes = [], []
+        start = time.perf_counter()
+        for _ in range(args.polls):
+            t0 = time.perf_counter()
+            res = client.get(path, params=params, headers={**headers[path], **extra})
+            latencies.append(time.perf_counter() - t0)
+            sizes.append(len(res.content))
+        return summarize(latencies, time.perf_counter() - start), res, sum(sizes) / len(sizes)
+
+    problems = []
+    for path in headers:
+        stats, res, size = poll(path)
+        print_summary(f"{path} 200", stats)
+        print(f"{'':<32} {size / 1024:.1f} KiB per poll")
+        etag = res.headers["ETag"]
+        stats, res, size = poll(path, etag)
+        print_summary(f"{path} 304", stats)
+        print(f"{'':<32} {size / 1024:.1f} KiB per poll")
+        if res.status_code != 304:
+            problems.append(f"{path} did not revalidate")
+
+        created = client.post(
+            "/orders/",
+            headers=headers["/orders/me"],
+            json={"items": [{"service_name": "Window cleaning", "quantity": 1}], "address": "Abay 1"},
+        )
+        created.raise_for_status()
+        res = client.get(path, params=params, headers={**headers[path], "If-None-Match": etag})
+        if res.status_code != 200 or res.json()["items"][0]["id"] != created.json()["id"]:
+            problems.append(f"{path} served a stale 304 after a new order")
+
+    if problems:
+        print("FAIL: " + "; ".join(problems))
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
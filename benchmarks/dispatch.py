@@ -0,0 +1,97 @@
+"""
+Auto-dispatch benchmark: plan and commit a matching pass over many pending
+orders and idle cleaners spread across the supported cities.
+
+    python -m benchmarks.dispatch --orders 10000 --cleaners 2000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from .common import use_temp_workdir
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=10_000)
+    parser.add_argument("--cleaners", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    use_temp_workdir()
+    from sqlalchemy import insert, select
+
+    from backend import models
+    from backend.bootstrap import bootstrap_database
+    from backend.database import SessionLocal
+    from backend.dispatch import plan_assignments, run_dispatch
+    from backend.utils.geo import CITY_CENTROIDS, geo_cell
+
+    bootstrap_database()
+
+    rng = random.Random(args.seed)
+    cities = [name.title() for name in CITY_CENTROIDS]
+
+    def scatter(city: str):
+        lat, lng = CITY_CENTROIDS[city.lower()]
+        return lat + rng.uniform(-0.2, 0.2), lng + rng.uniform(-0.3, 0.3)
+
+    with SessionLocal() as db:
+        db.execute(insert(models.User), [{"email": "customer@bench.local", "password_hash": "x", "role": "user"}])
+        db.execute(
+            insert(models.User),
+            [
+                {"email": f"cleaner{i}@bench.local", "password_hash": "x", "role": "cleaner", "city": rng.choice(cities)}
+                for i in range(args.cleaners)
+            ],
+        )
+        cleaner_ids = db.scalars(select(models.User.id).where(models.User.role == "cleaner")).all()
+        db.execute(insert(models.Cleaner), [{"user_id": uid, "availability": True} for uid in cleaner_ids])
+        order_rows = []
+        for _ in range(args.orders):
+            city = rng.choice(cities)
+            lat, lng = scatter(city)
+            order_rows.append(
+                {
+                    "user_id": 1,
+                    "status": "pending",
+                    "total_price": 10000,
+                    "address": "Bench",
+                    "city": city,
+                    "latitude": lat,
+                    "longitude": lng,
+                    "geo_cell": geo_cell(lat, lng),
+                }
+            )
+        db.execute(insert(models.Order), order_rows)
+        db.commit()
+
+        orders = db.execute(
+            select(models.Order.id, models.Order.latitude, models.Order.longitude, models.Order.city)
+        ).all()
+        cleaners = db.execute(
+            select(models.Cleaner.user_id, models.User.city).join(models.User, models.User.id == models.Cleaner.user_id)
+        ).all()
+
+    start = time.perf_counter()
+    planned = plan_assignments(orders, cleaners)
+    plan_s = time.perf_counter() - start
+    print(
+        f"plan   {args.orders} orders x {args.cleaners} cleaners: {plan_s * 1000:.1f} ms, "
+        f"{len(planned)} matches, {sum(a.distance_km for a in planned):.0f} km in total"
+    )
+
+    with SessionLocal() as db:
+        start = time.perf_counter()
+        result = run_dispatch(db)
+        total_s = time.perf_counter() - start
+    print(
+        f"commit full pass (load + plan + claim + publish): {total_s * 1000:.1f} ms, "
+        f"{len(result.assignments)} assigned"
+    )
+
+
+if __name__ == "__main__":
+    main()
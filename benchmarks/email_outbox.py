@@ -0,0 +1,157 @@
+"""
+Password-reset email through the outbox, against a local SMTP stand-in.
+
+Times /auth/request-reset (which now only enqueues), then drains the outbox
+with the background sender and compares it with the old connect-per-message
+delivery. The stand-in answers every command after `--server-delay-ms` to
+mimic a remote server, can fail the first N messages with 451, and refuses
+recipients starting with "reject"; `tests/test_email_outbox.py` uses it to
+check connection reuse, backoff, giving up and lease reclaim.
+
+    python -m benchmarks.email_outbox --emails 200 --server-delay-ms 5
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import socketserver
+import threading
+import time
+from typing import List
+
+from .common import print_summary, summarize, use_temp_workdir
+
+
+class SmtpStandIn(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, delay_seconds: float) -> None:
+        super().__init__(("127.0.0.1", 0), _SmtpHandler)
+        self.delay_seconds = delay_seconds
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages: List[str] = []
+        self.fail_next = 0
+
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    server: SmtpStandIn
+
+    def reply(self, line: str) -> None:
+        if self.server.delay_seconds:
+            time.sleep(self.server.delay_seconds)
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self) -> None:
+        with self.server.lock:
+            self.server.connections += 1
+        self.reply("220 stand-in ESMTP")
+        recipient = ""
+        while True:
+            line = self.rfile.readline().decode().strip()
+            if not line:
+                return
+            verb = line.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self.wfile.write(b"250-stand-in\r\n")
+                self.reply("250 AUTH PLAIN LOGIN")
+            elif verb == "AUTH":
+                self.reply("235 2.7.0 Authentication successful")
+            elif verb == "MAIL":
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipient = line.split(":", 1)[1].strip("<> ")
+                self.reply("550 5.1.1 No such user" if recipient.startswith("reject") else "250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                    pass
+                with self.server.lock:
+                    failing = self.server.fail_next > 0
+                    if failing:
+                        self.server.fail_next -= 1
+                    else:
+                        self.server.messages.append(recipient)
+                self.reply("451 4.3.0 Try again later" if failing else "250 OK queued")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:  # RSET, NOOP, ...
+                self.reply("250 OK")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--emails", type=int, default=200)
+    parser.add_argument("--server-delay-ms", type=float, default=5.0)
+    parser.add_argument("--transient-failures", type=int, default=3)
+    args = parser.parse_args()
+
+    server = SmtpStandIn(args.server_delay_ms / 1000)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ.update(
+        SMTP_HOST="127.0.0.1",
+        SMTP_PORT=str(server.server_address[1]),
+        SMTP_USER="bench",
+        SMTP_PASSWORD="bench",
+        SMTP_FROM="noreply@bench.example.com",
+        SMTP_STARTTLS="0",
+        EMAIL_RETRY_BASE_SECONDS="0",
+        PASSWORD_HASH_WORKERS="0",
+    )
+    use_temp_workdir()
+    import smtplib
+
+    from backend import models, schemas
+    from backend.bootstrap import bootstrap_database
+    from backend.database import SessionLocal
+    from backend.email_service import OutboxSender, get_smtp_config, render_email
+    from backend.routers.auth import request_password_reset
+
+    bootstrap_database()
+    emails = [f"user{i}@bench.example.com" for i in range(args.emails)] + ["reject@bench.example.com"]
+    with SessionLocal() as db:
+        db.add_all(models.User(email=e, password_hash="x", role="user") for e in emails)
+        db.commit()
+
+    latencies = []
+    start = time.perf_counter()
+    for email in emails:
+        t0 = time.perf_counter()
+        with SessionLocal() as db:
+            request_password_reset(schemas.PasswordResetRequest(email=email), db)
+        latencies.append(time.perf_counter() - t0)
+    print_summary("request-reset (enqueue only)", summarize(latencies, time.perf_counter() - start))
+
+    # Outbox sender: one connection, batches, retries.
+    server.fail_next = args.transient_failures
+    sender = OutboxSender(batch_size=50)
+    start = time.perf_counter()
+    while sender.run_once():
+        pass
+    elapsed = time.perf_counter() - start
+    print(
+        f"outbox sender: {sender.sent} sent in {elapsed:.2f}s ({sender.sent / elapsed:.0f} msg/s), "
+        f"connections={sender.connections}, retried={sender.retried}, failed={sender.failed}"
+    )
+
+    # Old behaviour for comparison: connect, log in and send per message.
+    config = get_smtp_config()
+    start = time.perf_counter()
+    for email in emails[:-1]:
+        with smtplib.SMTP(config["host"], config["port"]) as smtp:
+            smtp.login(config["user"], config["password"])
+            smtp.send_message(render_email("password_reset", config["from_email"], email, {"code": "123456"}))
+    elapsed = time.perf_counter() - start
+    print(f"connect per message: {len(emails) - 1} sent in {elapsed:.2f}s ({(len(emails) - 1) / elapsed:.0f} msg/s)")
+
+    with SessionLocal() as db:
+        statuses = {
+            status: db.query(models.EmailOutbox).filter(models.EmailOutbox.status == status).count()
+            for status in ("pending", "sent", "failed")
+        }
+    print(f"outbox rows: {statuses}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Bulk-load synthetic users, cleaners, addresses, orders, items and feedback.
+
+Unlike the other benchmarks this writes to the configured database
+(`DATABASE_URL`, by default `tazabolsyn.db` in the current directory), so run
+it from the project root with the API stopped, then point
+`benchmarks.scenarios` at a server on the same database. Rows go in with
+batched Core INSERTs and explicit ids, `--batch` rows per transaction, so
+millions of orders load in minutes. Reruns add to what is there.
+
+Generated accounts are `load-user-<id>@example.com` /
+`load-cleaner-<id>@example.com` with the password `--password`. Orders are
+spread over the last `--days` days; most are finished or paid and assigned
+to a generated cleaner, `--pending-share` are still on the order board.
+
+    python -m benchmarks.generate_data --users 50000 --cleaners 2000 --orders 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+from .common import CITIES, PROJECT_ROOT, SERVICES
+
+FEEDBACK = ["Great job", "Very clean, thank you", "Arrived late but did well", "Will book again", "Okay"]
+
+
+def _batched(rows: Iterator[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch: List[Dict[str, Any]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--cleaners", type=int, default=500)
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--addresses-per-user", type=int, default=2)
+    parser.add_argument("--feedback-share", type=float, default=0.3, help="share of finished orders with feedback")
+    parser.add_argument("--pending-share", type=float, default=0.01, help="share of orders still unassigned")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument("--password", default="benchmark-password")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    if str(PROJECT_ROOT) not in sys.path:
+        sys.path.insert(0, str(PROJECT_ROOT))
+    from sqlalchemy import func, insert, select
+
+    from backend import models
+    from backend.auth import get_password_hash
+    from backend.bootstrap import bootstrap_database
+    from backend.database import SessionLocal, engine
+    from backend.utils.etag import ORDERS, bump_versions
+    from backend.utils.geo import city_centroid, geo_cell
+
+    if engine.url.get_backend_name() == "sqlite":
+        print(f"database: {Path(engine.url.database).resolve()}")
+    else:
+        print(f"database: {engine.url.render_as_string(hide_password=True)}")
+    bootstrap_database()
+    rng = random.Random(args.seed)
+    password_hash = get_password_hash(args.password)
+
+    with engine.connect() as conn:
+        first_id = {
+            model: (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+            for model in (models.User, models.Address, models.Order, models.OrderItem, models.Cleaner, models.Feedback)
+        }
+
+    def load(model: Any, rows: Iterator[Dict[str, Any]]) -> int:
+        count = 0
+        started = time.perf_counter()
+        for batch in _batched(rows, args.batch):
+            with engine.begin() as conn:
+                conn.execute(insert(model), batch)
+            count += len(batch)
+        elapsed = time.perf_counter() - started
+        rate = count / elapsed if elapsed > 0 else 0.0
+        print(f"{model.__tablename__:<14} {count:>10,} rows in {elapsed:6.1f}s  ({rate:,.0f} rows/s)")
+        return count
+
+    user_ids = range(first_id[models.User], first_id[models.User] + args.users)
+    cleaner_ids = range(user_ids.stop, user_ids.stop + args.cleaners)
+    cities = {user_id: rng.choice(CITIES) for user_id in range(user_ids.start, cleaner_ids.stop)}
+
+    def users() -> Iterator[Dict[str, Any]]:
+        for user_id in range(user_ids.start, cleaner_ids.stop):
+            kind = "user" if user_id in user_ids else "cleaner"
+            yield {
+                "id": user_id,
+                "name": f"Load {kind} {user_id}",
+                "email": f"load-{kind}-{user_id}@example.com",
+                "phone": f"+7700{user_id % 10_000_000:07d}",
+                "password_hash": password_hash,
+                "role": kind,
+                "is_totp_enabled": False,
+                "city": cities[user_id],
+                "reward_points": 0,
+            }
+
+    def cleaners() -> Iterator[Dict[str, Any]]:
+        for offset, user_id in enumerate(cleaner_ids):
+            yield {"id": first_id[models.Cleaner] + offset, "user_id": user_id, "availability": True}
+
+    def addresses() -> Iterator[Dict[str, Any]]:
+        address_id = first_id[models.Address]
+        for user_id in user_ids:
+            lat, lng = city_centroid(cities[user_id])
+            for n in range(args.addresses_per_user):
+                yield {
+                    "id": address_id,
+                    "user_id": user_id,
+                    "address": f"{cities[user_id]}, {rng.randint(1, 300)} Abay Ave",
+                    "apartment": str(rng.randint(1, 200)),
+                    "latitude": lat + rng.uniform(-0.05, 0.05),
+                    "longitude": lng + rng.uniform(-0.05, 0.05),
+                }
+                address_id += 1
+
+    # Orders, their items and feedback are generated together; items and
+    # feedback are buffered per order batch and loaded right after it.
+    pending_items: List[Dict[str, Any]] = []
+    pending_feedback: List[Dict[str, Any]] = []
+    counters = {"item_id": first_id[models.OrderItem], "feedback_id": first_id[models.Feedback]}
+    end = datetime.now(timezone.utc)
+    start = end - timedelta(days=args.days)
+    step = (end - start) / max(1, args.orders)
+
+    def orders() -> Iterator[Dict[str, Any]]:
+        for n in range(args.orders):
+            order_id = first_id[models.Order] + n
+            user_id = rng.choice(user_ids)
+            city = cities[user_id]
+            lat, lng = city_centroid(city)
+            lat, lng = lat + rng.uniform(-0.05, 0.05), lng + rng.uniform(-0.05, 0.05)
+            created_at = start + step * n
+            total = 0
+            for name, price in rng.sample(SERVICES, rng.randint(1, 4)):
+                quantity = rng.randint(1, 2)
+                total += price * quantity
+                pending_items.append(
+                    {
+                        "id": counters["item_id"],
+                        "order_id": order_id,
+                        "service_name": name,
+                        "quantity": quantity,
+                        "price": price,
+                    }
+                )
+                counters["item_id"] += 1
+            if rng.random() < args.pending_share or not cleaner_ids:
+                status, cleaner_id = "pending", None
+            else:
+                status, cleaner_id = rng.choice(["finished", "finished", "finished", "paid"]), rng.choice(cleaner_ids)
+                if rng.random() < args.feedback_share:
+                    pending_feedback.append(
+                        {
+                            "id": counters["feedback_id"],
+                            "order_id": order_id,
+                            "user_id": user_id,
+                            "comment": rng.choice(FEEDBACK),
+                            "rating": rng.randint(3, 5),
+                            "created_at": created_at + timedelta(days=1),
+                        }
+                    )
+                    counters["feedback_id"] += 1
+            yield {
+                "id": order_id,
+                "user_id": user_id,
+                "cleaner_id": cleaner_id,
+                "status": status,
+                "total_price": total,
+                "created_at": created_at,
+                "property_type": rng.choice(["Apartment", "Private House"]),
+                "rooms": rng.randint(1, 5),
+                "bathrooms": rng.randint(1, 2),
+                "cleaning_type": "Standard",
+                "address": f"{city}, {rng.randint(1, 300)} Abay Ave",
+                "city": city,
+                "latitude": lat,
+                "longitude": lng,
+                "geo_cell": geo_cell(lat, lng),
+            }
+
+    started = time.perf_counter()
+    load(models.User, users())
+    load(models.Cleaner, cleaners())
+    load(models.Address, addresses())
+    totals = {"orders": 0, "order_items": 0, "feedbacks": 0}
+    order_started = time.perf_counter()
+    for batch in _batched(orders(), args.batch):
+        with engine.begin() as conn:
+            conn.execute(insert(models.Order), batch)
+            conn.execute(insert(models.OrderItem), pending_items)
+            if pending_feedback:
+                conn.execute(insert(models.Feedback), pending_feedback)
+        pending_items.clear()
+        pending_feedback.clear()
+        totals["orders"] += len(batch)
+        totals["order_items"] = counters["item_id"] - first_id[models.OrderItem]
+        totals["feedbacks"] = counters["feedback_id"] - first_id[models.Feedback]
+        if totals["orders"] % (args.batch * 20) == 0:
+            print(f"  ... {totals['orders']:,} orders")
+    elapsed = time.perf_counter() - order_started
+    for table, count in totals.items():
+        print(f"{table:<14} {count:>10,} rows in {elapsed:6.1f}s  (with orders)")
+
+    # Admin listings and the order board are cached by ETag; new rows must change it.
+    with SessionLocal() as db:
+        bump_versions(db, ORDERS)
+        db.commit()
+    print(f"done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Retry storms against the idempotent write endpoints (`Idempotency-Key`).
+
+Each round fires `--retries` identical requests with one key at the same
+instant, as a mobile client re-sending on a flaky network would, then a few
+late retries: `POST /orders/`, then `POST /cleaner/orders/{id}/take` and
+`PATCH /cleaner/orders/{id}/status` for that order. Reports the latency of
+first executions and of replayed retries, and the orders created by the same
+storm without a key for comparison. The correctness checks (one execution
+per key, identical replays, 422 on key reuse) live in
+`tests/test_idempotency.py`.
+
+    python -m benchmarks.idempotency --rounds 20 --retries 16
+    SQLITE_MODE=wal python -m benchmarks.idempotency
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+from .common import order_payload, print_summary, summarize, use_temp_workdir
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--retries", type=int, default=16, help="concurrent copies of each request")
+    parser.add_argument("--late", type=int, default=4, help="sequential retries after each storm")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    os.environ["PASSWORD_HASH_WORKERS"] = "0"
+    use_temp_workdir()
+    from fastapi.testclient import TestClient
+    from sqlalchemy import func, select
+
+    from backend import models
+    from backend.auth import create_access_token
+    from backend.bootstrap import bootstrap_database
+    from backend.database import SessionLocal
+    from backend.main import app
+
+    bootstrap_database()
+    with SessionLocal() as db:
+        customer = models.User(email="retry@bench.example.com", password_hash="x", role="user")
+        cleaner = models.User(email="retry-cleaner@bench.example.com", password_hash="x", role="cleaner")
+        db.add_all([customer, cleaner])
+        db.flush()
+        db.add(models.Cleaner(user_id=cleaner.id, availability=True))
+        db.commit()
+        customer_id = customer.id
+        as_customer = {"Authorization": f"Bearer {create_access_token({'sub': str(customer.id), 'role': 'user'})}"}
+        as_cleaner = {"Authorization": f"Bearer {create_access_token({'sub': str(cleaner.id), 'role': 'cleaner'})}"}
+
+    def order_count() -> int:
+        with SessionLocal() as db:
+            return db.execute(select(func.count()).where(models.Order.user_id == customer_id)).scalar()
+
+    rng = random.Random(args.seed)
+    client = TestClient(app)
+    client.get("/users/me", headers=as_customer)  # warm up the app and the principal cache
+    first: List[float] = []
+    replays: List[float] = []
+
+    with ThreadPoolExecutor(max_workers=args.retries) as pool:
+
+        def storm(method: str, url: str, headers: Dict[str, str], body: Any = None) -> List[Any]:
+            barrier = threading.Barrier(args.retries)
+
+            def send(_: int) -> Tuple[Any, float]:
+                barrier.wait()
+                start = time.perf_counter()
+                res = client.request(method, url, headers=headers, json=body)
+                return res, time.perf_counter() - start
+
+            results = list(pool.map(send, range(args.retries)))
+            for _ in range(args.late):
+                start = time.perf_counter()
+                res = client.request(method, url, headers=headers, json=body)
+                results.append((res, time.perf_counter() - start))
+            for res, latency in results:
+                (replays if res.headers.get("Idempotent-Replayed") else first).append(latency)
+            return [res for res, _ in results]
+
+        started = time.perf_counter()
+        for n in range(args.rounds):
+            created = storm("POST", "/orders/", {**as_customer, "Idempotency-Key": f"create-{n}"}, order_payload(rng))
+            order_id = created[0].json().get("id")
+            steps = [("POST", f"/cleaner/orders/{order_id}/take", None)] + [
+                ("PATCH", f"/cleaner/orders/{order_id}/status", {"status": s}) for s in ("going", "started", "finished")
+            ]
+            for i, (method, url, body) in enumerate(steps):
+                storm(method, url, {**as_cleaner, "Idempotency-Key": f"step-{n}-{i}"}, body)
+        elapsed = time.perf_counter() - started
+        timings = [("first execution", summarize(first, elapsed)), ("replayed retry", summarize(replays, elapsed))]
+        orders = order_count()
+
+        # The same storm without a key: every copy is a new order.
+        storm("POST", "/orders/", as_customer, order_payload(rng))
+        duplicates = order_count() - orders
+
+    per_storm = args.retries + args.late
+    for title, stats in timings:
+        print_summary(title, stats)
+    print(f"{args.rounds} rounds x 5 requests x {per_storm} copies: {orders} orders")
+    print(f"without a key the same storm created {duplicates} orders")
+
+
+if __name__ == "__main__":
+    main()
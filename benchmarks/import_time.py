@@ -0,0 +1,79 @@
+"""
+Import-time budget for `backend.main`: cold-import the app in fresh interpreters.
+
+    python -m benchmarks.import_time --runs 5 --budget-ms 1500
+
+Exits non-zero if the median import exceeds the budget, if importing touches
+the database, or if a lazily-imported heavy module gets loaded eagerly.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from .common import PROJECT_ROOT
+
+# Only needed by rare code paths (2FA setup, outgoing mail); must stay off the import path.
+LAZY_MODULES = ("qrcode", "PIL", "smtplib", "pyotp")
+
+_PROBE = """
+import json, os, sys, time
+start = time.perf_counter()
+import backend.main
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "ms": elapsed * 1000,
+    "eager": [m for m in %r if m in sys.modules],
+    "files": sorted(os.listdir(".")),
+}))
+""" % (LAZY_MODULES,)
+
+
+def measure_once() -> dict:
+    with tempfile.TemporaryDirectory(prefix="tazabolsyn-import-") as workdir:
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE],
+            cwd=workdir,
+            env={**os.environ, "PYTHONPATH": str(PROJECT_ROOT)},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1500.0)
+    args = parser.parse_args()
+
+    samples = [measure_once() for _ in range(args.runs)]
+    times = [s["ms"] for s in samples]
+    median = statistics.median(times)
+    print(f"import backend.main: median {median:.0f} ms, min {min(times):.0f} ms, max {max(times):.0f} ms ({args.runs} runs)")
+
+    failures = []
+    if median > args.budget_ms:
+        failures.append(f"median {median:.0f} ms exceeds budget {args.budget_ms:.0f} ms")
+    eager = sorted({m for s in samples for m in s["eager"]})
+    if eager:
+        failures.append(f"lazily-imported modules loaded at import: {', '.join(eager)}")
+    files = sorted({f for s in samples for f in s["files"]})
+    if files:
+        failures.append(f"import created files (bootstrap must not run on import): {', '.join(files)}")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK within budget")
+
+
+if __name__ == "__main__":
+    main()
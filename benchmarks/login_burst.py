@@ -0,0 +1,108 @@
+"""
+Ordinary request latency during a login burst, with bcrypt inline vs on the hashing pool.
+
+Burst threads verify passwords in a loop (what /auth/login does) while the
+main loop times GET /users/me. Each mode runs in its own interpreter because
+the pool size is read at import time.
+
+    python -m benchmarks.login_burst --burst-threads 32 --requests 300
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from .common import PROJECT_ROOT, print_summary, summarize, use_temp_workdir
+
+MODES = {"inline": "0", "pool": str(min(2, os.cpu_count() or 1))}
+
+
+def run_mode(args: argparse.Namespace) -> None:
+    use_temp_workdir()
+    from fastapi import HTTPException
+    from fastapi.testclient import TestClient
+
+    from backend import models
+    from backend.auth import create_access_token, get_password_hash, verify_password
+    from backend.bootstrap import bootstrap_database
+    from backend.database import SessionLocal
+    from backend.main import app
+    from backend.utils.password_hashing import password_hasher
+
+    bootstrap_database()
+    password_hasher.start()
+    hashed = get_password_hash("burst-password")
+    with SessionLocal() as db:
+        user = models.User(email="reader@bench.example.com", password_hash=hashed, role="user")
+        db.add(user)
+        db.commit()
+        token = create_access_token({"sub": str(user.id), "role": "user"})
+
+    stop = threading.Event()
+    counts = {"logins": 0, "rejected": 0}
+
+    def burst() -> None:
+        while not stop.is_set():
+            try:
+                verify_password("burst-password", hashed)
+                counts["logins"] += 1
+            except HTTPException:
+                counts["rejected"] += 1
+                time.sleep(0.05)
+
+    threads = [threading.Thread(target=burst, daemon=True) for _ in range(args.burst_threads)]
+    for t in threads:
+        t.start()
+
+    client = TestClient(app)
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(args.requests):
+        t0 = time.perf_counter()
+        res = client.get("/users/me", headers={"Authorization": f"Bearer {token}"})
+        assert res.status_code == 200, res.text
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for t in threads:
+        t.join()
+    password_hasher.shutdown()
+
+    print(json.dumps({"http": summarize(latencies, elapsed), **counts, "seconds": elapsed}))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--burst-threads", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args)
+        return
+
+    for mode, workers in MODES.items():
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.login_burst", *sys.argv[1:], "--mode", mode],
+            cwd=PROJECT_ROOT,
+            env={**os.environ, "PASSWORD_HASH_WORKERS": workers},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        print_summary(f"{mode:<6} GET /users/me", result["http"])
+        print(
+            f"{'':<6} logins={result['logins']}  rejected={result['rejected']}  "
+            f"({result['logins'] / result['seconds']:.1f} logins/s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Per-request cost of the metrics (and SQL stats) middleware, and of a scrape.
+
+Drives a trivial ASGI app directly (no HTTP, no TestClient) so only the
+middleware shows up: bare app vs `MetricsMiddleware` vs both middlewares as
+wired in `main.py`. Then renders `/metrics` with every API route observed.
+Fails if the metrics middleware costs more than `--budget-us` per request.
+
+    python -m benchmarks.metrics_overhead --requests 200000 --budget-us 20
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+
+from .common import use_temp_workdir
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-us", type=float, default=20.0)
+    args = parser.parse_args()
+
+    use_temp_workdir()
+    from backend.main import app
+    from backend.utils.metrics import MetricsMiddleware, render_metrics, request_metrics
+    from backend.utils.query_stats import QueryStatsMiddleware
+
+    class _Route:
+        path = "/orders/{order_id}"
+
+    start_message = {"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]}
+    body_message = {"type": "http.response.body", "body": b"ok"}
+
+    async def bare_app(scope, receive, send) -> None:
+        scope["route"] = _Route  # what the router would set
+        await send(dict(start_message, headers=list(start_message["headers"])))
+        await send(body_message)
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message) -> None:
+        pass
+
+    async def drive(asgi, n: int) -> float:
+        scope = {"type": "http", "method": "GET", "path": "/orders/1", "headers": []}
+        started = time.perf_counter()
+        for _ in range(n):
+            await asgi(dict(scope), receive, send)
+        return time.perf_counter() - started
+
+    stacks = {
+        "bare app": bare_app,
+        "metrics": MetricsMiddleware(bare_app),
+        "metrics + sql stats": MetricsMiddleware(QueryStatsMiddleware(bare_app)),
+    }
+    loop = asyncio.new_event_loop()
+    per_request = {}
+    for name, asgi in stacks.items():
+        loop.run_until_complete(drive(asgi, 1000))
+        best = min(loop.run_until_complete(drive(asgi, args.requests)) for _ in range(args.repeat))
+        per_request[name] = best / args.requests * 1e6
+    loop.close()
+    for name, us in per_request.items():
+        extra = f"  (+{us - per_request['bare app']:.2f} us)" if name != "bare app" else ""
+        print(f"{name:<22} {us:.2f} us/request{extra}")
+
+    for route in app.routes:
+        path = getattr(route, "path", None)
+        if path:
+            for status_code in (200, 404):
+                request_metrics.observe("GET", path, status_code, 0.01)
+    started = time.perf_counter()
+    body = render_metrics()
+    elapsed = time.perf_counter() - started
+    print(f"scrape: {len(body.splitlines())} lines, {len(body) / 1024:.0f} KiB in {elapsed * 1000:.2f} ms")
+
+    overhead = per_request["metrics"] - per_request["bare app"]
+    if overhead > args.budget_us:
+        print(f"FAIL: metrics middleware costs {overhead:.2f} us per request (budget {args.budget_us} us)")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
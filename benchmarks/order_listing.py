@@ -0,0 +1,105 @@
+"""
+Admin order listing over 10k orders: ORM + pydantic path vs the Core read path.
+
+Both paths are mounted on a throwaway app and paged through with
+`limit=200` via TestClient: "orm" is the previous implementation (ORM objects,
+`order_to_schema`, response-model validation, `jsonable_encoder`), "core" is
+`read_models.order_page`. Reports per-page latency and the peak memory
+allocated while serving one page, and fails if the two responses differ.
+
+    python -m benchmarks.order_listing --orders 10000 --limit 200
+"""
+# No `from __future__ import annotations`: FastAPI resolves the routes' annotations below.
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+
+from .common import print_summary, seed_orders, summarize, use_temp_workdir
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=10_000)
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    use_temp_workdir()
+    from fastapi import Depends, FastAPI
+    from fastapi.testclient import TestClient
+    from sqlalchemy.orm import Session
+
+    from backend import models, schemas
+    from backend.bootstrap import bootstrap_database
+    from backend.database import SessionLocal, get_db
+    from backend.read_models import order_page
+    from backend.serializers import ORDER_LOAD, order_to_schema
+    from backend.utils.pagination import PageParams, keyset_paginate
+
+    bootstrap_database()
+    rng = random.Random(args.seed)
+    with SessionLocal() as db:
+        user = models.User(email="customer@bench.example.com", password_hash="x", role="user")
+        db.add(user)
+        db.flush()
+        seed_orders(db, user.id, args.orders, rng)
+        db.commit()
+
+    app = FastAPI()
+
+    @app.get("/orm", response_model=schemas.Page[schemas.Order])
+    def orm_listing(page: PageParams = Depends(), db: Session = Depends(get_db)):
+        query = db.query(models.Order).options(*ORDER_LOAD)
+        orders, next_cursor = keyset_paginate(query, (models.Order.created_at, models.Order.id), page)
+        return schemas.Page[schemas.Order](items=[order_to_schema(o) for o in orders], next_cursor=next_cursor)
+
+    @app.get("/core", response_model=schemas.Page[schemas.Order])
+    def core_listing(page: PageParams = Depends(), db: Session = Depends(get_db)):
+        return order_page(db, page)
+
+    client = TestClient(app)
+
+    def walk(path: str, trace: bool = False):
+        """
+        Page through the listing; with `trace`, record peak allocation per page
+        instead of meaningful timings (tracemalloc slows everything down).
+        """
+        latencies, peaks, bodies = [], [], []
+        cursor = None
+        start = time.perf_counter()
+        while True:
+            params = {"limit": args.limit, **({"cursor": cursor} if cursor else {})}
+            if trace:
+                tracemalloc.start()
+            t0 = time.perf_counter()
+            res = client.get(path, params=params)
+            latencies.append(time.perf_counter() - t0)
+            if trace:
+                peaks.append(tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+            bodies.append(res.content)
+            cursor = res.json()["next_cursor"]
+            if not cursor:
+                break
+        return summarize(latencies, time.perf_counter() - start), peaks, bodies
+
+    walk("/core")  # warm up both paths (statement caches, imports)
+    walk("/orm")
+    results = {}
+    for path in ("/orm", "/core"):
+        stats, _, bodies = walk(path)
+        _, peaks, _ = walk(path, trace=True)
+        results[path] = bodies
+        print_summary(f"{path[1:]:<5} page of {args.limit}", stats)
+        print(f"{'':<5} peak allocated per page: {sum(peaks) / len(peaks) / 2**20:.2f} MiB (max {max(peaks) / 2**20:.2f} MiB)")
+
+    if results["/orm"] != results["/core"]:
+        print("FAIL: responses differ")
+        sys.exit(1)
+    print(f"OK identical responses ({len(results['/core'])} pages)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Cost of pricing an order: compiled in-memory catalog vs querying the tables.
+
+Quotes random calculator-style orders (1-4 services, a city, rooms and
+bathrooms) with `PricingCatalog.quote`, and for comparison with one SELECT
+per service against the pricing tables. Also times a full catalog reload
+(read + compile), which each process does at most every
+`PRICING_RELOAD_SECONDS`. Fails if a compiled quote costs more than
+`--budget-us`.
+
+    python -m benchmarks.pricing --orders 100000 --budget-us 20
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+
+from .common import use_temp_workdir
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--db-orders", type=int, default=2000)
+    parser.add_argument("--budget-us", type=float, default=20.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    use_temp_workdir()
+    from sqlalchemy import select
+
+    from backend import models
+    from backend.bootstrap import bootstrap_database
+    from backend.database import read_engine
+    from backend.pricing import DEFAULT_SERVICES, pricing_catalog
+
+    bootstrap_database()
+    catalog = pricing_catalog.load()
+    rng = random.Random(args.seed)
+    names = [name for _, name, _ in DEFAULT_SERVICES]
+    cities = ["Almaty", "Astana", "Karaganda", "Aktobe", None]
+    orders = [
+        (
+            [(name, rng.randint(1, 3)) for name in rng.sample(names, rng.randint(1, 4))],
+            rng.choice(cities),
+            rng.choice(["standard", "deep"]),
+            rng.randint(1, 5),
+            rng.randint(1, 3),
+        )
+        for _ in range(args.orders)
+    ]
+
+    started = time.perf_counter()
+    for items, city, cleaning_type, rooms, bathrooms in orders:
+        catalog.quote(items, city, cleaning_type, rooms, bathrooms)
+    compiled_us = (time.perf_counter() - started) / args.orders * 1e6
+    print(f"compiled catalog      {compiled_us:8.2f} us/order")
+
+    with read_engine.connect() as conn:
+        started = time.perf_counter()
+        for items, *_ in orders[: args.db_orders]:
+            for name, _ in items:
+                conn.execute(select(models.PricingService.price).where(models.PricingService.name == name)).scalar()
+        per_order = (time.perf_counter() - started) / args.db_orders * 1e6
+    print(f"query per service     {per_order:8.2f} us/order  ({per_order / compiled_us:.0f}x)")
+
+    started = time.perf_counter()
+    for _ in range(50):
+        pricing_catalog.load()
+    print(f"reload (read+compile) {(time.perf_counter() - started) / 50 * 1000:8.2f} ms")
+
+    if compiled_us > args.budget_us:
+        print(f"FAIL: quoting costs {compiled_us:.2f} us per order (budget {args.budget_us} us)")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Queries per request for the list endpoints, read from the Server-Timing header.
+
+Grows the data set between rounds (orders, addresses, cleaners, feedback)
+and re-reads every list endpoint. Fails if a route's query count grows with
+the data (an N+1) or goes over its budget below.
+
+    python -m benchmarks.query_counts --rounds 1 5 20
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import sys
+
+from .common import use_temp_workdir
+
+# A warm principal cache costs one version lookup instead of the user SELECT,
+# then the listing's own queries plus the ETag version lookup where the route
+# has one. `/users/me` reloads the user after that lookup, so its body is
+# never older than its tag.
+BUDGETS = {
+    "/users/me": 4,
+    "/orders/me": 4,
+    "/users/me/orders": 4,
+    "/cleaner/orders/available": 4,
+    "/cleaner/orders": 4,
+    "/admin/orders": 4,
+    "/admin/users": 3,
+    "/admin/cleaners": 3,
+    "/admin/feedbacks": 2,
+}
+_QUERIES = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, nargs="+", default=[1, 5, 20])
+    args = parser.parse_args()
+
+    os.environ["PASSWORD_HASH_WORKERS"] = "0"
+    use_temp_workdir()
+    from fastapi.testclient import TestClient
+
+    from backend import models
+    from backend.auth import create_access_token
+    from backend.bootstrap import bootstrap_database
+    from backend.database import SessionLocal
+    from backend.main import app
+
+    bootstrap_database()
+    with SessionLocal() as db:
+        customer = models.User(email="customer@bench.example.com", password_hash="x", role="user")
+        cleaner = models.User(email="cleaner@bench.example.com", password_hash="x", role="cleaner")
+        db.add_all([customer, cleaner])
+        db.flush()
+        db.add(models.Cleaner(user_id=cleaner.id, availability=True))
+        db.commit()
+        admin = db.query(models.User).filter(models.User.role == "admin").first()
+        tokens = {
+            role: {"Authorization": f"Bearer {create_access_token({'sub': str(user.id), 'role': user.role})}"}
+            for role, user in (("user", customer), ("cleaner", cleaner), ("admin", admin))
+        }
+        customer_id = customer.id
+
+    client = TestClient(app)
+
+    def headers(path: str):
+        role = path.split("/")[1]
+        return tokens[role if role in ("admin", "cleaner") else "user"]
+
+    seeded = 0
+    results = {}
+    for target in args.rounds:
+        with SessionLocal() as db:
+            for i in range(seeded, target):
+                order = models.Order(
+                    user_id=customer_id,
+                    status="finished" if i % 2 else "pending",
+                    total_price=1000,
+                    address=f"Abay {i}",
+                    items=[models.OrderItem(service_name="s", quantity=1, price=1000)],
+                )
+                db.add(order)
+                db.add(models.Address(user_id=customer_id, address=f"Abay {i}"))
+                user = models.User(email=f"cleaner{i}@bench.example.com", password_hash="x", role="cleaner")
+                db.add(user)
+                db.flush()
+                db.add(models.Cleaner(user_id=user.id, availability=True))
+                db.add(models.Feedback(order_id=order.id, user_id=customer_id, comment="ok", rating=5))
+            db.commit()
+        seeded = target
+
+        counts = {}
+        for path in BUDGETS:
+            client.get(path, headers=headers(path))  # warm the principal cache
+            res = client.get(path, headers=headers(path))
+            res.raise_for_status()
+            db_ms, queries = _QUERIES.search(res.headers["Server-Timing"]).groups()
+            counts[path] = int(queries)
+            print(f"rows={target:<4} {path:<28} {queries:>2} queries  db={float(db_ms):.2f}ms")
+        results[target] = counts
+
+    problems = []
+    first, last = results[args.rounds[0]], results[args.rounds[-1]]
+    for path, budget in BUDGETS.items():
+        if last[path] != first[path]:
+            problems.append(f"{path} grows with the data ({first[path]} -> {last[path]} queries)")
+        if last[path] > budget:
+            problems.append(f"{path} issues {last[path]} queries, budget {budget}")
+    if problems:
+        print("FAIL: " + "; ".join(problems))
+        sys.exit(1)
+    print("OK query counts are constant and within budget")
+
+
+if __name__ == "__main__":
+    main()
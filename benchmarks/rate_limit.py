@@ -0,0 +1,106 @@
+"""
+Rate limiter hit throughput and memory with a very large number of distinct IPs.
+
+Compares the GCRA limiter (one timestamp per key, capped) with the previous
+sliding-window limiter (a deque of hit times per key, unbounded).
+
+    python -m benchmarks.rate_limit --ips 1000000 --threads 8
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import random
+import threading
+import time
+import tracemalloc
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Deque, Dict, List, Tuple
+
+from .common import use_temp_workdir
+
+
+class SlidingWindowLimiter:
+    """The pre-GCRA implementation, kept here as the baseline."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._events: Dict[Tuple[str, str], Deque[float]] = defaultdict(deque)
+
+    def try_hit(self, *, key, rule) -> bool:
+        now = time.time()
+        cutoff = now - rule.window_seconds
+        with self._lock:
+            q = self._events[key]
+            while q and q[0] < cutoff:
+                q.popleft()
+            if len(q) >= rule.limit:
+                return False
+            q.append(now)
+            return True
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+
+def run(name: str, make_limiter, keys: List[Tuple[str, str]], rule, threads: int):
+    """
+    Timed pass on `threads` threads, then a single-threaded pass under tracemalloc for memory.
+    """
+    chunks = [keys[i::threads] for i in range(threads)]
+
+    def work(limiter, chunk: List[Tuple[str, str]]) -> None:
+        hit = limiter.try_hit
+        for key in chunk:
+            hit(key=key, rule=rule)
+
+    limiter = make_limiter()
+    gc.collect()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda chunk: work(limiter, chunk), chunks))
+    elapsed = time.perf_counter() - start
+
+    del limiter
+    gc.collect()
+    tracemalloc.start()
+    limiter = make_limiter()
+    work(limiter, keys)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{name:<16} hits={len(keys):>8}  {len(keys) / elapsed:>10.0f} hits/s  "
+        f"keys={len(limiter):>8}  memory={current / 2**20:7.1f} MiB"
+    )
+    return limiter
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ips", type=int, default=1_000_000)
+    parser.add_argument("--hits-per-ip", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--max-keys", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    use_temp_workdir()
+    from backend.utils.rate_limit import InMemoryRateLimiter, RateLimit
+
+    rule = RateLimit(limit=8, window_seconds=60)
+    rng = random.Random(args.seed)
+    ips = [f"{rng.randrange(1, 224)}.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}" for _ in range(args.ips)]
+    keys = [("auth:login", ip) for ip in ips for _ in range(args.hits_per_ip)]
+    rng.shuffle(keys)
+
+    run("sliding-window", SlidingWindowLimiter, keys, rule, args.threads)
+    gcra = run("gcra", lambda: InMemoryRateLimiter(max_keys=args.max_keys), keys, rule, args.threads)
+    print(f"{'':<16} evicted={gcra.evicted}")
+    start = time.perf_counter()
+    dropped = gcra.sweep(now=time.monotonic() + rule.window_seconds)
+    print(f"{'':<16} sweep dropped {dropped} idle keys in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
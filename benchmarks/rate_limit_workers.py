@@ -0,0 +1,83 @@
+"""
+Shared rate-limit storage across worker processes: per-hit cost and contention.
+
+Measures the cost of one hit for the per-process and the shared storage, then
+the throughput of several processes that all hammer the same (endpoint, IP)
+key through one shared file. That they share one budget is checked by
+`tests/test_rate_limit.py`.
+
+    python -m benchmarks.rate_limit_workers --workers 8
+"""
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import time
+from pathlib import Path
+
+from .common import use_temp_workdir
+
+LIMIT = 8
+WINDOW_SECONDS = 60
+
+
+def _worker(path: str, hits: int, start_at: float, results) -> None:
+    from backend.utils.rate_limit import RateLimit, SharedFileRateLimiter
+
+    limiter = SharedFileRateLimiter(Path(path))
+    rule = RateLimit(limit=LIMIT, window_seconds=WINDOW_SECONDS)
+    limiter.try_hit(key=("auth:warmup", "203.0.113.7"), rule=rule)  # map the file before the clock starts
+    while time.time() < start_at:
+        pass
+    started = time.perf_counter()
+    for _ in range(hits):
+        limiter.try_hit(key=("auth:login", "203.0.113.7"), rule=rule)
+    results.put(time.perf_counter() - started)
+
+
+def per_hit_cost(limiter, hits: int) -> float:
+    from backend.utils.rate_limit import RateLimit
+
+    rule = RateLimit(limit=LIMIT, window_seconds=WINDOW_SECONDS)
+    keys = [("auth:login", f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}") for i in range(hits)]
+    start = time.perf_counter()
+    for key in keys:
+        limiter.try_hit(key=key, rule=rule)
+    return (time.perf_counter() - start) / hits * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--hits", type=int, default=200_000)
+    parser.add_argument("--hits-per-worker", type=int, default=1000)
+    args = parser.parse_args()
+
+    workdir = use_temp_workdir()
+    from backend.utils.rate_limit import InMemoryRateLimiter, SharedFileRateLimiter
+
+    print(f"memory  {per_hit_cost(InMemoryRateLimiter(), args.hits):6.2f} us/hit")
+    print(f"shared  {per_hit_cost(SharedFileRateLimiter(workdir / 'cost.ratelimit'), args.hits):6.2f} us/hit")
+
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    path = str(workdir / "workers.ratelimit")
+    start_at = time.time() + 3.0
+    procs = [
+        ctx.Process(target=_worker, args=(path, args.hits_per_worker, start_at, results))
+        for _ in range(args.workers)
+    ]
+    for p in procs:
+        p.start()
+    elapsed = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    slowest = max(elapsed)
+    print(
+        f"shared  {args.workers} workers x {args.hits_per_worker} hits on one key: "
+        f"{args.workers * args.hits_per_worker / slowest:,.0f} hits/s, {slowest / args.hits_per_worker * 1e6:.2f} us/hit"
+    )
+
+if __name__ == "__main__":
+    main()
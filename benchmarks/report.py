@@ -0,0 +1,84 @@
+"""
+Per-route throughput and latency percentiles for a `benchmarks.scenarios` run.
+
+Reads the JSON written with `--output` and prints one row per route:
+requests/s over the measured window, p50/p95/p99/max, the status codes seen
+and the error count (5xx and failed connections). With `--baseline`, adds
+the change in throughput and p95 against an earlier run.
+
+    python -m benchmarks.report run.json --baseline before.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from .common import summarize
+
+
+def route_stats(run: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Summary per route (see `common.summarize`) plus `statuses` and `errors`.
+    """
+    measured = run["meta"]["measured_seconds"]
+    stats = {}
+    for route, samples in run["routes"].items():
+        statuses = Counter(samples["statuses"])
+        stats[route] = {
+            **summarize(samples["latencies"], measured),
+            "statuses": dict(sorted(statuses.items())),
+            "errors": sum(n for code, n in statuses.items() if code == 0 or code >= 500),
+        }
+    return stats
+
+
+def _delta(current: float, before: Optional[float]) -> str:
+    if not before:
+        return f"{'n/a':>7}"
+    return f"{(current - before) / before * 100:>+6.1f}%"
+
+
+def print_report(run: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    stats = route_stats(run)
+    before = route_stats(baseline) if baseline else {}
+    meta = run["meta"]
+    print(f"\n{meta['base_url']}  started {meta['started_at']}  users {meta['users']}  {meta['measured_seconds']:.0f}s measured")
+    header = f"{'route':<40} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>6}"
+    if baseline:
+        header += f" {'d req/s':>7} {'d p95':>7}"
+    print(header + "  statuses")
+    total = {"requests": 0, "errors": 0}
+    for route, row in stats.items():
+        statuses = " ".join(f"{code or 'conn'}:{n}" for code, n in row["statuses"].items())
+        line = (
+            f"{route:<40} {row['throughput_rps']:>8.1f} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} "
+            f"{row['p99_ms']:>8.2f} {row['max_ms']:>8.2f} {row['errors']:>6}"
+        )
+        if baseline:
+            old = before.get(route, {})
+            line += f" {_delta(row['throughput_rps'], old.get('throughput_rps'))} {_delta(row['p95_ms'], old.get('p95_ms'))}"
+        print(f"{line}  {statuses}")
+        total["requests"] += row["requests"]
+        total["errors"] += row["errors"]
+    print(f"{'total':<40} {total['requests'] / meta['measured_seconds']:>8.1f}{'':36} {total['errors']:>6}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("run")
+    parser.add_argument("--baseline", default="")
+    args = parser.parse_args()
+
+    with open(args.run, encoding="utf-8") as handle:
+        run = json.load(handle)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+    print_report(run, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Reward-points ledger: concurrent orders from one account and a bulk balance rebuild.
+
+First `--threads` clients place `--orders` orders each for the same account
+at once through `POST /orders/`; the cached balance must equal both the
+ledger sum and the points the returned totals earned (no lost updates).
+Then the ledger is filled with `--entries` entries for `--users` users,
+`--drift` cached balances are corrupted, and `rebuild_balances` is timed
+fixing them. Fails unless exactly the corrupted balances are reported and
+every balance matches the ledger afterwards.
+
+    python -m benchmarks.reward_ledger --users 20000 --entries 200000
+    SQLITE_MODE=wal python -m benchmarks.reward_ledger
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import List
+
+from .common import order_payload, use_temp_workdir
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--orders", type=int, default=10, help="orders per thread")
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--entries", type=int, default=200_000)
+    parser.add_argument("--drift", type=int, default=500, help="cached balances to corrupt")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    os.environ["PASSWORD_HASH_WORKERS"] = "0"
+    use_temp_workdir()
+    from fastapi.testclient import TestClient
+    from sqlalchemy import bindparam, func, insert, select, update
+
+    from backend import models
+    from backend.auth import create_access_token
+    from backend.bootstrap import bootstrap_database
+    from backend.database import SessionLocal, engine
+    from backend.main import app
+    from backend.rewards import ORDER, find_drift, points_for, rebuild_balances
+
+    bootstrap_database()
+    with SessionLocal() as db:
+        customer = models.User(email="ledger@bench.example.com", password_hash="x", role="user")
+        db.add(customer)
+        db.commit()
+        customer_id = customer.id
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': str(customer.id), 'role': 'user'})}"}
+
+    rng = random.Random(args.seed)
+    payloads = [[order_payload(rng) for _ in range(args.orders)] for _ in range(args.threads)]
+    client = TestClient(app)
+    client.get("/users/me", headers=headers)
+    barrier = threading.Barrier(args.threads)
+    failures: List[str] = []
+
+    def place(batch: List[dict]) -> int:
+        barrier.wait()
+        earned = 0
+        for payload in batch:
+            res = client.post("/orders/", json=payload, headers=headers)
+            res.raise_for_status()
+            earned += points_for(res.json()["total_price"])
+        return earned
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        expected = sum(pool.map(place, payloads))
+    elapsed = time.perf_counter() - started
+    ledger = models.RewardLedgerEntry
+    with SessionLocal() as db:
+        cached = db.get(models.User, customer_id).reward_points
+        summed = db.execute(select(func.sum(ledger.points)).where(ledger.user_id == customer_id)).scalar()
+    shown = client.get("/users/me", headers=headers).json()["reward_points"]
+    print(
+        f"{args.threads} threads x {args.orders} orders in {elapsed * 1000:.0f} ms: "
+        f"expected {expected}, cached {cached}, ledger {summed}, /users/me {shown}"
+    )
+    if not expected == cached == summed == shown:
+        failures.append("concurrent orders lost or double-counted points")
+
+    # Bulk data for the rebuild: consistent balances first, then drift.
+    users = models.User.__table__
+    with engine.begin() as conn:
+        first_id = conn.execute(select(func.max(users.c.id))).scalar() + 1
+        user_ids = list(range(first_id, first_id + args.users))
+        conn.execute(
+            insert(users),
+            [
+                {"id": uid, "email": f"ledger-{uid}@bench.example.com", "password_hash": "x", "role": "user"}
+                for uid in user_ids
+            ],
+        )
+        now = datetime.now(timezone.utc)
+        entries = [
+            {"user_id": rng.choice(user_ids), "points": rng.randint(1, 40), "reason": ORDER, "created_at": now}
+            for _ in range(args.entries)
+        ]
+        conn.execute(insert(ledger.__table__), entries)
+        balances = {}
+        for entry in entries:
+            balances[entry["user_id"]] = balances.get(entry["user_id"], 0) + entry["points"]
+        conn.execute(
+            update(users).where(users.c.id == bindparam("uid")).values(reward_points=bindparam("points")),
+            [{"uid": uid, "points": points} for uid, points in balances.items()],
+        )
+        drifted = sorted(rng.sample(user_ids, args.drift))
+        conn.execute(
+            update(users).where(users.c.id.in_(drifted)).values(reward_points=users.c.reward_points + 1000)
+        )
+
+    started = time.perf_counter()
+    found = find_drift(engine)
+    scan = time.perf_counter() - started
+    started = time.perf_counter()
+    corrected = rebuild_balances(engine)
+    rebuild = time.perf_counter() - started
+    print(f"drift scan over {args.entries} entries / {args.users} users: {scan * 1000:.1f} ms, {len(found)} drifted")
+    print(f"rebuild (scan + {len(corrected)} corrections): {rebuild * 1000:.1f} ms")
+    if [c.user_id for c in found] != drifted or [c.user_id for c in corrected] != drifted:
+        failures.append("rebuild did not report exactly the corrupted balances")
+    if find_drift(engine):
+        failures.append("balances still differ from the ledger after the rebuild")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK no lost points under concurrency; rebuild fixed exactly the drifted balances")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""
+Replay a realistic traffic mix against a running API and record per-route latency.
+
+Virtual users are threads, each with its own keep-alive connection, looping
+over weighted actions with exponential think time:
+
+- customers create orders (`POST /orders/`) and check their history and
+  profile, revalidating with `If-None-Match` like a browser would;
+- cleaners poll the order board, race to take an order, then walk it
+  through going -> started -> finished;
+- admins page through `/admin/orders` and skim users and feedback.
+
+Accounts come from `benchmarks.generate_data` (read from the same
+`DATABASE_URL` as the server) and tokens are minted locally, so the server
+must share `SECRET_KEY` (both read `.env`). Against `--base-url`, or with
+`--spawn` a local uvicorn on the configured database is started and stopped
+for the run. Samples from the first `--warmup` seconds are dropped; the rest
+go to `--output` for `benchmarks.report`, which is also printed at the end.
+
+    python -m benchmarks.generate_data --orders 200000
+    python -m benchmarks.scenarios --spawn --workers 2 --duration 60 --output run.json
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from .common import PROJECT_ROOT, order_payload
+
+CONNECTION_ERROR = 0  # status recorded when the request never got a response
+
+
+class Client:
+    """
+    One virtual user's connection: records every request under its route
+    template and keeps ETags per path for conditional GETs.
+    """
+
+    def __init__(self, base_url: str, token: str, record_after: float) -> None:
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+        self.record_after = record_after
+        self.samples: Dict[str, List[Tuple[float, int]]] = {}
+        self.etags: Dict[str, str] = {}
+        self.conn: Optional[http.client.HTTPConnection] = None
+
+    def request(
+        self, route: str, method: str, path: str, body: Any = None, conditional: bool = False
+    ) -> Tuple[int, Any]:
+        headers = dict(self.headers)
+        if conditional and path in self.etags:
+            headers["If-None-Match"] = self.etags[path]
+        payload = json.dumps(body).encode() if body is not None else None
+        started = time.perf_counter()
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            self.conn.request(method, path, body=payload, headers=headers)
+            res = self.conn.getresponse()
+            raw = res.read()
+            status_code = res.status
+        except (OSError, http.client.HTTPException):
+            if self.conn is not None:
+                self.conn.close()
+            self.conn = None
+            raw, status_code = b"", CONNECTION_ERROR
+        elapsed = time.perf_counter() - started
+        if started >= self.record_after:
+            self.samples.setdefault(f"{method} {route}", []).append((elapsed, status_code))
+        if status_code == CONNECTION_ERROR:
+            return status_code, None
+        if conditional and res.getheader("ETag"):
+            self.etags[path] = res.getheader("ETag")
+        return status_code, (json.loads(raw) if raw and status_code != 304 else None)
+
+
+def customer(client: Client, rng: random.Random, state: Dict[str, Any]) -> None:
+    action = rng.choices(["order", "history", "profile"], weights=[1, 3, 2])[0]
+    if action == "order":
+        client.request("/orders/", "POST", "/orders/", order_payload(rng))
+    elif action == "history":
+        client.request("/orders/me", "GET", "/orders/me?limit=20", conditional=True)
+    else:
+        client.request("/users/me", "GET", "/users/me", conditional=True)
+
+
+NEXT_STATUS = {"accepted": "going", "going": "started", "started": "finished"}
+
+
+def cleaner(client: Client, rng: random.Random, state: Dict[str, Any]) -> None:
+    active = state.get("active")
+    if active is not None:
+        order_id, current = active
+        status_code, _ = client.request(
+            "/cleaner/orders/{order_id}/status",
+            "PATCH",
+            f"/cleaner/orders/{order_id}/status",
+            {"status": NEXT_STATUS[current]},
+        )
+        done = status_code != 200 or NEXT_STATUS[current] == "finished"
+        state["active"] = None if done else (order_id, NEXT_STATUS[current])
+        return
+
+    if rng.random() < 0.1:
+        client.request("/cleaner/orders", "GET", "/cleaner/orders?limit=20", conditional=True)
+        return
+    _, page = client.request(
+        "/cleaner/orders/available", "GET", "/cleaner/orders/available?limit=20", conditional=True
+    )
+    if page is not None:
+        state["board"] = [order["id"] for order in page["items"]]
+    if not state.get("board") or rng.random() > 0.3:
+        return
+    order_id = rng.choice(state["board"])
+    status_code, body = client.request(
+        "/cleaner/orders/{order_id}/take", "POST", f"/cleaner/orders/{order_id}/take"
+    )
+    if status_code == 200:
+        state["active"] = (order_id, "accepted")
+    elif status_code == 409 and body and body.get("detail") == "CLEANER_HAS_ACTIVE_ORDER":
+        # Auto-dispatch got there first: pick up whatever we were given.
+        _, page = client.request("/cleaner/orders", "GET", "/cleaner/orders?limit=20")
+        for order in (page or {}).get("items", []):
+            if order["status"] in NEXT_STATUS:
+                state["active"] = (order["id"], order["status"])
+                break
+    else:
+        state["board"].remove(order_id)
+
+
+def admin(client: Client, rng: random.Random, state: Dict[str, Any]) -> None:
+    action = rng.choices(["orders", "users", "feedbacks"], weights=[4, 1, 1])[0]
+    if action != "orders":
+        client.request(f"/admin/{action}", "GET", f"/admin/{action}?limit=50")
+        return
+    cursor = None
+    for _ in range(rng.randint(1, 3)):  # first page, sometimes a couple more
+        query = {"limit": 50, **({"cursor": cursor} if cursor else {})}
+        _, page = client.request("/admin/orders", "GET", f"/admin/orders?{urlencode(query)}")
+        cursor = (page or {}).get("next_cursor")
+        if not cursor:
+            break
+
+
+SCENARIOS = {"customer": customer, "cleaner": cleaner, "admin": admin}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spawn_server(workers: int) -> Tuple[subprocess.Popen, str]:
+    """
+    Start uvicorn from the project root on a free port (same environment, so
+    the same database) and wait until `/` answers.
+    """
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", "127.0.0.1", "--port", str(port)]
+        + ["--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=PROJECT_ROOT,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"uvicorn exited with {server.returncode}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/")
+            if conn.getresponse().status == 200:
+                return server, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise SystemExit("uvicorn did not come up within 60s")
+
+
+def load_accounts(customers: int, cleaners: int, admins: int) -> Dict[str, List[int]]:
+    from sqlalchemy import select
+
+    from backend import models
+    from backend.database import SessionLocal
+
+    wanted = {"customer": ("user", customers), "cleaner": ("cleaner", cleaners), "admin": ("admin", admins)}
+    accounts: Dict[str, List[int]] = {}
+    with SessionLocal() as db:
+        for kind, (role, count) in wanted.items():
+            stmt = select(models.User.id).where(models.User.role == role)
+            if role != "admin":
+                stmt = stmt.where(models.User.email.like("load-%"))
+            ids = db.execute(stmt.order_by(models.User.id.desc()).limit(count * 10)).scalars().all()
+            if count and not ids:
+                raise SystemExit(f"no {role} accounts found: run `python -m benchmarks.generate_data` first")
+            accounts[kind] = ids
+    return accounts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--spawn", action="store_true", help="start a local uvicorn for the run")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers with --spawn")
+    parser.add_argument("--customers", type=int, default=16)
+    parser.add_argument("--cleaners", type=int, default=8)
+    parser.add_argument("--admins", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds, warmup included")
+    parser.add_argument("--warmup", type=float, default=5.0)
+    parser.add_argument("--think-ms", type=float, default=100.0, help="mean pause between a user's actions")
+    parser.add_argument("--output", default="", help="write the samples here (JSON) for benchmarks.report")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    output = Path(args.output).resolve() if args.output else None
+    if str(PROJECT_ROOT) not in sys.path:
+        sys.path.insert(0, str(PROJECT_ROOT))
+    os.chdir(PROJECT_ROOT)  # same relative SQLite path as the server
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    from backend.auth import create_access_token
+
+    from .report import print_report
+
+    counts = {"customer": args.customers, "cleaner": args.cleaners, "admin": args.admins}
+    accounts = load_accounts(**{f"{kind}s": n for kind, n in counts.items()})
+    server = None
+    if args.spawn:
+        server, args.base_url = spawn_server(args.workers)
+
+    rng = random.Random(args.seed)
+    started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    started = time.perf_counter()
+    record_after = started + args.warmup
+    stop_at = started + args.duration
+    clients: List[Client] = []
+    threads: List[threading.Thread] = []
+
+    def run(kind: str, client: Client, seed: int) -> None:
+        user_rng = random.Random(seed)
+        state: Dict[str, Any] = {}
+        while time.perf_counter() < stop_at:
+            SCENARIOS[kind](client, user_rng, state)
+            if args.think_ms:
+                time.sleep(min(user_rng.expovariate(1000 / args.think_ms), 5 * args.think_ms / 1000))
+
+    for kind, count in counts.items():
+        for n in range(count):
+            user_id = accounts[kind][n % len(accounts[kind])]
+            role = "user" if kind == "customer" else kind
+            client = Client(args.base_url, create_access_token({"sub": str(user_id), "role": role}), record_after)
+            clients.append(client)
+            threads.append(threading.Thread(target=run, args=(kind, client, rng.random()), daemon=True))
+
+    print(f"{len(threads)} virtual users against {args.base_url} for {args.duration:.0f}s ({args.warmup:.0f}s warmup)")
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    routes: Dict[str, List[Tuple[float, int]]] = {}
+    for client in clients:
+        for route, samples in client.samples.items():
+            routes.setdefault(route, []).extend(samples)
+    result = {
+        "meta": {
+            "base_url": args.base_url,
+            "started_at": started_at,
+            "measured_seconds": args.duration - args.warmup,
+            "users": counts,
+            "think_ms": args.think_ms,
+            "workers": args.workers if args.spawn else None,
+        },
+        "routes": {
+            route: {
+                "latencies": [round(seconds, 6) for seconds, _ in samples],
+                "statuses": [status_code for _, status_code in samples],
+            }
+            for route, samples in sorted(routes.items())
+        },
+    }
+    if output is not None:
+        output.write_text(json.dumps(result), encoding="utf-8")
+        print(f"samples written to {output}")
+    print_report(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Per-row JSON serialization cost of the order listings, by encoding path.
+
+Encodes the same page of `--limit` orders four ways and reports microseconds
+per row: "response_model" is FastAPI's default for a hand-built
+`Page[Order]` (re-validation, `jsonable_encoder`, stdlib json), "trusted" is
+that page through `trusted_output`, and "core json" / "core fast" are the
+`read_models` rows with the stdlib `JSONResponse` and `FastJSONResponse`.
+Then times GET /admin/orders and /orders/me end to end, with orjson and with
+the stdlib fallback. Fails if any two paths produce different bytes.
+
+    python -m benchmarks.serialization --orders 2000 --limit 200
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+from .common import seed_orders, use_temp_workdir
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    use_temp_workdir()
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.testclient import TestClient
+
+    from backend import models, read_models, schemas
+    from backend.auth import create_access_token
+    from backend.bootstrap import bootstrap_database
+    from backend.database import SessionLocal
+    from backend.main import app
+    from backend.serializers import ORDER_LOAD, order_to_schema
+    from backend.utils import responses
+    from backend.utils.responses import trusted_output
+
+    if responses.orjson is None:
+        print("orjson is not installed: 'fast' paths use the stdlib fallback")
+
+    bootstrap_database()
+    rng = random.Random(args.seed)
+    with SessionLocal() as db:
+        admin = models.User(email="admin@bench.example.com", password_hash="x", role="admin")
+        customer = models.User(email="customer@bench.example.com", password_hash="x", role="user")
+        db.add_all([admin, customer])
+        db.flush()
+        seed_orders(db, customer.id, args.orders, rng)
+        db.commit()
+        headers = {
+            "admin": {"Authorization": f"Bearer {create_access_token({'sub': str(admin.id), 'role': 'admin'})}"},
+            "customer": {
+                "Authorization": f"Bearer {create_access_token({'sub': str(customer.id), 'role': 'user'})}"
+            },
+        }
+
+        newest_first = (models.Order.created_at.desc(), models.Order.id.desc())
+        orders = db.query(models.Order).options(*ORDER_LOAD).order_by(*newest_first).limit(args.limit).all()
+        page = schemas.Page[schemas.Order](items=[order_to_schema(o) for o in orders], next_cursor=None)
+        stmt = read_models.select_orders().order_by(*newest_first).limit(args.limit)
+        rows = read_models.order_rows(db, db.execute(stmt))
+
+    field = next(r for r in app.routes if getattr(r, "path", None) == "/admin/orders").response_field
+    loop = asyncio.new_event_loop()
+    trusted = trusted_output(lambda: page)
+
+    def response_model_path() -> bytes:
+        content = loop.run_until_complete(serialize_response(field=field, response_content=page, is_coroutine=True))
+        return JSONResponse(content).body
+
+    paths = {
+        "response_model": response_model_path,
+        "trusted": lambda: trusted().body,
+        "core json": lambda: JSONResponse({"items": [r.to_json() for r in rows], "next_cursor": None}).body,
+        "core fast": lambda: read_models.page_response(rows).body,
+    }
+    print(f"encoding one page of {len(rows)} orders, {args.repeat} runs each")
+    bodies = {}
+    for name, encode in paths.items():
+        bodies[name] = encode()
+        best = float("inf")
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            encode()
+            best = min(best, time.perf_counter() - t0)
+        print(f"  {name:<15} {best / len(rows) * 1e6:>7.1f} us/row  ({best * 1000:.2f} ms/page)")
+
+    client = TestClient(app)
+    endpoint_bodies = []
+    print(f"end to end, limit={args.limit} (median of {args.repeat})")
+    for encoder in ("orjson", "stdlib"):
+        saved = responses.orjson
+        if encoder == "stdlib":
+            responses.orjson = None
+        try:
+            for path, who in (("/admin/orders", "admin"), ("/orders/me", "customer")):
+                timings = []
+                for _ in range(args.repeat):
+                    t0 = time.perf_counter()
+                    res = client.get(path, params={"limit": args.limit}, headers=headers[who])
+                    timings.append(time.perf_counter() - t0)
+                res.raise_for_status()
+                endpoint_bodies.append(res.content)
+                median = sorted(timings)[len(timings) // 2]
+                count = len(res.json()["items"])
+                print(f"  {path:<15} {encoder:<7} {median / count * 1e6:>7.1f} us/row  ({median * 1000:.2f} ms/page)")
+        finally:
+            responses.orjson = saved
+    loop.close()
+
+    reference = bodies["response_model"]
+    if any(body != reference for body in bodies.values()):
+        print("FAIL: encoding paths produce different bytes")
+        sys.exit(1)
+    if len(set(endpoint_bodies)) != 1:  # all orders belong to the customer: both endpoints list the same page
+        print("FAIL: endpoint responses differ between encoders or endpoints")
+        sys.exit(1)
+    print("OK identical output")
+
+
+if __name__ == "__main__":
+    main()
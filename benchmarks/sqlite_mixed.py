@@ -0,0 +1,136 @@
+"""
+Mixed read/write benchmark for the SQLite engine modes (legacy vs wal).
+
+Many customers at once: most requests list their orders, the rest create one.
+The order endpoints are called directly with a fresh session each, as the
+request pipeline would, leaving out HTTP overhead so the database path is what
+gets measured. Each mode runs in its own interpreter because the engine is
+configured at import time.
+
+    python -m benchmarks.sqlite_mixed --threads 32 --requests 4000 --write-ratio 0.2
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple
+
+from .common import PROJECT_ROOT, print_summary, summarize, use_temp_workdir
+
+MODES = ("legacy", "wal")
+# What `list_my_orders` reads from the request (ETag path and headers).
+LIST_SCOPE = {"type": "http", "method": "GET", "path": "/orders/me", "query_string": b"", "headers": []}
+
+
+def run_mode(args: argparse.Namespace) -> None:
+    use_temp_workdir()
+    from fastapi import Request
+
+    from backend import models, schemas
+    from backend.bootstrap import bootstrap_database
+    from backend.database import SQLITE_MODE, SessionLocal
+    from backend.routers.orders import create_order, list_my_orders
+    from backend.utils.pagination import PageParams
+
+    bootstrap_database()
+    with SessionLocal() as db:
+        customers = [
+            models.User(email=f"customer{i}@bench.local", password_hash="x", role="user", city="Almaty")
+            for i in range(args.customers)
+        ]
+        db.add_all(customers)
+        db.flush()
+        for c in customers:
+            db.add_all(
+                models.Order(user_id=c.id, status="pending", total_price=10000, address="Bench", city="Almaty")
+                for _ in range(args.seed_orders)
+            )
+        db.commit()
+        customer_ids = [c.id for c in customers]
+
+    payload = schemas.OrderCreate(
+        address="Bench 1",
+        city="Almaty",
+        items=[schemas.OrderItemCreate(service_name="Window cleaning", quantity=1)],
+    )
+    rng = random.Random(args.seed)
+    plan = [(rng.random() < args.write_ratio, rng.choice(customer_ids)) for _ in range(args.requests)]
+
+    def call(step: Tuple[bool, int]) -> Tuple[bool, bool, float]:
+        is_write, user_id = step
+        start = time.perf_counter()
+        ok = True
+        with SessionLocal() as db:
+            try:
+                user = db.get(models.User, user_id)  # what the auth dependency does
+                if is_write:
+                    create_order(payload, db, user, idempotency=None)
+                else:
+                    list_my_orders(Request(LIST_SCOPE), PageParams(limit=20, cursor=None), db, user)
+            except Exception:
+                ok = False
+        return is_write, ok, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(call, plan))
+        elapsed = time.perf_counter() - start
+
+    reads = [lat for w, _, lat in results if not w]
+    writes = [lat for w, _, lat in results if w]
+    errors = sum(1 for _, ok, _ in results if not ok)
+    out = {
+        "mode": SQLITE_MODE,
+        "all": summarize([lat for _, _, lat in results], elapsed),
+        "reads": summarize(reads, elapsed),
+        "writes": summarize(writes, elapsed),
+        "errors": errors,
+    }
+    if SQLITE_MODE == "wal":
+        from backend.utils.write_queue import write_queue
+
+        out["writes_per_commit"] = write_queue.jobs / max(1, write_queue.commits)
+    print(json.dumps(out))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--customers", type=int, default=200)
+    parser.add_argument("--seed-orders", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args)
+        return
+
+    child_args = sys.argv[1:]
+    for mode in MODES:
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.sqlite_mixed", *child_args, "--mode", mode],
+            cwd=PROJECT_ROOT,
+            env={**os.environ, "SQLITE_MODE": mode},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        print_summary(f"{mode:<6} all", result["all"])
+        print_summary(f"{mode:<6} reads (list orders)", result["reads"])
+        print_summary(f"{mode:<6} writes (create order)", result["writes"])
+        extra = f"  writes/commit={result['writes_per_commit']:.1f}" if "writes_per_commit" in result else ""
+        print(f"{mode:<6} errors={result['errors']}{extra}")
+
+
+if __name__ == "__main__":
+    main()
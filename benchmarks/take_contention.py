@@ -0,0 +1,98 @@
+"""
+Contention benchmark for POST /cleaner/orders/{id}/take.
+
+Every round publishes one pending order and releases N cleaners at it at the
+same instant. Exactly one take must succeed; everyone else should get a 409.
+
+    python -m benchmarks.take_contention --cleaners 64 --rounds 20
+"""
+from __future__ import annotations
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+from .common import print_summary, summarize, use_temp_workdir
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cleaners", type=int, default=64)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    use_temp_workdir()
+    from fastapi.testclient import TestClient
+    from sqlalchemy import update
+
+    from backend import models
+    from backend.auth import create_access_token, get_password_hash
+    from backend.bootstrap import bootstrap_database
+    from backend.database import SessionLocal
+    from backend.main import app
+
+    bootstrap_database()
+    password_hash = get_password_hash("benchmark-password")
+    with SessionLocal() as db:
+        customer = models.User(email="customer@bench.local", password_hash=password_hash, role="user")
+        db.add(customer)
+        cleaners = [
+            models.User(email=f"cleaner{i}@bench.local", password_hash=password_hash, role="cleaner")
+            for i in range(args.cleaners)
+        ]
+        db.add_all(cleaners)
+        db.flush()
+        db.add_all(models.Cleaner(user_id=c.id, availability=True) for c in cleaners)
+        db.commit()
+        customer_id = customer.id
+        tokens = [create_access_token({"sub": str(c.id), "role": "cleaner"}) for c in cleaners]
+
+    client = TestClient(app)
+    latencies: List[float] = []
+    outcomes = {"won": 0, "lost": 0, "error": 0}
+    bad_rounds = 0
+    total_elapsed = 0.0
+
+    with ThreadPoolExecutor(max_workers=args.cleaners) as pool:
+        for _ in range(args.rounds):
+            with SessionLocal() as db:
+                order = models.Order(user_id=customer_id, status="pending", total_price=10000, address="Bench 1")
+                db.add(order)
+                db.commit()
+                order_id = order.id
+
+            barrier = threading.Barrier(args.cleaners)
+
+            def take(token: str) -> Tuple[int, float]:
+                barrier.wait()
+                start = time.perf_counter()
+                res = client.post(
+                    f"/cleaner/orders/{order_id}/take",
+                    headers={"Authorization": f"Bearer {token}"},
+                )
+                return res.status_code, time.perf_counter() - start
+
+            round_start = time.perf_counter()
+            results = list(pool.map(take, tokens))
+            total_elapsed += time.perf_counter() - round_start
+
+            winners = sum(1 for code, _ in results if code == 200)
+            bad_rounds += winners != 1
+            for code, latency in results:
+                latencies.append(latency)
+                outcomes["won" if code == 200 else "lost" if code == 409 else "error"] += 1
+
+            # Free the winner for the next round.
+            with SessionLocal() as db:
+                db.execute(update(models.Order).where(models.Order.id == order_id).values(status="finished"))
+                db.execute(update(models.Cleaner).values(availability=True))
+                db.commit()
+
+    print_summary(f"take x{args.cleaners} cleaners", summarize(latencies, total_elapsed))
+    print(f"outcomes: {outcomes}  rounds with != 1 winner: {bad_rounds}/{args.rounds}")
+
+
+if __name__ == "__main__":
+    main()
@@ -128,23 +128,30 @@ document.addEventListener("DOMContentLoaded", () => {
     });
   }
 
-  async function fetchOrders() {
+  const ORDERS_PAGE_SIZE = 20;
+
+  // Order history is keyset-paginated; "Load more" appends the next page.
+  async function fetchOrders(cursor = null) {
     if (!ordersTbody) return;
-      ordersTbody.innerHTML = "<tr><td colspan='7'>Loading...</td></tr>";
+    if (!cursor) ordersTbody.innerHTML = "<tr><td colspan='7'>Loading...</td></tr>";
+    ordersTbody.querySelector("[data-load-more-row]")?.remove();
     try {
-      const res = await fetch(`${API_BASE}/orders/me`, {
+      const params = new URLSearchParams({ limit: ORDERS_PAGE_SIZE });
+      if (cursor) params.set("cursor", cursor);
+      const res = await fetch(`${API_BASE}/orders/me?${params}`, {
         headers: authHeaders(),
       });
       if (!res.ok) {
         ordersTbody.innerHTML = "<tr><td colspan='7'>Failed to load orders.</td></tr>";
         return;
       }
-      const orders = await res.json();
-      if (!orders.length) {
+      const page = await res.json();
+      const orders = page.items || [];
+      if (!cursor && !orders.length) {
         ordersTbody.innerHTML = "<tr><td colspan='7'>No orders yet.</td></tr>";
         return;
       }
-      ordersTbody.innerHTML = "";
+      if (!cursor) ordersTbody.innerHTML = "";
       orders.forEach((o) => {
         const tr = document.createElement("tr");
         const date = new Date(o.created_at);
@@ -164,16 +171,19 @@ document.addEventListener("DOMContentLoaded", () => {
             ${canLeaveFeedback ? `<button class="btn btn-outline btn-pill text-xs" data-leave-feedback="${o.id}">Leave Feedback</button>` : "-"}
           </td>
         `;
-        ordersTbody.appendChild(tr);
-      });
-      
-      // Add feedback button handlers
-      ordersTbody.querySelectorAll("[data-leave-feedback]").forEach(btn => {
-        btn.addEventListener("click", (e) => {
-          const orderId = parseInt(btn.getAttribute("data-leave-feedback"));
-          showFeedbackModal(orderId);
+        tr.querySelector("[data-leave-feedback]")?.addEventListener("click", () => {
+          showFeedbackModal(o.id);
         });
+        ordersTbody.appendChild(tr);
       });
+
+      if (page.next_cursor) {
+        const moreRow = document.createElement("tr");
+        moreRow.setAttribute("data-load-more-row", "");
+        moreRow.innerHTML = `<td colspan='7'><button class="btn btn-ghost btn-pill text-xs">Load more</button></td>`;
+        moreRow.querySelector("button").addEventListener("click", () => fetchOrders(page.next_cursor));
+        ordersTbody.appendChild(moreRow);
+      }
     } catch (err) {
       console.error(err);
       ordersTbody.innerHTML = "<tr><td colspan='7'>Error loading orders.</td></tr>";
@@ -15,6 +15,33 @@ function authHeadersAdmin() {
   };
 }
 
+const ADMIN_PAGE_SIZE = 50;
+const LOAD_MORE_VALUE = "__load_more__";
+
+// Admin listings are keyset-paginated: pass the previous page's next_cursor to continue.
+function fetchAdminPage(path, cursor) {
+  const params = new URLSearchParams({ limit: ADMIN_PAGE_SIZE });
+  if (cursor) params.set("cursor", cursor);
+  return fetch(`${API_BASE_ADMIN}${path}?${params}`, {
+    headers: authHeadersAdmin(),
+  });
+}
+
+// Adds a "Load more…" option to a <select> that fetches the next page when picked.
+function setSelectLoadMore(select, nextCursor, loadPage) {
+  select.querySelector(`option[value="${LOAD_MORE_VALUE}"]`)?.remove();
+  if (!nextCursor) return;
+  const opt = document.createElement("option");
+  opt.value = LOAD_MORE_VALUE;
+  opt.textContent = "Load more…";
+  select.appendChild(opt);
+  select.onchange = () => {
+    if (select.value !== LOAD_MORE_VALUE) return;
+    select.value = "";
+    loadPage(nextCursor);
+  };
+}
+
 document.addEventListener("DOMContentLoaded", () => {
   const page = document.body.dataset.page;
   if (page !== "admin") return;
@@ -33,11 +60,9 @@ document.addEventListener("DOMContentLoaded", () => {
   const createCleanerAccountForm = document.getElementById("create-cleaner-account-form");
   const orderAssignForm = document.getElementById("order-assign-form");
 
-  async function loadUsers() {
+  async function loadUsers(cursor = null) {
     try {
-      const res = await fetch(`${API_BASE_ADMIN}/admin/users`, {
-        headers: authHeadersAdmin(),
-      });
+      const res = await fetchAdminPage("/admin/users", cursor);
       if (!res.ok) {
         if (res.status === 401 || res.status === 403) {
           if (window.notify) window.notify.error("Please log in as an admin.");
@@ -47,62 +72,62 @@ document.addEventListener("DOMContentLoaded", () => {
         console.error("Failed to load users");
         return;
       }
-      const users = await res.json();
+      const page = await res.json();
       if (usersSelect) {
-        usersSelect.innerHTML = `<option value="">Select user</option>`;
-        users.forEach((u) => {
+        if (!cursor) usersSelect.innerHTML = `<option value="">Select user</option>`;
+        page.items.forEach((u) => {
           const opt = document.createElement("option");
           opt.value = u.id;
           opt.textContent = `${u.name || ""} ${u.surname || ""} (${u.email}) [${u.role}]`;
           usersSelect.appendChild(opt);
         });
+        setSelectLoadMore(usersSelect, page.next_cursor, loadUsers);
       }
     } catch (err) {
       console.error(err);
     }
   }
 
-  async function loadCleaners() {
+  async function loadCleaners(cursor = null) {
     try {
-      const res = await fetch(`${API_BASE_ADMIN}/admin/cleaners`, {
-        headers: authHeadersAdmin(),
-      });
+      const res = await fetchAdminPage("/admin/cleaners", cursor);
       if (!res.ok) {
         console.error("Failed to load cleaners");
         return;
       }
-      const cleaners = await res.json();
+      const page = await res.json();
       if (cleanersSelect) {
-        cleanersSelect.innerHTML = `<option value="">Select cleaner</option>`;
-        cleaners.forEach((c) => {
+        if (!cursor) cleanersSelect.innerHTML = `<option value="">Select cleaner</option>`;
+        page.items.forEach((c) => {
           const opt = document.createElement("option");
           opt.value = c.user_id;
           opt.textContent = `${c.user?.name || ""} ${c.user?.surname || ""} (${c.user?.email || ""})`;
           cleanersSelect.appendChild(opt);
         });
+        setSelectLoadMore(cleanersSelect, page.next_cursor, loadCleaners);
       }
     } catch (err) {
       console.error(err);
     }
   }
 
-  async function loadOrders() {
+  async function loadOrders(cursor = null) {
     if (!ordersTbody) return;
-    ordersTbody.innerHTML = "<tr><td colspan='7'>Loading...</td></tr>";
+    if (!cursor) ordersTbody.innerHTML = "<tr><td colspan='7'>Loading...</td></tr>";
+    ordersTbody.querySelector("[data-load-more-row]")?.remove();
     try {
-      const res = await fetch(`${API_BASE_ADMIN}/admin/orders`, {
-        headers: authHeadersAdmin(),
-      });
+      const res = await fetchAdminPage("/admin/orders", cursor);
       if (!res.ok) {
         ordersTbody.innerHTML = "<tr><td colspan='7'>Failed to load orders.</td></tr>";
         return;
       }
-      const orders = await res.json();
-      if (!orders.length) {
+      const page = await res.json();
+      const orders = page.items;
+      if (!cursor && !orders.length) {
         ordersTbody.innerHTML = "<tr><td colspan='7'>No orders yet.</td></tr>";
         return;
       }
-      ordersTbody.innerHTML = "";
+      if (!cursor) ordersTbody.innerHTML = "";
       orders.forEach((o) => {
         const tr = document.createElement("tr");
         const date = new Date(o.created_at);
@@ -128,6 +153,13 @@ document.addEventListener("DOMContentLoaded", () => {
         });
         ordersTbody.appendChild(tr);
       });
+      if (page.next_cursor) {
+        const moreRow = document.createElement("tr");
+        moreRow.setAttribute("data-load-more-row", "");
+        moreRow.innerHTML = `<td colspan='7'><button class="btn btn-ghost btn-pill text-xs">Load more</button></td>`;
+        moreRow.querySelector("button").addEventListener("click", () => loadOrders(page.next_cursor));
+        ordersTbody.appendChild(moreRow);
+      }
     } catch (err) {
       console.error(err);
       ordersTbody.innerHTML = "<tr><td colspan='7'>Error loading orders.</td></tr>";
@@ -254,25 +286,25 @@ document.addEventListener("DOMContentLoaded", () => {
     });
   }
 
-  async function loadFeedbacks() {
+  async function loadFeedbacks(cursor = null) {
     const feedbacksList = document.getElementById("admin-feedbacks-list");
     if (!feedbacksList) return;
     
-    feedbacksList.innerHTML = "<p>Loading feedbacks...</p>";
+    if (!cursor) feedbacksList.innerHTML = "<p>Loading feedbacks...</p>";
+    feedbacksList.querySelector("[data-load-more]")?.remove();
     try {
-      const res = await fetch(`${API_BASE_ADMIN}/admin/feedbacks`, {
-        headers: authHeadersAdmin(),
-      });
+      const res = await fetchAdminPage("/admin/feedbacks", cursor);
       if (!res.ok) {
         feedbacksList.innerHTML = "<p class='text-muted'>Failed to load feedbacks.</p>";
         return;
       }
-      const feedbacks = await res.json();
-      if (!feedbacks.length) {
+      const page = await res.json();
+      const feedbacks = page.items;
+      if (!cursor && !feedbacks.length) {
         feedbacksList.innerHTML = "<p class='text-muted'>No feedbacks yet.</p>";
         return;
       }
-      feedbacksList.innerHTML = "";
+      if (!cursor) feedbacksList.innerHTML = "";
       feedbacks.forEach((f) => {
         const card = document.createElement("div");
         card.className = "card mt-3";
@@ -297,6 +329,14 @@ document.addEventListener("DOMContentLoaded", () => {
         `;
         feedbacksList.appendChild(card);
       });
+      if (page.next_cursor) {
+        const moreBtn = document.createElement("button");
+        moreBtn.className = "btn btn-ghost btn-pill text-xs mt-3";
+        moreBtn.setAttribute("data-load-more", "");
+        moreBtn.textContent = "Load more";
+        moreBtn.addEventListener("click", () => loadFeedbacks(page.next_cursor));
+        feedbacksList.appendChild(moreBtn);
+      }
     } catch (err) {
       console.error(err);
       feedbacksList.innerHTML = "<p class='text-muted'>Error loading feedbacks.</p>";
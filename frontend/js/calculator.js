@@ -3,7 +3,8 @@
 const CALC_API_BASE = "http://127.0.0.1:8000";
 const TOKEN_KEY = "tazabolsyn_token";
 
-const SERVICES = [
+// Defaults until /pricing/catalog answers; the server prices orders from the same catalog.
+let SERVICES = [
   { key: "window", name: "Window cleaning", price: 4200 },
   { key: "fridge", name: "Refrigerator cleaning", price: 3500 },
   { key: "dishwashing", name: "Dishwashing (hour)", price: 3500 },
@@ -23,16 +24,48 @@ const SERVICES = [
   { key: "key_delivery", name: "Key delivery", price: 2000 },
 ];
 
-// Cities with standard pricing (no discount)
-const STANDARD_PRICE_CITIES = ["Almaty", "Astana", "Shymkent"];
-const CITY_DISCOUNT = 500; // Discount in tenge for other cities
+// Amount added to service prices per city (standard prices in these, a discount elsewhere)
+let CITY_ADJUSTMENTS = { Almaty: 0, Astana: 0, Shymkent: 0 };
+let OTHER_CITY_ADJUSTMENT = -500;
+let BASE_RATES = {
+  standard: { base: 4000, per_room: 2000, per_bathroom: 1500 },
+  deep: { base: 6000, per_room: 2000, per_bathroom: 1500 },
+};
+
+// City on the logged-in user's account; the server prices orders without a city with it.
+let ACCOUNT_CITY = null;
+
+// Same matching as the server: surrounding whitespace and case don't matter.
+function normalizeCity(city) {
+  return (city || "").trim().toLowerCase();
+}
+
+function getCityAdjustment(city) {
+  const key = normalizeCity(city || ACCOUNT_CITY);
+  if (!key) return 0;
+  const match = Object.keys(CITY_ADJUSTMENTS).find((name) => normalizeCity(name) === key);
+  return match === undefined ? OTHER_CITY_ADJUSTMENT : CITY_ADJUSTMENTS[match];
+}
 
 // Get service price based on city
 function getServicePrice(service, city) {
-  if (!city || STANDARD_PRICE_CITIES.includes(city)) {
-    return service.price;
+  return Math.max(0, service.price + getCityAdjustment(city));
+}
+
+async function loadPricingCatalog() {
+  try {
+    const res = await fetch(`${CALC_API_BASE}/pricing/catalog`);
+    if (!res.ok) return false;
+    const catalog = await res.json();
+    SERVICES = catalog.services;
+    CITY_ADJUSTMENTS = catalog.city_adjustments;
+    OTHER_CITY_ADJUSTMENT = catalog.other_city_adjustment;
+    BASE_RATES = catalog.base_rates;
+    return true;
+  } catch (err) {
+    console.error("Failed to load pricing catalog:", err);
+    return false;
   }
-  return Math.max(0, service.price - CITY_DISCOUNT);
 }
 
 function getTokenCalc() {
@@ -86,6 +119,7 @@ document.addEventListener("DOMContentLoaded", () => {
       });
       if (res.ok) {
         const user = await res.json();
+        ACCOUNT_CITY = user.city || null;
         if (user.city && citySelect) {
           citySelect.value = user.city;
         }
@@ -103,8 +137,8 @@ document.addEventListener("DOMContentLoaded", () => {
   function updateBasePrice() {
     const rooms = parseInt(roomsInput.value || "0", 10);
     const baths = parseInt(bathsInput.value || "0", 10);
-    const baseRate = cleaningTypeSelect.value === "deep" ? 6000 : 4000;
-    state.basePrice = baseRate + rooms * 2000 + baths * 1500;
+    const rate = BASE_RATES[cleaningTypeSelect.value] || BASE_RATES.standard;
+    state.basePrice = rate.base + rooms * rate.per_room + baths * rate.per_bathroom;
     renderReceipt();
   }
 
@@ -138,7 +172,7 @@ document.addEventListener("DOMContentLoaded", () => {
             <div class="text-sm text-muted">
               ${isDiscounted ? `<span style="text-decoration: line-through; color: var(--color-muted);">${s.price.toLocaleString()} ₸</span> ` : ""}
               <span style="color: ${isDiscounted ? 'var(--color-primary);' : 'inherit;'}">${displayPrice.toLocaleString()} ₸</span>
-              ${isDiscounted ? ` <span class="text-xs" style="color: var(--color-primary);">(-${CITY_DISCOUNT}₸)</span>` : ""}
+              ${isDiscounted ? ` <span class="text-xs" style="color: var(--color-primary);">(-${s.price - displayPrice}₸)</span>` : ""}
             </div>
           </div>
         </div>
@@ -220,7 +254,7 @@ document.addEventListener("DOMContentLoaded", () => {
     const note = document.getElementById("city-discount-note");
     if (!note || !citySelect) return;
     const city = citySelect.value;
-    if (city && !STANDARD_PRICE_CITIES.includes(city)) {
+    if (getCityAdjustment(city) < 0) {
       note.style.display = "block";
     } else {
       note.style.display = "none";
@@ -246,7 +280,7 @@ document.addEventListener("DOMContentLoaded", () => {
           items.push({
             service_name: s.name,
             quantity: qty,
-            price: servicePrice, // Use city-adjusted price
+            price: servicePrice, // informational; the server prices from the catalog
           });
         }
       });
@@ -292,10 +326,10 @@ document.addEventListener("DOMContentLoaded", () => {
 
   renderServices();
   updateBasePrice();
-  loadUserCity().then(() => {
+  Promise.all([loadPricingCatalog(), loadUserCity()]).then(() => {
     updateCityDiscountNote();
     renderServices();
-    renderReceipt();
+    updateBasePrice();
   });
 });
 
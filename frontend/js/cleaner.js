@@ -5,6 +5,7 @@ const TOKEN_KEY = "tazabolsyn_token";
 
 const STATUS_FLOW = ["pending", "accepted", "going", "started", "finished"];
 const ACTIVE_STATUSES = new Set(["accepted", "going", "started"]);
+const NEAR_ME_RADIUS_KM = 25;
 
 function getTokenCleaner() {
   return localStorage.getItem(TOKEN_KEY);
@@ -18,6 +19,26 @@ function authHeadersCleaner() {
   };
 }
 
+function distanceKm(lat1, lng1, lat2, lng2) {
+  const toRad = (d) => (d * Math.PI) / 180;
+  const dLat = toRad(lat2 - lat1);
+  const dLng = toRad(lng2 - lng1);
+  const a =
+    Math.sin(dLat / 2) ** 2 + Math.cos(toRad(lat1)) * Math.cos(toRad(lat2)) * Math.sin(dLng / 2) ** 2;
+  return 2 * 6371 * Math.asin(Math.min(1, Math.sqrt(a)));
+}
+
+function locateCleaner() {
+  return new Promise((resolve) => {
+    if (!navigator.geolocation) return resolve(null);
+    navigator.geolocation.getCurrentPosition(
+      (pos) => resolve({ lat: pos.coords.latitude, lng: pos.coords.longitude }),
+      () => resolve(null),
+      { timeout: 5000, maximumAge: 300000 }
+    );
+  });
+}
+
 document.addEventListener("DOMContentLoaded", () => {
   const page = document.body.dataset.page;
   if (page !== "cleaner") return;
@@ -32,8 +53,11 @@ document.addEventListener("DOMContentLoaded", () => {
   const availableTbody = document.getElementById("available-orders-tbody");
   const ordersTbody = document.getElementById("cleaner-orders-tbody");
   let lastAssigned = [];
+  let availableOrders = new Map();
   let loadingAssigned = false;
   let loadingAvailable = false;
+  let pollTimer = null;
+  let nearMe = null; // { lat, lng } when the browser shares a location
 
   function hasActiveOrder(orders) {
     return (orders || []).some((o) => ACTIVE_STATUSES.has(o.status));
@@ -120,8 +144,8 @@ document.addEventListener("DOMContentLoaded", () => {
         if (ordersTbody) ordersTbody.innerHTML = "<tr><td colspan='6'>Failed to load orders.</td></tr>";
         return;
       }
-      const orders = await res.json();
-      lastAssigned = orders || [];
+      const page = await res.json();
+      lastAssigned = page.items || [];
       renderAssignedOrders(lastAssigned);
     } catch (err) {
       console.error(err);
@@ -136,7 +160,10 @@ document.addEventListener("DOMContentLoaded", () => {
     loadingAvailable = true;
     availableTbody.innerHTML = "<tr><td colspan='7'>Loading...</td></tr>";
     try {
-      const res = await fetch(`${API_BASE_CLEANER}/cleaner/orders/available`, {
+      const params = nearMe
+        ? `?lat=${nearMe.lat}&lng=${nearMe.lng}&radius_km=${NEAR_ME_RADIUS_KM}`
+        : "";
+      const res = await fetch(`${API_BASE_CLEANER}/cleaner/orders/available${params}`, {
         headers: authHeadersCleaner(),
       });
       if (!res.ok) {
@@ -148,9 +175,9 @@ document.addEventListener("DOMContentLoaded", () => {
         availableTbody.innerHTML = "<tr><td colspan='7'>Failed to load available orders.</td></tr>";
         return;
       }
-      const orders = await res.json();
-      const canTake = !hasActiveOrder(lastAssigned);
-      renderAvailableOrders(orders || [], canTake);
+      const page = await res.json();
+      availableOrders = new Map((page.items || []).map((o) => [o.id, o]));
+      rerenderAvailable();
     } catch (err) {
       console.error(err);
       availableTbody.innerHTML = "<tr><td colspan='7'>Error loading available orders.</td></tr>";
@@ -159,6 +186,88 @@ document.addEventListener("DOMContentLoaded", () => {
     }
   }
 
+  function orderDistance(o) {
+    if (!nearMe || o.latitude == null || o.longitude == null) return Infinity;
+    return distanceKm(nearMe.lat, nearMe.lng, o.latitude, o.longitude);
+  }
+
+  function rerenderAvailable() {
+    const orders = [...availableOrders.values()].sort(
+      nearMe
+        ? (a, b) => orderDistance(a) - orderDistance(b)
+        : (a, b) => new Date(b.created_at) - new Date(a.created_at)
+    );
+    renderAvailableOrders(orders, !hasActiveOrder(lastAssigned));
+  }
+
+  function applyOrderDelta(order) {
+    const inRange = !nearMe || orderDistance(order) <= NEAR_ME_RADIUS_KM;
+    if (order.status === "pending" && order.cleaner_id == null && inRange) {
+      availableOrders.set(order.id, order);
+    } else {
+      availableOrders.delete(order.id);
+    }
+    // Full payloads for assigned orders only ever reach the assigned cleaner.
+    if (order.cleaner_id != null) {
+      const idx = lastAssigned.findIndex((o) => o.id === order.id);
+      if (idx >= 0) lastAssigned[idx] = order;
+      else lastAssigned.unshift(order);
+    } else {
+      lastAssigned = lastAssigned.filter((o) => o.id !== order.id);
+    }
+    renderAssignedOrders(lastAssigned);
+    rerenderAvailable();
+  }
+
+  function removeOrder(orderId) {
+    availableOrders.delete(orderId);
+    lastAssigned = lastAssigned.filter((o) => o.id !== orderId);
+    renderAssignedOrders(lastAssigned);
+    rerenderAvailable();
+  }
+
+  async function reloadAll() {
+    await loadAssignedOrders();
+    await loadAvailableOrders();
+  }
+
+  function startPolling() {
+    if (pollTimer) return;
+    pollTimer = setInterval(reloadAll, 5000);
+  }
+
+  function stopPolling() {
+    if (!pollTimer) return;
+    clearInterval(pollTimer);
+    pollTimer = null;
+  }
+
+  // Live order board: the server pushes deltas; a full reload only happens
+  // when the stream (re)connects or asks us to resync.
+  function connectOrderStream() {
+    if (typeof EventSource === "undefined") {
+      startPolling();
+      return;
+    }
+    const source = new EventSource(
+      `${API_BASE_CLEANER}/cleaner/orders/stream?token=${encodeURIComponent(getTokenCleaner())}`
+    );
+    const onOrder = (e) => applyOrderDelta(JSON.parse(e.data));
+    source.addEventListener("ready", () => {
+      stopPolling();
+      reloadAll();
+    });
+    source.addEventListener("resync", reloadAll);
+    source.addEventListener("order.created", onOrder);
+    source.addEventListener("order.taken", onOrder);
+    source.addEventListener("order.status", onOrder);
+    source.addEventListener("order.removed", (e) => removeOrder(JSON.parse(e.data).id));
+    source.addEventListener("error", () => {
+      // The browser retries on its own; if it gave up (e.g. auth failure), poll instead.
+      if (source.readyState === EventSource.CLOSED) startPolling();
+    });
+  }
+
   // Take order
   if (availableTbody) {
     availableTbody.addEventListener("click", async (e) => {
@@ -237,15 +346,11 @@ document.addEventListener("DOMContentLoaded", () => {
     });
   }
 
-  // Initial load + polling for near-real-time updates
-  (async () => {
-    await loadAssignedOrders();
-    await loadAvailableOrders();
-  })();
-  setInterval(async () => {
-    await loadAssignedOrders();
-    await loadAvailableOrders();
-  }, 5000);
+  // Initial load happens on the stream's "ready" event
+  locateCleaner().then((pos) => {
+    nearMe = pos;
+    connectOrderStream();
+  });
 });
 
 
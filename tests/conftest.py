@@ -0,0 +1,87 @@
+"""
+Shared fixtures.
+
+The backend reads its configuration at import time, so the environment is
+set up here, before any test imports it. The database comes from
+`DATABASE_URL`: by default a throwaway SQLite file in a temp directory
+(`SQLITE_MODE` picks wal or legacy), or a server database such as
+
+    DATABASE_URL=postgresql+psycopg2://postgres@localhost/tazabolsyn_test python -m pytest
+
+A server database is emptied at the start of the session, so its name must
+contain "test". The app is bootstrapped once per session like a real boot
+(`bootstrap_database`) and driven through `TestClient` without running the
+lifespan, so no background threads start.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, NamedTuple
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+WORKDIR = Path(tempfile.mkdtemp(prefix="tazabolsyn-test-"))
+
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{WORKDIR / 'test.db'}")
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+
+
+class Account(NamedTuple):
+    id: int
+    headers: Dict[str, str]
+
+
+@pytest.fixture(scope="session")
+def app():
+    from backend.bootstrap import bootstrap_database
+    from backend.database import IS_SQLITE, Base, engine
+    from backend.main import app
+    from backend.utils.db_migrations import _schema_version
+
+    if not IS_SQLITE:
+        if "test" not in (engine.url.database or ""):
+            pytest.exit(f"refusing to empty {engine.url.database!r}: the test database name must contain 'test'")
+        Base.metadata.drop_all(bind=engine)
+        _schema_version.drop(engine, checkfirst=True)
+    bootstrap_database()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    from fastapi.testclient import TestClient
+
+    return TestClient(app)
+
+
+@pytest.fixture
+def make_account(app) -> Callable[..., Account]:
+    """
+    Factory for users with a bearer token; cleaners also get a profile.
+    Emails are unique, so tests never collide on a shared database.
+    """
+    from backend import models
+    from backend.auth import create_access_token
+    from backend.database import SessionLocal
+
+    def make(role: str = "user", **fields) -> Account:
+        with SessionLocal() as db:
+            user = models.User(
+                email=f"{role}-{uuid.uuid4().hex[:12]}@test.example.com", password_hash="x", role=role, **fields
+            )
+            db.add(user)
+            db.flush()
+            if role == "cleaner":
+                db.add(models.Cleaner(user_id=user.id, availability=True))
+            db.commit()
+            token = create_access_token({"sub": str(user.id), "role": role})
+            return Account(user.id, {"Authorization": f"Bearer {token}"})
+
+    return make
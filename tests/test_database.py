@@ -0,0 +1,184 @@
+"""
+Backend-specific plumbing, run against whatever `DATABASE_URL` the suite
+uses: connect hooks, migrations from an old schema, concurrent bootstrap and
+the write path.
+"""
+from __future__ import annotations
+
+import threading
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, event, func, inspect, select, text
+
+from backend import models
+from backend.bootstrap import bootstrap_database
+from backend.database import (
+    DATABASE_BACKEND,
+    DB_STATEMENT_TIMEOUT_MS,
+    IS_SQLITE,
+    Base,
+    SessionLocal,
+    engine,
+)
+from backend.utils.db_migrations import LATEST_VERSION, current_version, run_migrations, stored_version
+from backend.utils.write_queue import run_write
+
+# Tables added by migrations 5-9; a pre-migration database does not have them.
+MIGRATED_TABLES = {
+    "email_outbox",
+    "resource_versions",
+    "pricing_services",
+    "pricing_city_adjustments",
+    "pricing_base_rates",
+    "idempotency_keys",
+    "reward_ledger",
+}
+
+
+@pytest.fixture
+def scratch_engine(app, tmp_path):
+    """
+    An empty database next to the test one: a new SQLite file, or a fresh
+    schema on PostgreSQL.
+    """
+    if IS_SQLITE:
+        scratch = create_engine(f"sqlite:///{tmp_path / 'scratch.db'}")
+        yield scratch
+        scratch.dispose()
+        return
+    if DATABASE_BACKEND != "postgresql":
+        pytest.skip(f"no scratch database recipe for {DATABASE_BACKEND}")
+    schema = f"scratch_{uuid.uuid4().hex[:12]}"
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+    scratch = create_engine(engine.url, connect_args={"options": f"-csearch_path={schema}"})
+    try:
+        yield scratch
+    finally:
+        scratch.dispose()
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+
+
+def test_bootstrap_reaches_latest_schema(app):
+    assert current_version(engine) == LATEST_VERSION
+    assert run_migrations(engine) == []
+
+
+def test_bootstrap_of_a_current_schema_only_reads_its_version(app):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        bootstrap_database()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    # Besides the version read: the lock, SQLite's BEGIN IMMEDIATE and the admin lookup.
+    expected = ("advisory", "BEGIN", "FROM users")
+    schema = [s for s in statements if not any(marker in s for marker in expected)]
+    assert len(schema) == 1 and "schema_version" in schema[0]
+
+
+def test_stored_version_of_a_new_database_is_zero(scratch_engine):
+    assert stored_version(scratch_engine) == 0
+    assert "schema_version" not in inspect(scratch_engine).get_table_names()
+
+
+def test_migrations_upgrade_an_old_schema(scratch_engine):
+    legacy = [t for name, t in Base.metadata.tables.items() if name not in MIGRATED_TABLES]
+    Base.metadata.create_all(bind=scratch_engine, tables=legacy)
+    with scratch_engine.begin() as conn:
+        # Columns and indexes that migrations 1, 2 and 10 add to databases from before them.
+        conn.execute(text("DROP INDEX ix_orders_status_geo_cell"))
+        conn.execute(text("DROP INDEX ix_order_items_order_id"))
+        conn.execute(text("DROP INDEX ix_addresses_user_id"))
+        conn.execute(text("ALTER TABLE orders DROP COLUMN geo_cell"))
+        conn.execute(text("ALTER TABLE users DROP COLUMN is_totp_enabled"))
+        conn.execute(
+            text(
+                "INSERT INTO users (id, email, password_hash, role, reward_points, totp_secret) VALUES "
+                "(1, 'old@test.example.com', 'x', 'user', 12, 'SECRET'), "
+                "(2, 'new@test.example.com', 'x', 'user', 0, NULL)"
+            )
+        )
+        conn.execute(
+            text(
+                "INSERT INTO orders (id, user_id, status, total_price, address, latitude, longitude) "
+                "VALUES (1, 1, 'pending', 12000, 'Abay 1', 43.238949, 76.889709)"
+            )
+        )
+
+    applied = run_migrations(scratch_engine)
+
+    assert [m.version for m in applied] == list(range(1, LATEST_VERSION + 1))
+    assert current_version(scratch_engine) == LATEST_VERSION
+    assert MIGRATED_TABLES <= set(inspect(scratch_engine).get_table_names())
+    for table, index in [("order_items", "ix_order_items_order_id"), ("addresses", "ix_addresses_user_id")]:
+        assert index in {ix["name"] for ix in inspect(scratch_engine).get_indexes(table)}
+    with scratch_engine.connect() as conn:
+        assert conn.execute(text("SELECT geo_cell FROM orders")).scalar() is not None
+        totp = dict(conn.execute(text("SELECT id, is_totp_enabled FROM users")).all())
+        assert {uid: bool(flag) for uid, flag in totp.items()} == {1: True, 2: False}
+        ledger = conn.execute(text("SELECT user_id, points, reason FROM reward_ledger")).all()
+        assert [tuple(row) for row in ledger] == [(1, 12, "opening")]
+        assert conn.execute(text("SELECT COUNT(*) FROM pricing_services")).scalar() > 0
+    assert run_migrations(scratch_engine) == []
+
+
+def test_concurrent_bootstraps_are_serialised(app):
+    errors = []
+
+    def boot() -> None:
+        try:
+            bootstrap_database()
+        except Exception as exc:  # pragma: no cover - reported below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=boot) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with SessionLocal() as db:
+        admins = db.execute(select(func.count()).where(models.User.email == "admin@tazabolsyn.com")).scalar()
+    assert admins == 1
+
+
+@pytest.mark.skipif(IS_SQLITE, reason="server databases only")
+def test_statement_timeout_is_set_on_connect(app):
+    with engine.connect() as conn:
+        if DATABASE_BACKEND == "postgresql":
+            setting = conn.execute(text("SELECT setting FROM pg_settings WHERE name = 'statement_timeout'")).scalar()
+            assert int(setting) == DB_STATEMENT_TIMEOUT_MS
+        else:
+            assert conn.execute(text("SELECT @@SESSION.max_execution_time")).scalar() == DB_STATEMENT_TIMEOUT_MS
+
+
+def test_run_write_commits_and_rolls_back(app):
+    email = f"write-{uuid.uuid4().hex[:12]}@test.example.com"
+
+    def add(session) -> int:
+        user = models.User(email=email, password_hash="x", role="user")
+        session.add(user)
+        session.flush()
+        return user.id
+
+    def fail(session) -> None:
+        session.add(models.User(email=f"rolled-back-{email}", password_hash="x", role="user"))
+        session.flush()
+        raise RuntimeError("boom")
+
+    with SessionLocal() as db:
+        user_id = run_write(db, add)
+        with pytest.raises(RuntimeError):
+            run_write(db, fail)
+    with SessionLocal() as db:
+        assert db.get(models.User, user_id).email == email
+        assert db.query(models.User).filter(models.User.email == f"rolled-back-{email}").count() == 0
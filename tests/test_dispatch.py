@@ -0,0 +1,92 @@
+"""
+Auto-dispatch matching: `plan_assignments` solves the orders x cities
+transport problem exactly (most orders matched, then least total distance).
+"""
+from __future__ import annotations
+
+import itertools
+import random
+from typing import List, Optional, Sequence, Tuple
+
+import pytest
+
+from backend.dispatch import _min_cost_assignment, plan_assignments
+from backend.utils.geo import city_centroid
+
+# Temirtau's centre is about 30 km from Karaganda's, so orders between them can reach both.
+KARAGANDA = city_centroid("Karaganda")
+TEMIRTAU = city_centroid("Temirtau")
+
+
+def _brute_force(options: Sequence[Sequence[Tuple[int, float]]], capacity: Sequence[int]) -> Tuple[int, float]:
+    best = (0, 0.0)
+    for choice in itertools.product(*[[None, *(ci for ci, _ in reachable)] for reachable in options]):
+        if any(choice.count(ci) > cap for ci, cap in enumerate(capacity)):
+            continue
+        matched = sum(1 for ci in choice if ci is not None)
+        km = sum(dict(reachable)[ci] for reachable, ci in zip(options, choice) if ci is not None)
+        if (-matched, km) < (-best[0], best[1]):
+            best = (matched, km)
+    return best
+
+
+def _score(options: Sequence[Sequence[Tuple[int, float]]], owner: List[Optional[int]]) -> Tuple[int, float]:
+    chosen = [dict(reachable)[ci] for reachable, ci in zip(options, owner) if ci is not None]
+    return len(chosen), sum(chosen)
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_assignment_matches_brute_force(seed):
+    rng = random.Random(seed)
+    cities = rng.randint(1, 3)
+    capacity = [rng.randint(0, 3) for _ in range(cities)]
+    options = [
+        [(ci, round(rng.uniform(0, 30), 1)) for ci in sorted(rng.sample(range(cities), rng.randint(0, cities)))]
+        for _ in range(rng.randint(1, 7))
+    ]
+
+    owner = _min_cost_assignment(options, capacity)
+
+    assert all(owner.count(ci) <= cap for ci, cap in enumerate(capacity))
+    assert all(ci is None or ci in dict(reachable) for reachable, ci in zip(options, owner))
+    matched, km = _score(options, owner)
+    best_matched, best_km = _brute_force(options, capacity)
+    assert matched == best_matched
+    assert km == pytest.approx(best_km)
+
+
+def test_order_reachable_from_two_cities_goes_where_it_frees_a_cleaner():
+    # Order 1 is 8 km from Karaganda and 22 km from Temirtau; order 2 is 22 km
+    # from Karaganda and out of Temirtau's reach. Nearest pair first would give
+    # Karaganda's only cleaner to order 1 and leave order 2 unassigned.
+    between = (KARAGANDA[0] + 0.06, KARAGANDA[1] - 0.05)
+    east = (KARAGANDA[0], KARAGANDA[1] + 0.3)
+    orders = [(1, *between, "Karaganda"), (2, *east, "Karaganda")]
+    cleaners = [(10, "Karaganda"), (20, "Temirtau")]
+
+    planned = {a.order_id: a.cleaner_id for a in plan_assignments(orders, cleaners)}
+
+    assert planned == {1: 20, 2: 10}
+
+
+def test_plan_respects_distance_limit_and_city_fallback():
+    orders = [
+        (1, None, None, "Karaganda"),  # no coordinates: placed at the city centre
+        (2, KARAGANDA[0] + 1.0, KARAGANDA[1], "Karaganda"),  # ~110 km away
+        (3, None, None, "Atlantis"),
+    ]
+    cleaners = [(10, "Karaganda"), (20, "Karaganda"), (30, "Atlantis")]
+
+    planned = plan_assignments(orders, cleaners, max_distance_km=30)
+
+    assert [a.order_id for a in planned] == [1]
+    assert planned[0].cleaner_id in (10, 20)
+    assert planned[0].distance_km == pytest.approx(0.0)
+
+
+def test_older_order_wins_a_tie():
+    orders = [(5, *TEMIRTAU, "Temirtau"), (6, *TEMIRTAU, "Temirtau")]
+
+    planned = plan_assignments(orders, [(10, "Temirtau")])
+
+    assert [a.order_id for a in planned] == [5]
@@ -0,0 +1,158 @@
+"""
+Email outbox delivery against the local SMTP stand-in: connection reuse,
+backoff on transient failures, giving up, and reclaiming rows from a sender
+that died mid-batch.
+"""
+from __future__ import annotations
+
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+import pytest
+from sqlalchemy import delete
+
+from backend import email_service, models
+from backend.database import SessionLocal
+from backend.email_service import OutboxSender, enqueue_email
+from benchmarks.email_outbox import SmtpStandIn
+
+
+@pytest.fixture
+def smtp(app, monkeypatch):
+    server = SmtpStandIn(delay_seconds=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    for name, value in {
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_PORT": str(server.server_address[1]),
+        "SMTP_USER": "test",
+        "SMTP_PASSWORD": "test",
+        "SMTP_FROM": "noreply@test.example.com",
+        "SMTP_STARTTLS": "0",
+    }.items():
+        monkeypatch.setenv(name, value)
+    with SessionLocal() as db:  # the outbox is only written here: start from an empty one
+        db.execute(delete(models.EmailOutbox))
+        db.commit()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Lets a test move the sender's notion of "now" forward.
+    """
+
+    class Clock:
+        offset = timedelta()
+
+        def advance(self, seconds: float) -> None:
+            self.offset += timedelta(seconds=seconds)
+
+    clock = Clock()
+    monkeypatch.setattr(email_service, "_utcnow", lambda: datetime.now(timezone.utc) + clock.offset)
+    return clock
+
+
+def _enqueue(*recipients: str) -> List[int]:
+    with SessionLocal() as db:
+        rows = [enqueue_email(db, to, "password_reset", code="123456") for to in recipients]
+        db.commit()
+        return [row.id for row in rows]
+
+
+def _row(row_id: int) -> models.EmailOutbox:
+    with SessionLocal() as db:
+        return db.get(models.EmailOutbox, row_id)
+
+
+def _drain(sender: OutboxSender) -> None:
+    while sender.run_once():
+        pass
+
+
+def _seconds_until(moment: datetime) -> float:
+    if moment.tzinfo is None:  # SQLite drops the offset; values are stored in UTC
+        moment = moment.replace(tzinfo=timezone.utc)
+    return (moment - datetime.now(timezone.utc)).total_seconds()
+
+
+def test_batches_reuse_one_connection(smtp):
+    recipients = [f"user{i}@test.example.com" for i in range(5)]
+    ids = _enqueue(*recipients)
+    sender = OutboxSender(batch_size=2)
+
+    _drain(sender)
+
+    assert sorted(smtp.messages) == recipients
+    assert (sender.sent, sender.connections, smtp.connections) == (5, 1, 1)
+    assert {_row(i).status for i in ids} == {"sent"}
+
+
+def test_transient_failure_backs_off_then_delivers(smtp, clock, monkeypatch):
+    monkeypatch.setattr(email_service, "EMAIL_RETRY_BASE_SECONDS", 30.0)
+    [row_id] = _enqueue("flaky@test.example.com")
+    smtp.fail_next = 1
+    sender = OutboxSender()
+
+    assert sender.run_once() == 1
+    row = _row(row_id)
+    assert (row.status, row.attempts, sender.retried) == ("pending", 1, 1)
+    assert 30 * 0.8 - 1 <= _seconds_until(row.next_attempt_at) <= 30 * 1.2
+    assert sender.run_once() == 0  # not due yet
+
+    clock.advance(40)
+    assert sender.run_once() == 1
+    row = _row(row_id)
+    assert (row.status, row.attempts, row.context) == ("sent", 2, None)
+    assert smtp.messages == ["flaky@test.example.com"]
+
+
+def test_retry_delay_doubles_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(email_service, "EMAIL_RETRY_BASE_SECONDS", 30.0)
+    monkeypatch.setattr(email_service, "EMAIL_RETRY_MAX_SECONDS", 3600.0)
+
+    for attempts, expected in [(1, 30), (2, 60), (3, 120), (10, 3600)]:
+        assert expected * 0.8 <= email_service._retry_delay(attempts) <= expected * 1.2
+
+
+def test_gives_up_after_max_attempts(smtp, clock):
+    [row_id] = _enqueue("down@test.example.com")
+    smtp.fail_next = 10
+    sender = OutboxSender(max_attempts=3)
+
+    for _ in range(5):
+        sender.run_once()
+        clock.advance(email_service.EMAIL_RETRY_MAX_SECONDS * 2)
+
+    row = _row(row_id)
+    assert (row.status, row.attempts) == ("failed", 3)
+    assert (sender.retried, sender.failed, sender.sent) == (2, 1, 0)
+    assert row.last_error.startswith("(451")
+
+
+def test_refused_recipient_fails_without_retrying(smtp):
+    [row_id] = _enqueue("reject@test.example.com")
+    sender = OutboxSender()
+
+    sender.run_once()
+
+    row = _row(row_id)
+    assert (row.status, row.attempts, sender.failed, sender.retried) == ("failed", 1, 1, 0)
+
+
+def test_rows_of_a_crashed_sender_are_reclaimed_after_the_lease(smtp, clock):
+    [row_id] = _enqueue("lease@test.example.com")
+    crashed = OutboxSender()
+    assert len(crashed._claim()) == 1  # claimed, then the process died before sending
+
+    survivor = OutboxSender()
+    assert survivor.run_once() == 0  # still leased to the dead sender
+
+    clock.advance(email_service._CLAIM_LEASE_SECONDS + 1)
+    assert survivor.run_once() == 1
+    row = _row(row_id)
+    assert (row.status, row.attempts, row.claimed_by) == ("sent", 2, None)
+    assert smtp.messages == ["lease@test.example.com"]
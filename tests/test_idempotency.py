@@ -0,0 +1,121 @@
+"""
+`Idempotency-Key`: a retried write runs once and every retry gets the same
+response, including copies that arrive at the same instant.
+"""
+from __future__ import annotations
+
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+import pytest
+from sqlalchemy import func, select
+
+from backend import models
+from backend.database import SessionLocal
+from backend.rewards import points_for
+
+RETRIES = 8
+
+
+def _payload(city: str = "Almaty", rooms: int = 2) -> Dict[str, Any]:
+    return {
+        "items": [{"service_name": "Window cleaning", "quantity": 2, "price": 4200}],
+        "address": f"{city}, 10 Abay Ave",
+        "city": city,
+        "rooms": rooms,
+        "property_type": "Apartment",
+        "cleaning_type": "Standard",
+        "latitude": 43.238949,
+        "longitude": 76.889709,
+    }
+
+
+def _storm(client, method: str, url: str, headers: Dict[str, str], body: Any = None) -> List[Any]:
+    """
+    `RETRIES` copies of one request released together, then one late retry.
+    """
+    barrier = threading.Barrier(RETRIES)
+
+    def send(_: int) -> Any:
+        barrier.wait()
+        return client.request(method, url, headers=headers, json=body)
+
+    with ThreadPoolExecutor(max_workers=RETRIES) as pool:
+        responses = list(pool.map(send, range(RETRIES)))
+    responses.append(client.request(method, url, headers=headers, json=body))
+    return responses
+
+
+def _assert_executed_once(responses: List[Any]) -> None:
+    assert {(res.status_code, res.content) for res in responses} == {(responses[0].status_code, responses[0].content)}
+    assert responses[0].status_code < 300, responses[0].text
+    replayed = [res for res in responses if res.headers.get("Idempotent-Replayed") == "true"]
+    assert len(replayed) == len(responses) - 1
+
+
+def _key() -> str:
+    return uuid.uuid4().hex
+
+
+@pytest.fixture
+def customer(make_account, client):
+    account = make_account("user")
+    client.get("/users/me", headers=account.headers).raise_for_status()  # warm the principal cache
+    return account
+
+
+def test_create_storm_makes_one_order(client, customer):
+    responses = _storm(client, "POST", "/orders/", {**customer.headers, "Idempotency-Key": _key()}, _payload())
+
+    _assert_executed_once(responses)
+    assert responses[0].status_code == 201
+    with SessionLocal() as db:
+        orders = db.execute(select(func.count()).where(models.Order.user_id == customer.id)).scalar()
+        points = db.get(models.User, customer.id).reward_points
+    assert orders == 1
+    assert points == points_for(responses[0].json()["total_price"])
+
+
+def test_take_and_status_storms_run_once(client, customer, make_account):
+    cleaner = make_account("cleaner")
+    order = client.post("/orders/", json=_payload(), headers=customer.headers).json()
+    steps = [("POST", f"/cleaner/orders/{order['id']}/take", None)] + [
+        ("PATCH", f"/cleaner/orders/{order['id']}/status", {"status": s}) for s in ("going", "started", "finished")
+    ]
+
+    for method, url, body in steps:
+        responses = _storm(client, method, url, {**cleaner.headers, "Idempotency-Key": _key()}, body)
+        _assert_executed_once(responses)
+
+    assert responses[0].json()["status"] == "finished"
+
+
+def test_key_reused_for_another_request_is_rejected(client, customer):
+    headers = {**customer.headers, "Idempotency-Key": _key()}
+    assert client.post("/orders/", json=_payload(), headers=headers).status_code == 201
+
+    res = client.post("/orders/", json=_payload(rooms=3), headers=headers)
+
+    assert res.status_code == 422
+    with SessionLocal() as db:
+        assert db.execute(select(func.count()).where(models.Order.user_id == customer.id)).scalar() == 1
+
+
+def test_keys_are_scoped_to_the_user(client, customer, make_account):
+    other = make_account("user")
+    key = _key()
+
+    first = client.post("/orders/", json=_payload(), headers={**customer.headers, "Idempotency-Key": key})
+    second = client.post("/orders/", json=_payload(), headers={**other.headers, "Idempotency-Key": key})
+
+    assert (first.status_code, second.status_code) == (201, 201)
+    assert "Idempotent-Replayed" not in second.headers
+    assert first.json()["id"] != second.json()["id"]
+
+
+def test_invalid_key_is_rejected(client, customer):
+    res = client.post("/orders/", json=_payload(), headers={**customer.headers, "Idempotency-Key": "k" * 256})
+
+    assert res.status_code == 400
@@ -0,0 +1,71 @@
+"""
+Order responses serialise the same way whichever path built them: the
+INSERT ... RETURNING response of create and bulk create, ORM reads and the
+listing's row reader.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from backend import models
+from backend.database import SessionLocal
+
+
+def _payload(city: str = "Almaty") -> dict:
+    return {
+        "items": [{"service_name": "Window cleaning", "quantity": 1, "price": 4200}],
+        "address": f"{city}, 10 Abay Ave",
+        "city": city,
+        "rooms": 2,
+        "property_type": "Apartment",
+        "cleaning_type": "Standard",
+    }
+
+
+def test_created_at_is_utc_and_identical_on_every_path(client, make_account):
+    customer = make_account("user")
+    cleaner = make_account("cleaner")
+    created = client.post("/orders/", json=_payload(), headers=customer.headers)
+    bulk = client.post("/orders/bulk", json={"orders": [_payload("Astana")]}, headers=customer.headers)
+    assert created.status_code == 201 and bulk.status_code == 200
+    written = {order["id"]: order["created_at"] for order in [created.json(), bulk.json()["results"][0]["order"]]}
+
+    page = client.get("/orders/me", headers=customer.headers).json()
+    listed = {order["id"]: order["created_at"] for order in page["items"]}
+    taken = client.post(f"/cleaner/orders/{created.json()['id']}/take", headers=cleaner.headers).json()
+
+    assert listed == written
+    assert taken["created_at"] == written[taken["id"]]
+    for stamp in written.values():
+        assert datetime.fromisoformat(stamp).utcoffset() == timezone.utc.utcoffset(None)
+
+
+def test_stored_timestamps_read_back_in_utc(make_account):
+    customer = make_account("user")
+    with SessionLocal() as db:
+        order = models.Order(user_id=customer.id, status="pending", total_price=1000, address="Abay 1")
+        db.add(order)
+        db.commit()
+        order_id = order.id
+    with SessionLocal() as db:
+        created_at = db.get(models.Order, order_id).created_at
+    assert created_at.tzinfo is not None
+    assert created_at.utcoffset() == timezone.utc.utcoffset(None)
+
+
+def test_cursor_pages_cover_every_order_once(client, make_account):
+    customer = make_account("user")
+    for _ in range(5):
+        assert client.post("/orders/", json=_payload(), headers=customer.headers).status_code == 201
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/orders/me", params=params, headers=customer.headers)
+        assert page.status_code == 200, page.text
+        seen += [order["id"] for order in page.json()["items"]]
+        cursor = page.json()["next_cursor"]
+        if not cursor:
+            break
+
+    assert seen == sorted(seen, reverse=True) and len(set(seen)) == 5
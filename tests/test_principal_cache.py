@@ -0,0 +1,52 @@
+"""
+The principal cache never authenticates a user row that changed after it was
+cached, whichever session, connection or process made the change.
+"""
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import update
+
+from backend import models
+from backend.database import SessionLocal, engine
+from backend.utils.etag import bump_versions, user_key
+from backend.utils.principal_cache import principal_cache
+
+
+@pytest.fixture
+def admin(client, make_account):
+    account = make_account("admin")
+    assert client.get("/admin/users", headers=account.headers).status_code == 200  # now cached
+    return account
+
+
+@pytest.fixture
+def elsewhere(monkeypatch):
+    """
+    Changes made from here skip this process's in-memory invalidation, as if
+    another worker had made them.
+    """
+    monkeypatch.setattr(principal_cache, "invalidate_user", lambda user_id: None)
+
+
+def test_cached_principal_is_reused_while_unchanged(client, admin):
+    hits = principal_cache.hits
+
+    assert client.get("/admin/users", headers=admin.headers).status_code == 200
+    assert principal_cache.hits == hits + 1
+
+
+def test_role_revoked_by_orm_session_elsewhere(client, admin, elsewhere):
+    with SessionLocal() as db:
+        db.get(models.User, admin.id).role = "user"
+        db.commit()
+
+    assert client.get("/admin/users", headers=admin.headers).status_code == 403
+
+
+def test_role_revoked_by_core_update_elsewhere(client, admin, elsewhere):
+    with engine.begin() as conn:  # like an admin script: Core UPDATE plus the version bump
+        conn.execute(update(models.User.__table__).where(models.User.id == admin.id).values(role="user"))
+        bump_versions(conn, user_key(admin.id))
+
+    assert client.get("/admin/users", headers=admin.headers).status_code == 403
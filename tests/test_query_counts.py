@@ -0,0 +1,96 @@
+"""
+List endpoints must run a constant number of statements however many rows
+they return (no N+1 from lazy-loaded relationships).
+"""
+from __future__ import annotations
+
+import uuid
+
+import pytest
+from sqlalchemy import event
+
+from backend import models
+from backend.database import SessionLocal, engine, read_engine
+
+# A warm principal cache costs one version lookup instead of the user SELECT,
+# then the listing's own queries plus the ETag version lookup where the route
+# has one.
+BUDGETS = {
+    "/orders/me": 4,
+    "/users/me/orders": 4,
+    "/cleaner/orders": 4,
+    "/cleaner/orders/available": 4,
+    "/admin/orders": 4,
+    "/admin/users": 3,
+    "/admin/cleaners": 3,
+}
+ROLE = {"/cleaner": "cleaner", "/admin/": "admin"}
+
+
+class StatementCounter:
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, *args) -> None:
+        self.count += 1
+
+    def __enter__(self) -> "StatementCounter":
+        for bind in {engine, read_engine}:
+            event.listen(bind, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        for bind in {engine, read_engine}:
+            event.remove(bind, "before_cursor_execute", self)
+
+
+@pytest.fixture
+def accounts(make_account):
+    return {"user": make_account("user"), "cleaner": make_account("cleaner"), "admin": make_account("admin")}
+
+
+def _seed(customer_id: int, cleaner_id: int, count: int) -> None:
+    with SessionLocal() as db:
+        for i in range(count):
+            for assigned in (None, cleaner_id):
+                db.add(
+                    models.Order(
+                        user_id=customer_id,
+                        cleaner_id=assigned,
+                        status="accepted" if assigned else "pending",
+                        total_price=1000,
+                        address=f"Abay {i}",
+                        items=[models.OrderItem(service_name="s", quantity=1, price=1000) for _ in range(2)],
+                    )
+                )
+            db.add(models.Address(user_id=customer_id, address=f"Abay {i}"))
+            email = f"seed-{uuid.uuid4().hex[:12]}@test.example.com"
+            user = models.User(email=email, password_hash="x", role="cleaner")
+            db.add(user)
+            db.flush()
+            db.add(models.Cleaner(user_id=user.id, availability=True))
+        db.commit()
+
+
+def _measure(client, path: str, headers) -> tuple:
+    client.get(path, headers=headers).raise_for_status()  # warm the principal cache
+    with StatementCounter() as counter:
+        res = client.get(path, params={"limit": 200}, headers=headers)
+    res.raise_for_status()
+    return counter.count, len(res.json()["items"])
+
+
+@pytest.mark.parametrize("path", list(BUDGETS))
+def test_list_query_count_is_constant(client, accounts, path):
+    role = next((r for prefix, r in ROLE.items() if path.startswith(prefix)), "user")
+    headers = accounts[role].headers
+    customer, cleaner = accounts["user"].id, accounts["cleaner"].id
+
+    _seed(customer, cleaner, 1)
+    few, few_rows = _measure(client, path, headers)
+    _seed(customer, cleaner, 8)
+    many, many_rows = _measure(client, path, headers)
+
+    assert many_rows > few_rows, "seeding did not grow the listing"
+    assert many == few, f"{path}: {few} statements at {few_rows} rows, {many} at {many_rows}"
+    assert many <= BUDGETS[path]
@@ -0,0 +1,60 @@
+"""
+GCRA rate limiting: the burst budget, and one budget shared by every worker
+process on the host.
+"""
+from __future__ import annotations
+
+import multiprocessing
+from pathlib import Path
+
+import pytest
+
+from backend.utils.rate_limit import InMemoryRateLimiter, RateLimit, RateLimiter, SharedFileRateLimiter, fcntl
+
+RULE = RateLimit(limit=8, window_seconds=3600)  # one hit refills every 450 s: none during a test
+KEY = ("auth:login", "203.0.113.7")
+
+needs_fcntl = pytest.mark.skipif(fcntl is None, reason="shared storage needs fcntl")
+
+
+def _hammer(path: str, hits: int, barrier, results) -> None:
+    limiter = SharedFileRateLimiter(Path(path))
+    barrier.wait()
+    results.put(sum(1 for _ in range(hits) if limiter.try_hit(key=KEY, rule=RULE) is None))
+
+
+@pytest.mark.parametrize("storage", ["memory", pytest.param("shared", marks=needs_fcntl)])
+def test_burst_then_retry_after(storage, tmp_path):
+    limiter = InMemoryRateLimiter() if storage == "memory" else SharedFileRateLimiter(tmp_path / "rl")
+    now = 1_000_000.0
+
+    allowed = [limiter.try_hit(key=KEY, rule=RULE, now=now) for _ in range(RULE.limit)]
+    retry_after = limiter.try_hit(key=KEY, rule=RULE, now=now)
+
+    assert allowed == [None] * RULE.limit
+    assert retry_after == pytest.approx(RULE.emission_interval)
+    assert limiter.try_hit(key=KEY, rule=RULE, now=now + RULE.emission_interval) is None
+    assert limiter.try_hit(key=("auth:login", "203.0.113.8"), rule=RULE, now=now) is None
+
+
+def test_storage_must_implement_try_hit():
+    with pytest.raises(TypeError):
+        RateLimiter()
+
+
+@needs_fcntl
+def test_worker_processes_share_one_budget(tmp_path):
+    workers, hits = 4, 200
+    ctx = multiprocessing.get_context("spawn")  # fresh interpreters, like uvicorn workers
+    barrier = ctx.Barrier(workers)
+    results = ctx.Queue()
+    path = str(tmp_path / "workers.ratelimit")
+    procs = [ctx.Process(target=_hammer, args=(path, hits, barrier, results)) for _ in range(workers)]
+    for proc in procs:
+        proc.start()
+    allowed = [results.get(timeout=60) for _ in procs]
+    for proc in procs:
+        proc.join(timeout=10)
+
+    assert [proc.exitcode for proc in procs] == [0] * workers
+    assert sum(allowed) == RULE.limit, f"per worker {allowed}"
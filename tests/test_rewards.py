@@ -0,0 +1,51 @@
+"""
+Reward ledger rebuild: corrected balances reach running servers at once,
+through both the principal cache and `/users/me` revalidation.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from sqlalchemy import insert
+
+from backend import models
+from backend.database import engine
+from backend.rewards import main, rebuild_balances
+
+
+def _add_ledger_entry(user_id: int, points: int) -> None:
+    # A manual correction entry: the cached balance on the user row now drifts.
+    with engine.begin() as conn:
+        conn.execute(
+            insert(models.RewardLedgerEntry.__table__).values(
+                user_id=user_id, points=points, reason="order", created_at=datetime.now(timezone.utc)
+            )
+        )
+
+
+def test_rebuild_is_visible_on_the_next_request(client, make_account):
+    account = make_account("user", reward_points=0)
+    before = client.get("/users/me", headers=account.headers)  # caches the principal and the ETag
+    _add_ledger_entry(account.id, 50)
+
+    corrected = rebuild_balances(engine, [account.id])
+    after = client.get("/users/me", headers={**account.headers, "If-None-Match": before.headers["ETag"]})
+
+    assert [(c.user_id, c.cached, c.ledger) for c in corrected] == [(account.id, 0, 50)]
+    assert after.status_code == 200
+    assert after.json()["reward_points"] == 50
+    revalidated = client.get("/users/me", headers={**account.headers, "If-None-Match": after.headers["ETag"]})
+    assert revalidated.status_code == 304
+
+
+def test_rebuild_cli_reports_corrections(make_account, capsys):
+    account = make_account("user", reward_points=0)
+    _add_ledger_entry(account.id, 7)
+
+    main(["rebuild", "--user", str(account.id), "--dry-run"])
+    assert f"user {account.id}: cached 0 -> ledger 7" in capsys.readouterr().out
+
+    main(["rebuild", "--user", str(account.id)])
+    out = capsys.readouterr().out
+    assert "1 balance(s) corrected" in out
+    assert "from the next request on" in out
@@ -0,0 +1,48 @@
+"""
+`/users/me` and its addresses under conditional GET: the body served with an
+ETag is never older than the versions the tag was built from, even when the
+request authenticated from the principal cache.
+"""
+from __future__ import annotations
+
+from sqlalchemy import update
+
+from backend import models
+from backend.database import engine
+from backend.utils.etag import bump_versions, user_key
+
+
+def _change_outside_the_cache(user_id: int, **values) -> None:
+    # A Core UPDATE on another connection, like `rewards rebuild` or another worker.
+    with engine.begin() as conn:
+        conn.execute(update(models.User.__table__).where(models.User.id == user_id).values(**values))
+        bump_versions(conn, user_key(user_id))
+
+
+def test_profile_body_matches_its_etag_after_an_outside_change(client, make_account):
+    account = make_account("user", reward_points=0)
+    first = client.get("/users/me", headers=account.headers)
+    assert first.json()["reward_points"] == 0
+
+    _change_outside_the_cache(account.id, reward_points=50, city="Astana")
+    changed = client.get("/users/me", headers={**account.headers, "If-None-Match": first.headers["ETag"]})
+
+    assert changed.status_code == 200
+    assert (changed.json()["reward_points"], changed.json()["city"]) == (50, "Astana")
+    assert changed.headers["ETag"] != first.headers["ETag"]
+    revalidated = client.get("/users/me", headers={**account.headers, "If-None-Match": changed.headers["ETag"]})
+    assert revalidated.status_code == 304
+
+
+def test_addresses_body_matches_its_etag_after_an_outside_change(client, make_account):
+    account = make_account("user")
+    first = client.get("/users/me/addresses", headers=account.headers)
+    assert first.json() == []
+
+    with engine.begin() as conn:
+        conn.execute(models.Address.__table__.insert().values(user_id=account.id, address="Abay 1"))
+        bump_versions(conn, user_key(account.id))
+    changed = client.get("/users/me/addresses", headers={**account.headers, "If-None-Match": first.headers["ETag"]})
+
+    assert changed.status_code == 200
+    assert [a["address"] for a in changed.json()] == ["Abay 1"]